@@ -23,6 +23,23 @@ const verifySessionOwnership = async (sessionId: string, userId: string) => {
   return !error && !!data;
 };
 
+// Tell langchain-python-service about saved messages so its cached context window stays current.
+// Best effort: a missed update only means the service reloads the window from the database.
+const notifyMessagesAppended = (
+  sessionId: string,
+  messages: { id: string; role: string; content: string; created_at: string }[]
+) => {
+  const langchainUrl =
+    process.env.LANGCHAIN_SERVICE_URL || "http://langchain-python-service:5000";
+  fetch(`${langchainUrl}/context/messages`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ session_id: sessionId, messages }),
+  }).catch((error) => {
+    console.warn("Could not notify LangChain service of new messages:", error);
+  });
+};
+
 // GET /api/learning/chat - Lấy danh sách tin nhắn chat
 router.get("/", authenticate, async (req: AuthRequest, res) => {
   try {
@@ -241,6 +258,7 @@ router.post(
           .status(500)
           .json({ error: "Không thể lưu tin nhắn của bạn" });
       }
+      notifyMessagesAppended(sessionId, [savedUserMessage]);
 
       // Set up SSE headers
       res.writeHead(200, {
@@ -314,11 +332,18 @@ router.post(
 
       // 4. Save the full AI response
       if (fullAiResponse) {
-        await supabaseAdmin.from("chat_messages").insert({
-          session_id: sessionId,
-          role: "assistant",
-          content: fullAiResponse,
-        });
+        const { data: savedAiMessage } = await supabaseAdmin
+          .from("chat_messages")
+          .insert({
+            session_id: sessionId,
+            role: "assistant",
+            content: fullAiResponse,
+          })
+          .select()
+          .single();
+        if (savedAiMessage) {
+          notifyMessagesAppended(sessionId, [savedAiMessage]);
+        }
       }
 
       // 5. Update session's last activity timestamp
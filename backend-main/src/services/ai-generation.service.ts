@@ -3,6 +3,12 @@ import { TreeData } from "../types";
 
 class AIGenerationService {
   private langchainServiceUrl: string;
+  private jobPollIntervalMs = 2000;
+  // Same setting as the LangChain job workers; the service also reports it on submit
+  private jobTimeoutMs =
+    Number(process.env.LEARNING_PATH_JOB_TIMEOUT || 600) * 1000;
+  // Allowance for queueing, polling and clock differences on top of the job timeout
+  private jobTimeoutMarginMs = 60 * 1000;
 
   constructor() {
     this.langchainServiceUrl =
@@ -16,8 +22,9 @@ class AIGenerationService {
     message?: string;
   }> {
     try {
-      const response = await axios.post(
-        `${this.langchainServiceUrl}/learning-path/generate`,
+      // Submit a background job; the LangChain service returns a job id immediately
+      const submitResponse = await axios.post(
+        `${this.langchainServiceUrl}/learning-path/jobs`,
         {
           message: prompt,
         },
@@ -25,14 +32,29 @@ class AIGenerationService {
           headers: {
             "Content-Type": "application/json",
           },
-          timeout: 5 * 60 * 1000, // 120 seconds timeout for potentially long generation
+          timeout: 30 * 1000,
         }
       );
 
-      const generatedData = response.data as TreeData;
+      const jobId: string = submitResponse.data.job_id;
+      const jobTimeoutMs = submitResponse.data.timeout_seconds
+        ? submitResponse.data.timeout_seconds * 1000
+        : this.jobTimeoutMs;
+      const job = await this.waitForJob(jobId, jobTimeoutMs);
+
+      if (job.status !== "completed") {
+        return {
+          success: false,
+          error: "LangChain Service Error",
+          message: job.error || "AI service không thể tạo learning tree.",
+        };
+      }
+
+      const generatedData = job.result as TreeData;
 
       // Validate the response from the langchain service
       if (
+        !generatedData ||
         !generatedData.topicName ||
         !generatedData.description ||
         !generatedData.tree ||
@@ -75,6 +97,46 @@ class AIGenerationService {
       };
     }
   }
+
+  private async waitForJob(
+    jobId: string,
+    jobTimeoutMs: number
+  ): Promise<{
+    status: string;
+    result?: TreeData;
+    error?: string;
+  }> {
+    // The job timeout only starts once a worker picks the job up, so the deadline is
+    // extended when the job is first seen running; it never gives up on a job that
+    // is still within its own time limit
+    let deadline = Date.now() + jobTimeoutMs + this.jobTimeoutMarginMs;
+    let seenRunning = false;
+
+    while (Date.now() < deadline) {
+      const { data: job } = await axios.get(
+        `${this.langchainServiceUrl}/learning-path/jobs/${jobId}`,
+        { timeout: 10 * 1000 }
+      );
+
+      if (job.status === "completed" || job.status === "failed") {
+        return job;
+      }
+      if (job.status === "running" && !seenRunning) {
+        seenRunning = true;
+        deadline = Math.max(
+          deadline,
+          Date.now() + jobTimeoutMs + this.jobTimeoutMarginMs
+        );
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, this.jobPollIntervalMs));
+    }
+
+    return {
+      status: "failed",
+      error: "Quá thời gian chờ AI service tạo learning tree.",
+    };
+  }
 }
 
 export const aiGenerationService = new AIGenerationService();
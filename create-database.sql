@@ -96,6 +96,8 @@ CREATE TABLE "public"."chat_sessions" (
     CONSTRAINT "unique_user_topic_node_session" UNIQUE ("user_id", "topic_id", "node_id")
 );
 ALTER TABLE "public"."chat_sessions" ENABLE ROW LEVEL SECURITY;
+-- NULLs are distinct in the constraint above, so topic-level sessions need their own index.
+CREATE UNIQUE INDEX "unique_user_topic_session" ON "public"."chat_sessions" ("user_id", "topic_id") WHERE "node_id" IS NULL;
 
 -- Table to store individual chat messages.
 CREATE TABLE "public"."chat_messages" (
@@ -106,6 +108,20 @@ CREATE TABLE "public"."chat_messages" (
     "created_at" timestamp with time zone DEFAULT now()
 );
 ALTER TABLE "public"."chat_messages" ENABLE ROW LEVEL SECURITY;
+-- Every context read and summary pass walks a session's messages newest first.
+CREATE INDEX "chat_messages_session_created_at" ON "public"."chat_messages" ("session_id", "created_at" DESC);
+
+-- Rolling summary of the messages that have left a session's recent-message window.
+-- Written by the langchain-python-service summarizer; summarized_until is the
+-- created_at of the newest message folded in.
+CREATE TABLE "public"."chat_session_summaries" (
+    "session_id" uuid PRIMARY KEY REFERENCES "public"."chat_sessions" ON DELETE CASCADE,
+    "summary" text NOT NULL,
+    "summarized_until" timestamp with time zone NOT NULL,
+    "message_count" integer NOT NULL DEFAULT 0,
+    "updated_at" timestamp with time zone DEFAULT now()
+);
+ALTER TABLE "public"."chat_session_summaries" ENABLE ROW LEVEL SECURITY;
 
 -- =============================================
 -- === User-Generated Data & Progress      ===
@@ -183,4 +199,66 @@ CREATE TRIGGER on_tree_nodes_update
 CREATE TRIGGER on_learning_notes_update
     BEFORE UPDATE ON public.learning_notes
     FOR EACH ROW
-    EXECUTE PROCEDURE public.handle_updated_at();
\ No newline at end of file
+    EXECUTE PROCEDURE public.handle_updated_at();
+
+-- Trigger to notify listening services (langchain-python-service) that cached
+-- copies of a row are stale. Payload: {"table": ..., "op": ..., "id": ...}; chat_sessions
+-- also carries its (user_id, topic_id, node_id), which key the cached session lookup.
+CREATE OR REPLACE FUNCTION public.notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    payload jsonb := jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id);
+BEGIN
+    IF TG_TABLE_NAME = 'chat_sessions' THEN
+        payload := payload || jsonb_build_object('user_id', OLD.user_id, 'topic_id', OLD.topic_id, 'node_id', OLD.node_id);
+    END IF;
+    PERFORM pg_notify('cache_invalidation', payload::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only columns that end up in cached context fire a notification,
+-- so frequent updates such as chat_sessions.last_activity stay silent.
+CREATE TRIGGER on_learning_topics_cache_invalidation
+    AFTER UPDATE OF title OR DELETE ON public.learning_topics
+    FOR EACH ROW
+    EXECUTE PROCEDURE public.notify_cache_invalidation();
+
+CREATE TRIGGER on_tree_nodes_cache_invalidation
+    AFTER UPDATE OF title OR DELETE ON public.tree_nodes
+    FOR EACH ROW
+    EXECUTE PROCEDURE public.notify_cache_invalidation();
+
+CREATE TRIGGER on_chat_sessions_cache_invalidation
+    AFTER UPDATE OF topic_id, node_id OR DELETE ON public.chat_sessions
+    FOR EACH ROW
+    EXECUTE PROCEDURE public.notify_cache_invalidation();
+
+-- New and deleted chat messages keep the in-memory message windows current.
+-- NOTIFY payloads are limited to 8000 bytes, so large contents are left out
+-- and the listener reloads that session's window instead.
+CREATE OR REPLACE FUNCTION public.notify_chat_message_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    message public.chat_messages := COALESCE(NEW, OLD);
+    payload jsonb := jsonb_build_object(
+        'table', TG_TABLE_NAME, 'op', TG_OP, 'id', message.id,
+        'session_id', message.session_id, 'role', message.role, 'created_at', message.created_at
+    );
+    with_content jsonb;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        with_content := payload || jsonb_build_object('content', message.content);
+        IF octet_length(with_content::text) < 7900 THEN
+            payload := with_content;
+        END IF;
+    END IF;
+    PERFORM pg_notify('cache_invalidation', payload::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER on_chat_messages_cache_invalidation
+    AFTER INSERT OR DELETE ON public.chat_messages
+    FOR EACH ROW
+    EXECUTE PROCEDURE public.notify_chat_message_change();
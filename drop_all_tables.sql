@@ -13,6 +13,7 @@ DROP VIEW IF EXISTS "public"."topic_level_notes";
 -- Step 2: Drop all tables.
 -- The CASCADE option will automatically handle dropping dependent objects like foreign keys.
 DROP TABLE IF EXISTS "public"."chat_messages" CASCADE;
+DROP TABLE IF EXISTS "public"."chat_session_summaries" CASCADE;
 DROP TABLE IF EXISTS "public"."learning_chats" CASCADE; -- Drop old table just in case
 DROP TABLE IF EXISTS "public"."chat_sessions" CASCADE;
 DROP TABLE IF EXISTS "public"."user_learning_progress" CASCADE;
@@ -0,0 +1,168 @@
+"""
+Context Packer
+Fits the conversation context into the selected model's token budget
+"""
+
+import math
+import os
+import re
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.agents.context_manager import Message
+from app.models.llm_config import LLMConfig
+
+# Used when the selected model has no metadata in LLMConfig.AVAILABLE_MODELS
+FALLBACK_CONTEXT_WINDOW = 32768
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_CODE_BLOCK_PATTERN = re.compile(r"```[^\n]*\n(.*?)```", re.DOTALL)
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Ước lượng số token cho BPE tokenizers. `len // 4` only holds for English:
+    Vietnamese syllables with diacritics are split into ~2 tokens each, and code
+    spends roughly one token per symbol. Words are therefore counted as
+    ASCII runs of ~5 chars per token, words with non-ASCII letters at ~2 chars per
+    token, and punctuation/symbols at one token each.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for word in _WORD_PATTERN.findall(text):
+        if word.isascii():
+            tokens += math.ceil(len(word) / 5) if word[0].isalnum() or word[0] == "_" else 1
+        else:
+            tokens += math.ceil(len(word) / 2)
+    return tokens + text.count("\n")
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shortens text to about `max_tokens`: long code blocks are elided in the middle
+    first, then the text itself keeps its head and tail around a marker.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    def elide_code(match: re.Match) -> str:
+        lines = match.group(1).splitlines()
+        if len(lines) <= 24:
+            return match.group(0)
+        header = match.group(0).split("\n", 1)[0]
+        kept = lines[:16] + [f"# ... (lược bớt {len(lines) - 20} dòng) ..."] + lines[-4:]
+        return header + "\n" + "\n".join(kept) + "\n```"
+
+    text = _CODE_BLOCK_PATTERN.sub(elide_code, text)
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return text
+
+    # Keep 2/3 of the budget from the start and 1/3 from the end, by character ratio
+    chars = max(int(len(text) * max_tokens / total) - 40, 0)
+    head = text[:chars * 2 // 3]
+    tail = text[len(text) - chars // 3:] if chars // 3 else ""
+    return f"{head}\n…[đã lược bớt {len(text) - len(head) - len(tail)} ký tự]…\n{tail}"
+
+class ContextTooLargeError(Exception):
+    """The current message cannot get its guaranteed share of the model's input budget."""
+
+class ContextPacker:
+    """
+    Chooses what goes into a prompt under the selected model's input budget:
+    context_window minus the requested output tokens, capped by CONTEXT_MAX_INPUT_TOKENS.
+
+    Priority order: system prompt (always kept), current message, session summary,
+    then recent turns from newest to oldest. A message larger than its share of the
+    budget is truncated rather than dropped, so one long code dump does not push out
+    the rest of the conversation. The current message is never cut below
+    CONTEXT_MIN_CURRENT_SHARE of the budget; if even that does not fit next to the
+    system prompt, ContextTooLargeError is raised. Token counts of stored messages are cached by id.
+    """
+
+    def __init__(self):
+        self.max_input_tokens = int(os.getenv("CONTEXT_MAX_INPUT_TOKENS", 16000))
+        # Largest share of the history budget a single message may take
+        self.max_message_share = float(os.getenv("CONTEXT_MAX_MESSAGE_SHARE", 0.4))
+        # Below this many tokens a truncated message is not worth including
+        self.min_message_tokens = 64
+        # Share of the budget the current message keeps when it has to be truncated
+        self.min_current_share = float(os.getenv("CONTEXT_MIN_CURRENT_SHARE", 0.25))
+        self.safety_margin = 0.05
+        self.token_cache_size = int(os.getenv("CONTEXT_TOKEN_CACHE_SIZE", 50000))
+        self._token_counts: "OrderedDict[str, int]" = OrderedDict()
+
+    def input_budget(self, model_name: str, max_output_tokens: int) -> int:
+        info = LLMConfig.get_model_info(model_name) or {}
+        context_window = info.get("context_window", FALLBACK_CONTEXT_WINDOW)
+        available = int(context_window * (1 - self.safety_margin)) - max_output_tokens
+        return max(min(available, self.max_input_tokens), 0)
+
+    def message_tokens(self, message: Message) -> int:
+        count = self._token_counts.get(message.id)
+        if count is not None:
+            self._token_counts.move_to_end(message.id)
+            return count
+        count = estimate_tokens(message.content)
+        self._token_counts[message.id] = count
+        if len(self._token_counts) > self.token_cache_size:
+            self._token_counts.popitem(last=False)
+        return count
+
+    def pack(
+        self,
+        budget: int,
+        system_prompt_tokens: int,
+        current_message: str,
+        summary: Optional[str],
+        messages: List[Message],
+        history_copies: int = 1,
+        message_copies: int = 1
+    ) -> Tuple[str, Optional[str], List[Message], int]:
+        """
+        Returns (current message, summary, recent messages oldest-first, estimated tokens),
+        each possibly truncated. `system_prompt_tokens` must not include the current message;
+        `history_copies` and `message_copies` are how many times the recent turns and the
+        current message appear in the final request.
+        """
+        remaining = budget - system_prompt_tokens
+        message_copies = max(message_copies, 1)
+
+        current_tokens = estimate_tokens(current_message)
+        current_budget = max(remaining, 0) // message_copies
+        if current_tokens > current_budget:
+            guaranteed = max(int(budget * self.min_current_share) // message_copies, self.min_message_tokens)
+            if current_budget < min(current_tokens, guaranteed):
+                raise ContextTooLargeError(
+                    f"Message needs at least {min(current_tokens, guaranteed)} of {budget} input tokens, "
+                    f"only {current_budget} left after the system prompt"
+                )
+            current_message = truncate_to_tokens(current_message, current_budget)
+            current_tokens = estimate_tokens(current_message)
+        remaining -= current_tokens * message_copies
+
+        if summary:
+            summary_tokens = estimate_tokens(summary)
+            if summary_tokens > remaining // 2:
+                summary = truncate_to_tokens(summary, remaining // 2) if remaining // 2 >= self.min_message_tokens else None
+                summary_tokens = estimate_tokens(summary)
+            remaining -= summary_tokens
+
+        history_budget = max(remaining, 0) // max(history_copies, 1)
+        message_cap = max(int(history_budget * self.max_message_share), self.min_message_tokens)
+        packed: List[Message] = []
+        used = 0
+        for message in reversed(messages):
+            tokens = self.message_tokens(message)
+            allowed = min(message_cap, history_budget - used)
+            if tokens > allowed:
+                if allowed < self.min_message_tokens:
+                    break
+                # Stored messages are shared with the message window: truncate a copy
+                message = message.model_copy(update={"content": truncate_to_tokens(message.content, allowed)})
+                tokens = estimate_tokens(message.content)
+            packed.append(message)
+            used += tokens
+
+        packed.reverse()
+        total = budget - remaining + used * max(history_copies, 1)
+        return current_message, summary, packed, total
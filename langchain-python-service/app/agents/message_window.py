@@ -0,0 +1,138 @@
+"""
+Message Window
+In-memory ring buffer of the most recent messages per chat session
+"""
+
+import bisect
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from app.agents.context_manager import Message
+
+class SessionWindow:
+    """Last `size` messages of one session, oldest first, deduplicated by id."""
+
+    def __init__(self, size: int, user_id: str, messages: List[Message]):
+        self.user_id = user_id
+        self.messages: Deque[Message] = deque(maxlen=size)
+        self.ids = set()
+        self.last_access = time.monotonic()
+        for message in messages:
+            self.add(message)
+
+    def add(self, message: Message):
+        if message.id in self.ids:
+            return
+        if self.messages and message.timestamp < self.messages[-1].timestamp:
+            if len(self.messages) == self.messages.maxlen and message.timestamp < self.messages[0].timestamp:
+                return  # Older than the whole window
+            # Notifications can arrive out of order: keep the buffer sorted by timestamp
+            ordered = list(self.messages)
+            ordered.insert(bisect.bisect_right([m.timestamp for m in ordered], message.timestamp), message)
+            self.messages.clear()
+            self.messages.extend(ordered)
+        else:
+            self.messages.append(message)
+        self.ids = {m.id for m in self.messages}
+
+    def remove(self, message_id: str) -> bool:
+        if message_id not in self.ids:
+            return False
+        self.messages = deque((m for m in self.messages if m.id != message_id), maxlen=self.messages.maxlen)
+        self.ids.discard(message_id)
+        return True
+
+class MessageWindowCache:
+    """
+    Bounded per-session message windows, shared by all turns handled by this worker.
+
+    - A window is filled from the database on first access, then kept current by
+      append() calls (chat_messages NOTIFY or the message-appended endpoint).
+    - Sessions are evicted LRU beyond `max_sessions`, and after `idle_ttl` seconds unused.
+    - Appends for sessions that are not cached are dropped, but remembered briefly so a
+      fill whose query started before the append is not cached (it may miss that message).
+    """
+
+    def __init__(self, window_size: int, max_sessions: int = 2000, idle_ttl: float = 1800):
+        self.window_size = window_size
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._windows: "OrderedDict[str, SessionWindow]" = OrderedDict()
+        self._missed_appends: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, session_id: str) -> Optional[List[Message]]:
+        window = self._windows.get(session_id)
+        now = time.monotonic()
+        if window is None or now - window.last_access > self.idle_ttl:
+            if window is not None:
+                del self._windows[session_id]
+            self.misses += 1
+            return None
+        window.last_access = now
+        self._windows.move_to_end(session_id)
+        self.hits += 1
+        return list(window.messages)
+
+    def fill(self, session_id: str, user_id: str, messages: List[Message], loaded_at: float):
+        """
+        Caches a window read from the database. `loaded_at` is the time.monotonic()
+        taken before the query; the fill is skipped if an append was missed since.
+        """
+        if self._missed_appends.get(session_id, float("-inf")) >= loaded_at:
+            return
+        self._windows[session_id] = SessionWindow(self.window_size, user_id, messages)
+        self._windows.move_to_end(session_id)
+        self._evict_overflow()
+
+    def append(self, session_id: str, message_id: str, role: str, content: str, created_at) -> bool:
+        """Adds a newly saved message to the session's window, if cached. Returns whether it was applied."""
+        window = self._windows.get(session_id)
+        if window is None:
+            self._missed_appends[session_id] = time.monotonic()
+            self._missed_appends.move_to_end(session_id)
+            while len(self._missed_appends) > self.max_sessions:
+                self._missed_appends.popitem(last=False)
+            return False
+        window.add(Message(
+            id=message_id,
+            role=role,
+            content=content,
+            timestamp=created_at,
+            session_id=session_id,
+            user_id=window.user_id
+        ))
+        return True
+
+    def remove(self, session_id: str, message_id: str):
+        window = self._windows.get(session_id)
+        if window is not None:
+            window.remove(message_id)
+
+    def evict(self, session_id: str):
+        self._windows.pop(session_id, None)
+        self._missed_appends[session_id] = time.monotonic()
+
+    def clear(self):
+        self._windows.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._windows),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _evict_overflow(self):
+        now = time.monotonic()
+        for session_id in [s for s, w in self._windows.items() if now - w.last_access > self.idle_ttl]:
+            del self._windows[session_id]
+            self.evictions += 1
+        while len(self._windows) > self.max_sessions:
+            self._windows.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,193 @@
+"""
+Session Summarizer
+Background rolling summary of the messages that left a session's recent-message window
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import asyncpg
+from loguru import logger
+
+from app.agents.context_packer import estimate_tokens
+from app.models.llm_config import LLMConfig
+from app.prompts.summary_prompts import SESSION_SUMMARY_PROMPT
+from app.services.cache_manager import cache_manager
+
+SUMMARY_LOCK_PREFIX = "session_summary_lock"
+
+# The stored summary plus the oldest not-yet-summarized messages outside the window
+# ($2 most recent messages are skipped, at most $3 returned, oldest first). A session
+# with nothing to fold yields one row whose message columns are NULL.
+PENDING_MESSAGES_QUERY = """
+    SELECT s.summary, s.summarized_until, m.id, m.role, m.content, m.created_at
+    FROM (SELECT $1::uuid AS session_id) requested
+    LEFT JOIN chat_session_summaries s ON s.session_id = requested.session_id
+    LEFT JOIN LATERAL (
+        SELECT id, role, content, created_at
+        FROM (
+            SELECT id, role, content, created_at,
+                   row_number() OVER (ORDER BY created_at DESC) AS recency
+            FROM chat_messages
+            WHERE session_id = requested.session_id
+              AND created_at > COALESCE(s.summarized_until, '-infinity'::timestamptz)
+        ) ranked
+        WHERE recency > $2
+        ORDER BY created_at
+        LIMIT $3
+    ) m ON true
+    ORDER BY m.created_at
+"""
+
+# Only moves forward, so a slower concurrent pass cannot overwrite a newer summary
+UPSERT_SUMMARY_QUERY = """
+    INSERT INTO chat_session_summaries (session_id, summary, summarized_until, message_count, updated_at)
+    VALUES ($1, $2, $3, $4, now())
+    ON CONFLICT (session_id) DO UPDATE
+    SET summary = EXCLUDED.summary,
+        summarized_until = EXCLUDED.summarized_until,
+        message_count = chat_session_summaries.message_count + EXCLUDED.message_count,
+        updated_at = now()
+    WHERE chat_session_summaries.summarized_until < EXCLUDED.summarized_until
+"""
+
+SummaryUpdatedHandler = Callable[[str], Awaitable[None]]
+
+class SessionSummarizer:
+    """
+    Folds messages that fell out of the recent-message window into a per-session
+    summary stored in chat_session_summaries.
+
+    Sessions are scheduled after chat turns; a pass runs once at least
+    `min_messages` messages or `min_tokens` estimated tokens are pending. Work runs on
+    a single low-priority worker with a cheap model; a full queue drops requests,
+    which the next turn of that session re-schedules. A Redis lock keeps replicas
+    from summarizing the same session at once.
+    """
+
+    def __init__(self, window_size: int, on_updated: Optional[SummaryUpdatedHandler] = None):
+        self.window_size = window_size
+        self.on_updated = on_updated
+        self.model_name = os.getenv("SESSION_SUMMARY_MODEL", "google/gemini-2.0-flash-lite-001")
+        self.min_messages = int(os.getenv("SESSION_SUMMARY_MIN_MESSAGES", 10))
+        self.min_tokens = int(os.getenv("SESSION_SUMMARY_MIN_TOKENS", 1500))
+        self.batch_size = int(os.getenv("SESSION_SUMMARY_BATCH_SIZE", 40))
+        self.max_words = int(os.getenv("SESSION_SUMMARY_MAX_WORDS", 250))
+        # Minimum seconds between two checks of the same session
+        self.check_interval = float(os.getenv("SESSION_SUMMARY_CHECK_INTERVAL", 60))
+        self.queue_size = int(os.getenv("SESSION_SUMMARY_QUEUE_SIZE", 500))
+        self.lock_timeout = 300
+        self._db_pool: Optional[asyncpg.Pool] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._queued: Set[str] = set()
+        self._last_checked: Dict[str, float] = {}
+
+    async def start(self, db_pool: asyncpg.Pool):
+        """Starts the background worker."""
+        if self._worker_task:
+            return
+        self._db_pool = db_pool
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_task = asyncio.create_task(self._worker())
+        logger.info(f"Session summarizer started (model: {self.model_name})")
+
+    async def stop(self):
+        if self._worker_task:
+            self._worker_task.cancel()
+            await asyncio.gather(self._worker_task, return_exceptions=True)
+            self._worker_task = None
+        logger.info("Session summarizer stopped.")
+
+    def schedule(self, session_id: str):
+        """Queues a summary check for a session; cheap and non-blocking, safe on the hot path."""
+        if self._queue is None or session_id in self._queued:
+            return
+        now = time.monotonic()
+        if now - self._last_checked.get(session_id, float("-inf")) < self.check_interval:
+            return
+        if self._queue.full():
+            return
+        self._last_checked[session_id] = now
+        if len(self._last_checked) > 4 * self.queue_size:
+            cutoff = now - self.check_interval
+            self._last_checked = {s: t for s, t in self._last_checked.items() if t >= cutoff}
+        self._queued.add(session_id)
+        self._queue.put_nowait(session_id)
+
+    async def _worker(self):
+        while True:
+            session_id = await self._queue.get()
+            try:
+                await self.summarize(session_id)
+            except Exception as e:
+                logger.warning(f"Summarizing session {session_id[:8]}... failed: {e}")
+            finally:
+                self._queued.discard(session_id)
+                self._queue.task_done()
+
+    async def summarize(self, session_id: str) -> bool:
+        """
+        Folds pending messages into the session summary, batch by batch, while the
+        thresholds are met. Returns whether the summary changed.
+        """
+        lock_key = cache_manager.build_key(SUMMARY_LOCK_PREFIX, session_id)
+        # Token-checked release: a pass that outlived lock_timeout must not free a lock
+        # another replica has taken over since
+        lock_token = await cache_manager.acquire_lock(lock_key, self.lock_timeout)
+        if not lock_token:
+            return False
+        updated = False
+        try:
+            while True:
+                async with self._db_pool.acquire() as conn:
+                    rows = await conn.fetch(PENDING_MESSAGES_QUERY, session_id, self.window_size, self.batch_size)
+                previous_summary = rows[0]['summary'] if rows else None
+                pending = [row for row in rows if row['id'] is not None]
+                if not self._should_summarize(pending):
+                    break
+
+                summary = await self._fold(previous_summary, pending)
+                if not summary:
+                    break
+                async with self._db_pool.acquire() as conn:
+                    await conn.execute(
+                        UPSERT_SUMMARY_QUERY, session_id, summary, pending[-1]['created_at'], len(pending)
+                    )
+                updated = True
+                logger.info(f"📝 [SUMMARY] Session {session_id[:8]}...: folded {len(pending)} messages")
+                if len(pending) < self.batch_size:
+                    break
+        finally:
+            await cache_manager.release_lock(lock_key, lock_token)
+
+        if updated and self.on_updated:
+            await self.on_updated(session_id)
+        return updated
+
+    def _should_summarize(self, pending: List[Dict]) -> bool:
+        if not pending:
+            return False
+        if len(pending) >= self.min_messages:
+            return True
+        return sum(estimate_tokens(row['content']) for row in pending) >= self.min_tokens
+
+    async def _fold(self, previous_summary: Optional[str], pending: List[Dict]) -> str:
+        messages = "\n".join(f"{row['role']}: {row['content']}" for row in pending)
+        prompt = SESSION_SUMMARY_PROMPT.format(
+            previous_summary=previous_summary or "Chưa có tóm tắt.",
+            messages=messages,
+            max_words=self.max_words
+        )
+        llm = LLMConfig.get_llm(
+            model_name=self.model_name,
+            temperature=0.2,
+            max_tokens=1024,
+            streaming=False
+        )
+        response = await llm.ainvoke(prompt)
+        content = response.content
+        if isinstance(content, list):
+            content = " ".join(str(item) for item in content)
+        return str(content).strip()
@@ -3,18 +3,117 @@ Smart Context Manager
 Simple but effective context management for AI conversations
 """
 
-import asyncio
 import asyncpg
 import os
 import time
 import re
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from loguru import logger
 from pydantic import BaseModel
 
 from app.agents.context_manager import Message
+from app.agents.message_window import MessageWindowCache
+from app.agents.context_packer import ContextPacker, estimate_tokens
+from app.agents.session_summarizer import SessionSummarizer
 from app.services.cache_manager import cache_manager
+from app.services.cache_invalidation import cache_invalidation_listener
+from app.services.db_statement_mode import PREPARED, pool_kwargs, resolve_statement_mode
+
+SESSION_INFO_NAMESPACE = cache_manager.register_namespace("session_info")
+SESSION_LOOKUP_NAMESPACE = cache_manager.register_namespace("session_lookup")
+
+RECENT_MESSAGES_QUERY = """
+    SELECT role, content, created_at, id
+    FROM chat_messages
+    WHERE session_id = $1
+    ORDER BY created_at DESC
+    LIMIT $2
+"""
+
+# Session titles and summary plus the last N messages (newest first) in one statement.
+# A session without messages yields one row whose message columns are NULL.
+CONTEXT_QUERY = """
+    SELECT lt.title AS topic_title,
+           tn.title AS node_title,
+           ss.summary,
+           m.role, m.content, m.created_at, m.id
+    FROM chat_sessions cs
+    LEFT JOIN learning_topics lt ON cs.topic_id = lt.id
+    LEFT JOIN tree_nodes tn ON cs.node_id = tn.id
+    LEFT JOIN chat_session_summaries ss ON ss.session_id = cs.id
+    LEFT JOIN LATERAL (
+        SELECT id, role, content, created_at
+        FROM chat_messages
+        WHERE session_id = cs.id
+        ORDER BY created_at DESC
+        LIMIT $2
+    ) m ON true
+    WHERE cs.id = $1
+    ORDER BY m.created_at DESC
+"""
+
+# Resolves a session in one statement: the requested session if it belongs to the user,
+# else the latest one for (user, topic, node), else a newly inserted one. A concurrent
+# insert makes ON CONFLICT DO NOTHING return no row; the caller then simply re-runs it.
+RESOLVE_SESSION_QUERY = """
+    WITH requested AS (
+        SELECT id FROM chat_sessions
+        WHERE $4::uuid IS NOT NULL AND id = $4::uuid AND user_id = $1::uuid
+    ),
+    latest AS (
+        SELECT id FROM chat_sessions
+        WHERE user_id = $1::uuid AND topic_id = $2::uuid AND node_id IS NOT DISTINCT FROM $3::uuid
+        ORDER BY last_activity DESC
+        LIMIT 1
+    ),
+    inserted AS (
+        INSERT INTO chat_sessions (user_id, topic_id, node_id)
+        SELECT $1::uuid, $2::uuid, $3::uuid
+        WHERE NOT EXISTS (SELECT 1 FROM requested) AND NOT EXISTS (SELECT 1 FROM latest)
+        ON CONFLICT DO NOTHING
+        RETURNING id
+    )
+    SELECT id, source FROM (
+        SELECT id, 'requested' AS source, 1 AS priority FROM requested
+        UNION ALL SELECT id, 'latest', 2 FROM latest
+        UNION ALL SELECT id, 'inserted', 3 FROM inserted
+    ) AS candidates
+    ORDER BY priority
+    LIMIT 1
+"""
+
+# Statements run on every chat turn, with placeholder arguments that match no rows.
+# Prepared up front when named statements are usable.
+PLACEHOLDER_UUID = "00000000-0000-0000-0000-000000000000"
+HOT_STATEMENTS = (
+    (RESOLVE_SESSION_QUERY, (PLACEHOLDER_UUID, PLACEHOLDER_UUID, None, None)),
+    (CONTEXT_QUERY, (PLACEHOLDER_UUID, 1)),
+    (RECENT_MESSAGES_QUERY, (PLACEHOLDER_UUID, 1)),
+)
+
+async def warm_up_statements(conn: asyncpg.Connection) -> int:
+    """
+    Runs each hot statement once inside a rolled-back transaction, so it lands in the
+    connection's statement cache that fetch()/fetchrow() use. Returns how many were
+    prepared; a failing statement (e.g. a table not migrated yet) is logged and skipped.
+    """
+    prepared = 0
+    for query, args in HOT_STATEMENTS:
+        try:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                await conn.fetch(query, *args)
+            except asyncpg.IntegrityConstraintViolationError:
+                # The placeholder session insert is rejected after the statement was prepared
+                pass
+            finally:
+                await transaction.rollback()
+            prepared += 1
+        except Exception as e:
+            logger.warning(f"Statement warm-up failed, it will be prepared on first use: {e}")
+    return prepared
 
 class SmartContextPackage(BaseModel):
     """Simplified context package with essential information"""
@@ -31,14 +130,31 @@ class SmartContextManager:
 
     def __init__(self):
         self.db_pool: Optional[asyncpg.Pool] = None
+        self.statement_mode: Optional[str] = None
         self.recent_messages_limit = 15
-        self.max_context_tokens = 1500
+        self.packer = ContextPacker()
+        # Session info is evicted on change via LISTEN/NOTIFY, so it can live for days
+        self.session_info_ttl = 3 * 86400
+        # Recent messages per session, updated in place as messages are saved
+        self.message_windows = MessageWindowCache(
+            self.recent_messages_limit,
+            max_sessions=int(os.getenv("MESSAGE_WINDOW_MAX_SESSIONS", 2000)),
+            idle_ttl=float(os.getenv("MESSAGE_WINDOW_IDLE_TTL", 1800))
+        )
+        # Folds messages that leave the window into chat_session_summaries
+        self.summarizer = SessionSummarizer(self.recent_messages_limit, on_updated=self._on_summary_updated)
 
         self.standalone_patterns = [
             r"^(xin )?chào", r"bạn là ai", r"hello", r"hi there",
             r"kể.*chuyện cười", r"bắt đầu lại", r"làm mới cuộc trò chuyện"
         ]
         
+        cache_invalidation_listener.register("learning_topics", self._on_topic_changed)
+        cache_invalidation_listener.register("tree_nodes", self._on_node_changed)
+        cache_invalidation_listener.register("chat_sessions", self._on_session_changed)
+        cache_invalidation_listener.register("chat_messages", self._on_message_changed)
+        cache_invalidation_listener.register_resync(self._on_invalidation_resync)
+        
         logger.info("Smart Context Manager initialized")
 
     async def init_db(self):
@@ -49,17 +165,23 @@ class SmartContextManager:
             if database_url.startswith("postgres://"):
                 database_url = database_url.replace("postgres://", "postgresql://", 1)
             
+            self.statement_mode, database_url = resolve_statement_mode(database_url)
             self.db_pool = await asyncpg.create_pool(
                 database_url, 
                 min_size=5, 
                 max_size=20,
-                statement_cache_size=0
+                init=self._warm_up_connection if self.statement_mode == PREPARED else None,
+                **pool_kwargs(self.statement_mode)
             )
-            logger.info("Smart Context Manager DB connection ready")
+            logger.info(f"Smart Context Manager DB connection ready (statements: {self.statement_mode})")
         except Exception as e:
             logger.error(f"Failed to create DB pool: {e}")
             raise
 
+    async def _warm_up_connection(self, conn: asyncpg.Connection):
+        """Prepares the hot statements on each new pool connection, so the first turns skip parse/plan."""
+        await warm_up_statements(conn)
+
     async def close(self):
         if self.db_pool:
             await self.db_pool.close()
@@ -68,38 +190,41 @@ class SmartContextManager:
                                   session_id: Optional[str] = None,
                                   topic_id: Optional[str] = None, 
                                   node_id: Optional[str] = None) -> str:
+        """
+        Resolves the chat session for a turn: the given session if it belongs to the user,
+        else the latest one for (user, topic, node), else a new one. Answers from the
+        session lookup cache when possible; otherwise runs RESOLVE_SESSION_QUERY once.
+        """
         if not self.db_pool:
             raise RuntimeError("DB pool not initialized")
-        
+
+        lookup_key = cache_manager.namespaced_key(SESSION_LOOKUP_NAMESPACE, user_id, topic_id, node_id)
+        owner_key = cache_manager.namespaced_key(SESSION_LOOKUP_NAMESPACE, "owner", session_id)
+        if session_id:
+            owner, cached_session_id = await cache_manager.mget_json([owner_key, lookup_key])
+            if owner == user_id:
+                return session_id
+        else:
+            cached_session_id = await cache_manager.get_json(lookup_key)
+        if cached_session_id and not session_id:
+            return cached_session_id
+
         async with self.db_pool.acquire() as conn:
-            # If session_id is provided, verify it exists and belongs to the user.
-            if session_id:
-                existing_id = await conn.fetchval(
-                    "SELECT id FROM chat_sessions WHERE id = $1 AND user_id = $2",
-                    session_id, user_id
-                )
-                if existing_id:
-                    return str(existing_id)
-
-            # Find the latest session for the user/topic/node combination.
-            query = """
-                SELECT id FROM chat_sessions 
-                WHERE user_id = $1 AND topic_id = $2 AND node_id IS NOT DISTINCT FROM $3
-                ORDER BY last_activity DESC 
-                LIMIT 1
-            """
-            session_record = await conn.fetchrow(query, user_id, topic_id, node_id)
-            
-            if session_record:
-                return str(session_record['id'])
-
-            # If no session found, create a new one.
-            logger.info(f"No session for topic {topic_id}, node {node_id}. Creating new one for user {user_id}...")
-            result = await conn.fetchrow(
-                "INSERT INTO chat_sessions (user_id, topic_id, node_id) VALUES ($1, $2, $3) RETURNING id",
-                user_id, topic_id, node_id
-            )
-            return str(result['id'])
+            row = await conn.fetchrow(RESOLVE_SESSION_QUERY, user_id, topic_id, node_id, session_id)
+            if row is None:
+                # Lost an insert race to a concurrent first message: the winner's row is visible now
+                row = await conn.fetchrow(RESOLVE_SESSION_QUERY, user_id, topic_id, node_id, session_id)
+        if row is None:
+            raise RuntimeError(f"Could not resolve a chat session for topic {topic_id}, node {node_id}")
+
+        resolved_id = str(row['id'])
+        if row['source'] == "inserted":
+            logger.info(f"No session for topic {topic_id}, node {node_id}. Created new one for user {user_id}...")
+        async with cache_manager.pipeline() as pipe:
+            pipe.set_json(cache_manager.namespaced_key(SESSION_LOOKUP_NAMESPACE, "owner", resolved_id), user_id, ttl=self.session_info_ttl)
+            if row['source'] != "requested":
+                pipe.set_json(lookup_key, resolved_id, ttl=self.session_info_ttl)
+        return resolved_id
 
     async def get_smart_context(self, session_id: str, user_id: str, message: str) -> SmartContextPackage:
         start_time = time.time()
@@ -114,39 +239,33 @@ class SmartContextManager:
             raise RuntimeError("DB pool not initialized")
             
         try:
-            async with self.db_pool.acquire() as conn:
-                recent_task = self._get_recent_messages(session_id, conn)
-                session_task = self._get_session_info(session_id, conn)
-                recent_messages_rows, session_info = await asyncio.gather(recent_task, session_task)
-                
-                logger.debug(f"🔍 [CONTEXT] Found {len(recent_messages_rows)} recent messages")
-                
-                relevance_score = self._calculate_relevance(message, session_info.get('topic_context'))
-                
-                # Pass user_id to correctly construct Message objects
-                converted_messages = self._convert_to_messages(recent_messages_rows, user_id)
-                
-                estimated_tokens = self._estimate_tokens(converted_messages, session_info.get('summary'))
-                
-                logger.debug(f"🔍 [CONTEXT] Relevance score: {relevance_score:.3f}, Tokens: {estimated_tokens}")
-                
-                context = SmartContextPackage(
-                    recent_messages=converted_messages,
-                    session_summary=session_info.get('summary'),
-                    topic_context=session_info.get('topic_context'),
-                    estimated_tokens=estimated_tokens,
-                    relevance_score=relevance_score
-                )
-                
-                if context.estimated_tokens > self.max_context_tokens:
-                    logger.debug(f"⚡ [CONTEXT] Optimizing context: {context.estimated_tokens} > {self.max_context_tokens}")
-                    context = self._optimize_context(context)
-                
-                processing_time = time.time() - start_time
-                logger.info(f"✅ [CONTEXT] Built in {processing_time:.3f}s - {context.estimated_tokens} tokens, relevance: {context.relevance_score:.3f}")
-                
-                return context
-                
+            # At most one round trip: asyncpg cannot run two statements concurrently on one connection
+            converted_messages, session_info = await self._fetch_context(session_id, user_id)
+            
+            logger.debug(f"🔍 [CONTEXT] Found {len(converted_messages)} recent messages")
+            if len(converted_messages) >= self.recent_messages_limit:
+                # Older messages may have left the window: let the summarizer fold them in
+                self.summarizer.schedule(session_id)
+            
+            relevance_score = self._calculate_relevance(message, session_info.get('topic_context'))
+            
+            estimated_tokens = self._estimate_tokens(converted_messages, session_info.get('summary'))
+            
+            logger.debug(f"🔍 [CONTEXT] Relevance score: {relevance_score:.3f}, Tokens: {estimated_tokens}")
+            
+            context = SmartContextPackage(
+                recent_messages=converted_messages,
+                session_summary=session_info.get('summary'),
+                topic_context=session_info.get('topic_context'),
+                estimated_tokens=estimated_tokens,
+                relevance_score=relevance_score
+            )
+            
+            processing_time = time.time() - start_time
+            logger.info(f"✅ [CONTEXT] Built in {processing_time:.3f}s - {context.estimated_tokens} tokens, relevance: {context.relevance_score:.3f}")
+            
+            return context
+            
         except Exception as e:
             logger.error(f"Error getting context: {e}")
             return SmartContextPackage(is_relevant=False)
@@ -155,63 +274,125 @@ class SmartContextManager:
         message_lower = message.lower()
         return any(re.search(pattern, message_lower) for pattern in self.standalone_patterns)
 
-    async def _get_recent_messages(self, session_id: str, conn: asyncpg.Connection) -> List[Dict]:
-        rows = await conn.fetch("""
-            SELECT role, content, created_at, id
-            FROM chat_messages 
-            WHERE session_id = $1 
-            ORDER BY created_at DESC 
-            LIMIT $2
-        """, session_id, self.recent_messages_limit)
-        return list(reversed([dict(row) for row in rows]))
-
-    async def _get_session_info(self, session_id: str, conn: asyncpg.Connection) -> Dict:
-        cache_key = f"session_info_v2:{session_id}"
+    async def _fetch_context(self, session_id: str, user_id: str) -> Tuple[List[Message], Dict]:
+        """
+        Returns (recent messages oldest-first, session info). No DB access when both the
+        message window and session info are cached; otherwise a single round trip:
+        the messages when only session info is cached, else CONTEXT_QUERY.
+        """
+        cache_key = cache_manager.namespaced_key(SESSION_INFO_NAMESPACE, session_id)
         cached = await cache_manager.get_json(cache_key)
+        window = self.message_windows.get(session_id)
+        if cached and window is not None:
+            return window, cached
+
+        loaded_at = time.monotonic()
+        async with self.db_pool.acquire() as conn:
+            if cached:
+                rows = await conn.fetch(RECENT_MESSAGES_QUERY, session_id, self.recent_messages_limit)
+            else:
+                rows = await conn.fetch(CONTEXT_QUERY, session_id, self.recent_messages_limit)
+
+        if not rows and not cached:
+            return [], {}
+
+        # Pass user_id to correctly construct Message objects
+        messages = self._convert_to_messages(
+            [row for row in reversed(rows) if row['id'] is not None], session_id, user_id
+        )
+        self.message_windows.fill(session_id, user_id, messages, loaded_at)
         if cached:
-            return cached
-            
-        row = await conn.fetchrow("""
-            SELECT lt.title as topic_title, 
-                   tn.title as node_title
-            FROM chat_sessions cs
-            LEFT JOIN learning_topics lt ON cs.topic_id = lt.id
-            LEFT JOIN tree_nodes tn ON cs.node_id = tn.id
-            WHERE cs.id = $1
-        """, session_id)
-        
-        if not row:
-            return {}
-            
-        topic_context = None
-        if row['topic_title']:
-            topic_context = f"Topic: {row['topic_title']}"
-            if row['node_title']:
-                topic_context += f", Node: {row['node_title']}"
-        
-        info = {'topic_context': topic_context, 'summary': None}
-        
-        await cache_manager.set_json(cache_key, info, ttl=3600)
-        return info
+            return messages, cached
+
+        info = {
+            'topic_context': self._build_topic_context(rows[0]['topic_title'], rows[0]['node_title']),
+            'summary': rows[0]['summary']
+        }
+        await cache_manager.set_json(cache_key, info, ttl=self.session_info_ttl)
+        return messages, info
+
+    def record_message(self, session_id: str, message_id: str, role: str, content: str, created_at: datetime) -> bool:
+        """Applies a newly saved message to the session's cached window. Returns whether it was cached."""
+        return self.message_windows.append(session_id, message_id, role, content, created_at)
+
+    def _build_topic_context(self, topic_title: Optional[str], node_title: Optional[str]) -> Optional[str]:
+        if not topic_title:
+            return None
+        topic_context = f"Topic: {topic_title}"
+        if node_title:
+            topic_context += f", Node: {node_title}"
+        return topic_context
+
+    async def _on_topic_changed(self, event: Dict[str, Any]):
+        await self._evict_sessions_where("topic_id", event["id"])
+
+    async def _on_node_changed(self, event: Dict[str, Any]):
+        await self._evict_sessions_where("node_id", event["id"])
+
+    async def _on_session_changed(self, event: Dict[str, Any]):
+        await self._evict_session_info([event["id"]])
+        self.message_windows.evict(event["id"])
+        # The (user, topic, node) lookup and ownership entries may point at this session
+        async with cache_manager.pipeline() as pipe:
+            pipe.delete(cache_manager.namespaced_key(SESSION_LOOKUP_NAMESPACE, "owner", event["id"]))
+            if "user_id" in event:
+                pipe.delete(cache_manager.namespaced_key(
+                    SESSION_LOOKUP_NAMESPACE, event["user_id"], event["topic_id"], event["node_id"]
+                ))
 
-    def _convert_to_messages(self, rows: List[Dict], user_id: str) -> List[Message]:
+    async def _on_message_changed(self, event: Dict[str, Any]):
+        session_id = event["session_id"]
+        if event["op"] == "DELETE":
+            self.message_windows.remove(session_id, event["id"])
+        elif "content" in event:
+            self.record_message(
+                session_id, event["id"], event["role"], event["content"],
+                datetime.fromisoformat(event["created_at"])
+            )
+        else:
+            # Content too large for a NOTIFY payload: reload the window on next access
+            self.message_windows.evict(session_id)
+
+    async def _on_summary_updated(self, session_id: str):
+        await self._evict_session_info([session_id])
+
+    async def _evict_sessions_where(self, column: str, value: str):
+        """Evicts the cached info of every session attached to a renamed topic or node."""
+        if not self.db_pool:
+            return
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT id FROM chat_sessions WHERE {column} = $1", value)
+        await self._evict_session_info([str(row['id']) for row in rows])
+
+    async def _evict_session_info(self, session_ids: List[str]):
+        if not session_ids:
+            return
+        async with cache_manager.pipeline() as pipe:
+            for session_id in session_ids:
+                pipe.delete(cache_manager.namespaced_key(SESSION_INFO_NAMESPACE, session_id))
+        logger.debug(f"Evicted cached info of {len(session_ids)} session(s)")
+
+    async def _on_invalidation_resync(self):
+        # Changes made while the listener was disconnected are unknown: retire all session info
+        await cache_manager.bump_namespace(SESSION_INFO_NAMESPACE)
+        await cache_manager.bump_namespace(SESSION_LOOKUP_NAMESPACE)
+        self.message_windows.clear()
+
+    def _convert_to_messages(self, rows: List[Dict], session_id: str, user_id: str) -> List[Message]:
         return [
             Message(
                 id=str(r['id']),
                 role=r['role'],
                 content=r['content'],
                 timestamp=r['created_at'],
-                session_id=str(r.get('session_id')), # session_id is not in the select, but it should be passed
+                session_id=session_id,
                 user_id=user_id # User ID is consistent for the whole session
             )
             for r in rows
         ]
 
     def _estimate_tokens(self, messages: List[Message], summary: Optional[str]) -> int:
-        total = sum(len(msg.content) for msg in messages) // 4
-        if summary:
-            total += len(summary) // 4
-        return total
+        return sum(self.packer.message_tokens(msg) for msg in messages) + estimate_tokens(summary)
 
     def _calculate_relevance(self, message: str, topic_context: Optional[str]) -> float:
         if not topic_context or not message:
@@ -228,23 +409,40 @@ class SmartContextManager:
         
         return intersection / union if union > 0 else 0.0
 
-    def _optimize_context(self, context: SmartContextPackage) -> SmartContextPackage:
-        if not context.recent_messages:
-            return context
-            
-        optimized_messages = []
-        current_tokens = 0
-        
-        for message in reversed(context.recent_messages):
-            message_tokens = len(message.content) // 4
-            if current_tokens + message_tokens <= self.max_context_tokens:
-                optimized_messages.insert(0, message)
-                current_tokens += message_tokens
-            else:
-                break
-                
-        context.recent_messages = optimized_messages
-        context.estimated_tokens = current_tokens
-        
-        logger.debug(f"Context optimized to {len(optimized_messages)} messages, {current_tokens} tokens")
-        return context 
\ No newline at end of file
+    def pack_context(
+        self,
+        context: SmartContextPackage,
+        model_name: str,
+        system_prompt: str,
+        message: str,
+        max_output_tokens: int,
+        history_copies: int = 1,
+        message_copies: int = 1
+    ) -> Tuple[SmartContextPackage, str]:
+        """
+        Fits the context into the selected model's input budget. `system_prompt` is the
+        prompt without summary, history and current message. Returns the packed context and
+        the current message, truncated only if it alone exceeds the budget.
+        Raises ContextTooLargeError if the message cannot keep its guaranteed share.
+        """
+        budget = self.packer.input_budget(model_name, max_output_tokens)
+        message, summary, recent_messages, total_tokens = self.packer.pack(
+            budget,
+            estimate_tokens(system_prompt),
+            message,
+            context.session_summary,
+            context.recent_messages,
+            history_copies=history_copies,
+            message_copies=message_copies
+        )
+        if len(recent_messages) < len(context.recent_messages) or summary != context.session_summary:
+            logger.debug(
+                f"⚡ [CONTEXT] Packed for {model_name}: {len(recent_messages)}/{len(context.recent_messages)} messages, "
+                f"{total_tokens}/{budget} tokens"
+            )
+        packed = context.model_copy(update={
+            "recent_messages": recent_messages,
+            "session_summary": summary,
+            "estimated_tokens": total_tokens
+        })
+        return packed, message
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
@@ -15,17 +15,23 @@ import re
 from app.models.llm_config import LLMConfig
 from app.agents.simplified_orchestrator import SimplifiedOrchestrator
 from app.agents.smart_context_manager import SmartContextManager
+from app.agents.context_packer import ContextTooLargeError
 from app.agents.conversation_intelligence import ConversationIntelligence
 from app.prompts.core_prompts import MASTER_SYSTEM_PROMPT
 from app.prompts.personas import SOCRATIC_MENTOR, CREATIVE_EXPLORER, PRAGMATIC_ENGINEER, DIRECT_INSTRUCTOR
 from app.services.model_router_service import model_router
 from app.services.cache_manager import cache_manager
+from app.services.learning_path_jobs import learning_path_jobs
+from app.services.cache_invalidation import cache_invalidation_listener
 from app.prompts.domain_instructions import DOMAIN_INSTRUCTIONS_MAP
 from app.config.model_router_config import Domain
 from app.routes import learning_path_routes
 
 load_dotenv()
 
+# Response length for /smart-chat; also reserved out of the model's context window
+MAX_OUTPUT_TOKENS = 2000
+
 # Context manager for app lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -33,9 +39,17 @@ async def lifespan(app: FastAPI):
     logger.info("Starting simplified langchain-python service...")
     await smart_context_manager.init_db()
     await cache_manager.connect()
+    await cache_invalidation_listener.start()
+    await smart_context_manager.summarizer.start(smart_context_manager.db_pool)
+    await LLMConfig.warm_up()
+    await learning_path_jobs.start()
     yield
     # Shutdown
     logger.info("Shutting down langchain-python service...")
+    await learning_path_jobs.stop()
+    await smart_context_manager.summarizer.stop()
+    await cache_invalidation_listener.stop()
+    await LLMConfig.close()
     await cache_manager.close()
     await smart_context_manager.close()
 
@@ -88,6 +102,16 @@ class SmartChatRequest(BaseModel):
     node_id: Optional[str] = None
     model: Optional[str] = "google/gemini-2.0-flash-lite-001"
 
+class AppendedMessage(BaseModel):
+    id: str
+    role: str
+    content: str
+    created_at: datetime
+
+class MessagesAppendedRequest(BaseModel):
+    session_id: str
+    messages: List[AppendedMessage]
+
 class SmartChatResponse(BaseModel):
     response: str
     model_used: str
@@ -146,9 +170,25 @@ async def health():
         "openrouter_configured": bool(os.getenv("OPENROUTER_API_KEY")),
         "database_configured": bool(os.getenv("DATABASE_URL")),
         "models_available": LLMConfig.get_available_models(),
+        "cache": await cache_manager.topology(),
+        "message_window": smart_context_manager.message_windows.stats(),
         "architecture": "simplified"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Cache metrics in the Prometheus text format"""
+    return PlainTextResponse(await cache_manager.render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/context/messages")
+async def messages_appended(request: MessagesAppendedRequest):
+    """Called by backend-main after it saves chat messages, to update the cached message window"""
+    applied = sum(
+        smart_context_manager.record_message(request.session_id, m.id, m.role, m.content, m.created_at)
+        for m in request.messages
+    )
+    return {"session_id": request.session_id, "applied": applied}
+
 @app.post("/smart-chat")
 async def smart_chat(request: SmartChatRequest):
     """Intelligent chat với simplified but powerful architecture"""
@@ -219,6 +259,28 @@ async def smart_chat(request: SmartChatRequest):
             logger.debug(f"🚀 [SMART-CHAT] Step 6: Building system prompt...")
             domain_instructions = conversation_intelligence.get_domain_instructions(detected_domain)
             output_guidance = conversation_intelligence.get_output_style_guidance(analysis.output_style)
+            prompt_fields = {
+                "persona_description": analysis.selected_persona,
+                "domain_specific_instructions": domain_instructions,
+                "topic_context": context.topic_context or "Không có chủ đề cụ thể.",
+                "relevance_guidance": analysis.relevance_guidance,
+                "output_style_guidance": output_guidance
+            }
+            
+            # Fit summary and history into the selected model's budget. The history is sent
+            # twice (in the system prompt and as chat messages), as is the user message;
+            # the packer counts both copies, so the prompt is measured without them.
+            context, user_message = smart_context_manager.pack_context(
+                context,
+                model_name=selected_model,
+                system_prompt=MASTER_SYSTEM_PROMPT.format(
+                    **prompt_fields, summary="", history="", user_message=""
+                ),
+                message=request.message,
+                max_output_tokens=MAX_OUTPUT_TOKENS,
+                history_copies=2,
+                message_copies=2
+            )
             
             # Build conversation history string
             history_str = "\n".join([
@@ -227,14 +289,10 @@ async def smart_chat(request: SmartChatRequest):
             logger.debug(f"🚀 [SMART-CHAT] History: {len(context.recent_messages)} messages")
             
             system_prompt = MASTER_SYSTEM_PROMPT.format(
-                persona_description=analysis.selected_persona,
-                domain_specific_instructions=domain_instructions,
-                topic_context=context.topic_context or "Không có chủ đề cụ thể.",
+                **prompt_fields,
                 summary=context.session_summary or "Không có tóm tắt.",
                 history=history_str or "Đây là tin nhắn đầu tiên.",
-                user_message=request.message,
-                relevance_guidance=analysis.relevance_guidance,
-                output_style_guidance=output_guidance
+                user_message=user_message
             )
             logger.debug(f"🚀 [SMART-CHAT] System prompt built ({len(system_prompt)} chars)")
             
@@ -266,13 +324,13 @@ async def smart_chat(request: SmartChatRequest):
             chunk_count = 0
             
             async for chunk in orchestrator.chat_stream(
-                message=request.message,
+                message=user_message,
                 context=context,
                 analysis=analysis,
                 system_prompt=system_prompt,
                 model_name=selected_model,
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=MAX_OUTPUT_TOKENS
             ):
                 if chunk and not chunk.startswith("[LỖI:"):
                     full_response += chunk
@@ -317,6 +375,15 @@ async def smart_chat(request: SmartChatRequest):
             }
             yield f"data: {json.dumps(completion)}\n\n"
             
+        except ContextTooLargeError as e:
+            logger.warning(f"❌ [SMART-CHAT] Message too large: {e}")
+            error_data = {
+                "type": "error",
+                "status": 413,
+                "error": "Tin nhắn quá dài, vui lòng rút gọn và thử lại",
+                "details": str(e)
+            }
+            yield f"data: {json.dumps(error_data)}\n\n"
         except Exception as e:
             logger.error(f"❌ [SMART-CHAT] Error: {e}")
             logger.debug(f"❌ [SMART-CHAT] Error details: {type(e).__name__}: {str(e)}")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 class GeneratePathRequest(BaseModel):
     """Request model for generating a learning path."""
@@ -26,4 +26,20 @@ class LearningPathResponse(BaseModel):
     """Response model for a generated learning path."""
     topicName: str
     description: str
-    tree: List[LearningNode] 
\ No newline at end of file
+    tree: List[LearningNode] 
+
+class RegenerateSubtreeRequest(BaseModel):
+    """Request model for regenerating or expanding a single subtree of an existing path."""
+    topicName: str
+    description: str = ""
+    tree: List[LearningNode]
+    target_temp_id: str = Field(
+        ...,
+        description="The temp_id of the node whose subtree should be regenerated.",
+        examples=["2.1"]
+    )
+    message: Optional[str] = Field(
+        None,
+        description="Optional instruction for the new subtree.",
+        examples=["thêm ví dụ thực hành với docker compose"]
+    )
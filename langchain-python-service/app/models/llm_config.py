@@ -1,12 +1,34 @@
 import os
-from typing import Dict, List, Optional
+import json
+import importlib.util
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import httpx
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 from loguru import logger
 
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
 class LLMConfig:
     """Configuration cho OpenRouter LLM models"""
     
+    # Process-wide registry: (model, generation settings) -> ChatOpenAI instance.
+    # LRU-bounded, since model names and kwargs come from callers
+    _llm_registry: "OrderedDict[Tuple, ChatOpenAI]" = OrderedDict()
+    _llm_registry_max_size = int(os.getenv("LLM_REGISTRY_MAX_SIZE", 64))
+    # Shared keep-alive HTTP client cho tất cả LLM instances
+    _http_async_client: Optional[httpx.AsyncClient] = None
+    
+    # Configurations được dùng trên hot path, tạo sẵn lúc startup
+    WARM_UP_CONFIGS = [
+        {"model_name": "google/gemini-2.0-flash-lite-001", "temperature": 0.0, "max_tokens": 512},
+        {"model_name": "google/gemini-2.5-flash", "temperature": 0.4, "max_tokens": 8192},
+        {"model_name": "google/gemini-2.5-flash", "temperature": 0.4, "max_tokens": 8192, "streaming": True},
+        {"model_name": "google/gemini-2.0-flash-lite-001", "temperature": 0.3, "max_tokens": 512},
+        {"model_name": "google/gemini-2.0-flash-lite-001", "temperature": 0.7, "max_tokens": 2000, "streaming": True, "enable_retry": False},
+    ]
+    
     # Available models với metadata
     AVAILABLE_MODELS = {
         "openai/gpt-4o-mini": {
@@ -85,18 +107,77 @@ class LLMConfig:
         enable_retry: bool = True,
         **kwargs
     ) -> ChatOpenAI:
-        """Factory method để tạo OpenRouter LLM instance"""
+        """
+        Trả về OpenRouter LLM instance từ registry, tạo mới nếu chưa có.
+        Instances được key theo model và generation settings, và dùng chung một connection pool.
+        """
         model = model_name or LLMConfig.get_default_model()
-        model_config = LLMConfig.AVAILABLE_MODELS.get(model, LLMConfig.AVAILABLE_MODELS[LLMConfig.get_default_model()])
         
-        return LLMConfig._create_openrouter_llm(
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            streaming=streaming,  # Pass streaming parameter
-            enable_retry=enable_retry,
-            **kwargs
-        )
+        key = LLMConfig._registry_key(model, temperature, max_tokens, streaming, enable_retry, kwargs)
+        llm = LLMConfig._llm_registry.get(key)
+        if llm is None:
+            llm = LLMConfig._create_openrouter_llm(
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                streaming=streaming,  # Pass streaming parameter
+                enable_retry=enable_retry,
+                **kwargs
+            )
+            LLMConfig._llm_registry[key] = llm
+            if len(LLMConfig._llm_registry) > LLMConfig._llm_registry_max_size:
+                LLMConfig._llm_registry.popitem(last=False)
+            logger.debug(f"LLM registry: created {model} (registry size: {len(LLMConfig._llm_registry)})")
+        else:
+            LLMConfig._llm_registry.move_to_end(key)
+        return llm
+    
+    @staticmethod
+    def _registry_key(model: str, temperature: float, max_tokens: int, streaming: bool, enable_retry: bool, kwargs: Dict) -> Tuple:
+        """Build a hashable registry key from model and generation settings"""
+        extra = json.dumps(kwargs, sort_keys=True, default=str) if kwargs else ""
+        return (model, float(temperature), int(max_tokens), bool(streaming), bool(enable_retry), extra)
+    
+    @classmethod
+    def get_http_async_client(cls) -> httpx.AsyncClient:
+        """Shared keep-alive HTTP client (HTTP/2 khi có package h2) cho OpenRouter"""
+        if cls._http_async_client is None or cls._http_async_client.is_closed:
+            http2_enabled = importlib.util.find_spec("h2") is not None
+            cls._http_async_client = httpx.AsyncClient(
+                http2=http2_enabled,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100)),
+                    max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 20)),
+                    keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 120)),
+                ),
+                timeout=httpx.Timeout(30.0, connect=10.0),
+            )
+            logger.info(f"LLM HTTP client created (http2={http2_enabled})")
+        return cls._http_async_client
+    
+    @classmethod
+    async def warm_up(cls):
+        """Pre-create hot LLM instances và mở sẵn connection tới OpenRouter"""
+        if not os.getenv("OPENROUTER_API_KEY"):
+            logger.warning("OPENROUTER_API_KEY not set - skipping LLM warm-up")
+            return
+        for config in cls.WARM_UP_CONFIGS:
+            cls.get_llm(**config)
+        try:
+            # HEAD request chỉ để hoàn tất TCP/TLS handshake, connection được giữ lại trong pool
+            await cls.get_http_async_client().head(f"{OPENROUTER_BASE_URL}/models")
+            logger.info(f"LLM warm-up complete: {len(cls._llm_registry)} clients, connection to OpenRouter opened")
+        except Exception as e:
+            logger.warning(f"LLM warm-up request failed: {e}")
+    
+    @classmethod
+    async def close(cls):
+        """Closes the shared HTTP client and clears the registry."""
+        cls._llm_registry.clear()
+        if cls._http_async_client is not None:
+            await cls._http_async_client.aclose()
+            cls._http_async_client = None
+            logger.info("LLM HTTP client closed.")
     
     @staticmethod
     def _create_openrouter_llm(
@@ -136,12 +217,14 @@ class LLMConfig:
         llm = ChatOpenAI(
             model=model,
             api_key=SecretStr(api_key),
-            base_url="https://openrouter.ai/api/v1",
+            base_url=OPENROUTER_BASE_URL,
             model_kwargs=model_kwargs,
             streaming=use_streaming,  # Use the determined streaming value
             max_retries=2,
             timeout=30,
             temperature=temperature,
+            max_tokens=max_tokens,
+            http_async_client=LLMConfig.get_http_async_client(),
             default_headers={
                 "Referer": os.getenv("APP_URL", "http://localhost:3000"),  # Required for leaderboard
                 "X-Title": os.getenv("APP_NAME", "Deep Knowledge AI Platform"),  # Required for leaderboard
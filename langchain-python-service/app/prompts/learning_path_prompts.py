@@ -1,5 +1,9 @@
 # langchain-python-service/app/prompts/learning_path_prompts.py
 
+# Prompt edits are picked up through the cache namespace fingerprint (see learning_path_service).
+# Bump this when the local tree-building logic changes the output for the same prompts.
+LEARNING_PATH_PROMPT_VERSION = "v5"
+
 AGENT_A_INTERPRETER_PROMPT = """
 You are a highly specialized data extraction engine. Your ONLY function is to analyze a user's learning request and return a raw, compact, valid JSON object.
 
@@ -87,54 +91,101 @@ Your task is to generate a hierarchical course outline from any topic, using exa
 2.1.2. HashMap and TreeMap Usage
 """
 
-# Agent C: Converts text outline to JSON structure
-JSON_CONVERTER_PROMPT = """
-You are a strict and deterministic structural converter for an AI learning platform.
-
-Your task is to transform a numbered text outline into a comprehensive JSON learning tree structure.
+# Agent B (fan-out, phase 1): Only the Level 1 sections of the course
+OUTLINE_SKELETON_PROMPT = """
+You are a senior course design expert. Plan ONLY the top-level sections of a course.
 
 **INPUT:**
-A text outline with numbered hierarchy (e.g., "1. Title", "1.1. Subtitle", "1.1.1. Item")
+- **Topic:** {topic}
+- **User Requirement:** {requirement}
+- **Language:** {language}
 
-**TEXT OUTLINE:**
----
-{text_outline}
----
+**METHODOLOGY TO FOLLOW:**
+{domain_methodology}
 
-**OUTPUT JSON STRUCTURE:**
-Create a JSON array where each object represents a learning node with these exact fields:
-
-- `title`: The title from the outline (cleaned, no numbers)
-- `description`: "Detailed explanation of [title]"
-- `level`: Integer depth (0 for "1.", 1 for "1.1", 2 for "1.1.1")
-- `temp_id`: The exact number from outline ("1", "1.1", "1.1.1")
-- `requires`: Array of parent temp_id (empty [] if root)
-- `next`: Array of children temp_ids (empty [] if leaf)
-- `is_chat_enabled`: true if leaf node (no children), false otherwise
-- `prompt_sample`: If leaf node: "Giải thích chi tiết về [title]. Cung cấp ví dụ cụ thể và hướng dẫn thực hành.", else ""
-- `position_x`: 0
-- `position_y`: 0
+**PROFICIENCY LEVEL GUIDANCE:**
+{proficiency_guidance}
 
-**CONVERSION RULES:**
-1. Parse each line to extract number and title
-2. Calculate level from number depth (count dots)
-3. Build parent-child relationships based on hierarchy
-4. Set is_chat_enabled=true only for leaf nodes
-5. Clean titles by removing numbers and extra whitespace
+**Guidelines:**
+- Produce 4-8 main sections that follow a logical learning flow: foundation → intermediate → advanced → application
+- Start with an optional "Introduction" or "Prerequisites" section if needed
+- Each section title must be specific and self-explanatory, because each section is expanded independently later
 
-**OUTPUT FORMAT:**
-- Return ONLY the raw JSON array
-- No markdown, code blocks, or explanations
-- Must be valid, parseable JSON
+**Output Format:**
+- One section per line, numbered 1., 2., 3., ...
+- Each line contains only the number and title. No sub-items, no markdown, no explanation.
 
-**EXAMPLE:**
-Input:
+**Example Output Format:**
 1. Java Fundamentals
-1.1. Syntax Basics
-1.1.1. Variables
+2. Object-Oriented Programming in Java
+3. Collections Framework
+"""
+
+# Agent B (fan-out, phase 2): Expands a single Level 1 section, run concurrently per section
+SECTION_EXPANDER_PROMPT = """
+You are a senior course design expert. Expand ONE section of a course into a detailed sub-outline.
+
+**COURSE:**
+- **Topic:** {topic}
+- **User Requirement:** {requirement}
+- **Language:** {language}
+- **All sections of the course (for context, do not expand the others):**
+{skeleton}
+
+**SECTION TO EXPAND:** {section_title}
+
+**METHODOLOGY TO FOLLOW:**
+{domain_methodology}
+
+**PROFICIENCY LEVEL GUIDANCE:**
+{proficiency_guidance}
+
+**Guidelines:**
+- Break the section into 2-4 subsections, each with 2-3 actionable items (a fourth level is allowed if needed)
+- Stay strictly within the scope of this section; do not repeat content that belongs to the other sections
+- Each point should represent 1-2 hours of focused learning content
+- Avoid vague phrasing and repetition. Be concise but specific in every point
+
+**Output Format:**
+- Number the subsections of THIS section starting from 1: 1, 1.1, 1.2, 2, 2.1, etc.
+- Do not repeat the section title itself
+- Each line should contain only the number and title. No markdown, no explanation.
+
+**Example Output Format (for the section "Object-Oriented Programming in Java"):**
+1. Classes and Objects
+1.1. Defining Classes and Constructors
+1.2. Object Lifecycle and Garbage Collection
+2. Inheritance and Polymorphism
+2.1. Extending Classes and Method Overriding
+2.2. Abstract Classes and Interfaces
+"""
+
+# Agent B (subtree regeneration): Re-outlines one node of an existing course within a depth budget
+SUBTREE_OUTLINER_PROMPT = """
+You are a senior course design expert. Write the sub-outline for ONE lesson of an existing course.
+
+**INPUT:**
+- **Lesson to outline:** {topic}
+- **User Requirement:** {requirement}
+- **Language:** {language}
+
+**METHODOLOGY TO FOLLOW:**
+{domain_methodology}
+
+**PROFICIENCY LEVEL GUIDANCE:**
+{proficiency_guidance}
 
-Output:
-[{"title":"Java Fundamentals","description":"Detailed explanation of Java Fundamentals","level":0,"temp_id":"1","requires":[],"next":["1.1"],"is_chat_enabled":false,"prompt_sample":"","position_x":0,"position_y":0},{"title":"Syntax Basics","description":"Detailed explanation of Syntax Basics","level":1,"temp_id":"1.1","requires":["1"],"next":["1.1.1"],"is_chat_enabled":false,"prompt_sample":"","position_x":0,"position_y":0},{"title":"Variables","description":"Detailed explanation of Variables","level":2,"temp_id":"1.1.1","requires":["1.1"],"next":[],"is_chat_enabled":true,"prompt_sample":"Giải thích chi tiết về Variables. Cung cấp ví dụ cụ thể và hướng dẫn thực hành.","position_x":0,"position_y":0}]
+**Guidelines:**
+- Use at most {max_depth} level(s) of numbering ({depth_example}); the rest of the course is not deeper than that
+- Each item that has children should have 2-4 of them
+- Stay strictly within the scope of this lesson
+- Each point should represent 1-2 hours of focused learning content
+- Avoid vague phrasing and repetition. Be concise but specific in every point
+
+**Output Format:**
+- Number the items of THIS lesson starting from 1: 1, 1.1, 2, 2.1, etc.
+- Do not repeat the lesson title itself
+- Each line should contain only the number and title. No markdown, no explanation.
 """
 
 AGENT_C_METADATA_PROMPT = """
@@ -0,0 +1,22 @@
+# langchain-python-service/app/prompts/summary_prompts.py
+
+# ==============================================================================
+# ROLLING SESSION SUMMARY
+# Folds messages that left the recent-message window into the running summary.
+# ==============================================================================
+SESSION_SUMMARY_PROMPT = """
+Bạn đang duy trì bản tóm tắt của một buổi học giữa người dùng và AI Mentor. Bản tóm tắt giúp AI nhớ lại những gì đã thảo luận khi các tin nhắn cũ không còn nằm trong ngữ cảnh.
+
+**Tóm tắt hiện tại:**
+{previous_summary}
+
+**Các tin nhắn mới cần gộp vào (theo thứ tự thời gian):**
+{messages}
+
+**Yêu cầu:**
+1.  Viết lại MỘT bản tóm tắt duy nhất, kết hợp tóm tắt hiện tại với các tin nhắn mới.
+2.  Giữ lại: mục tiêu học tập của người dùng, các khái niệm đã được giải thích, kết luận đã thống nhất, những chỗ người dùng còn hiểu sai hoặc đang vướng, và câu hỏi còn bỏ ngỏ.
+3.  Bỏ qua lời chào, câu xã giao và chi tiết lặp lại. Không chép nguyên văn code; chỉ nêu code đó làm gì.
+4.  Viết bằng ngôn ngữ của cuộc trò chuyện, dạng gạch đầu dòng ngắn gọn, tối đa khoảng {max_words} từ.
+5.  Chỉ trả về bản tóm tắt, không thêm lời dẫn.
+"""
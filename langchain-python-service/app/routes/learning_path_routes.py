@@ -1,8 +1,12 @@
+import json
+import asyncio
 from fastapi import APIRouter, HTTPException, Body, Response, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
 from app.services.learning_path_service import LearningPathService
-from app.models.learning_path import GeneratePathRequest, LearningPathResponse
+from app.services.learning_path_jobs import learning_path_jobs, ACTIVE_STATUSES
+from app.models.learning_path import GeneratePathRequest, LearningPathResponse, RegenerateSubtreeRequest
 
 router = APIRouter(
     prefix="/learning-path",
@@ -29,4 +33,116 @@ async def generate_learning_path(request: GeneratePathRequest = Body(...)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"An unexpected error occurred during path generation: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An internal server error occurred.") 
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An internal server error occurred.") 
+
+@router.post("/subtree")
+async def regenerate_learning_path_subtree(request: RegenerateSubtreeRequest = Body(...)):
+    """
+    Regenerates or expands the subtree under one node of an existing learning path
+    and returns the full updated path. Costs a single scoped LLM call.
+    """
+    try:
+        logger.info(f"Received request to regenerate subtree '{request.target_temp_id}'.")
+        service = LearningPathService()
+        return await service.regenerate_subtree(
+            topic_name=request.topicName,
+            description=request.description,
+            tree=request.tree,
+            target_temp_id=request.target_temp_id,
+            message=request.message
+        )
+    except ValueError as e:
+        logger.warning(f"Value error during subtree regeneration: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during subtree regeneration: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An internal server error occurred.")
+
+@router.post("/generate/stream")
+async def generate_learning_path_stream(request: GeneratePathRequest = Body(...)):
+    """
+    Streaming variant of /generate. Emits Server-Sent Events:
+    'analysis', one 'node' per completed tree node, and a final 'done' event
+    carrying the complete path in the same shape as /generate.
+    """
+    logger.info(f"Received request to stream learning path generation.")
+    service = LearningPathService()
+
+    async def event_stream():
+        try:
+            async for event in service.generate_path_stream(request.message):
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except ValueError as e:
+            logger.warning(f"Value error during streamed path generation: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during streamed path generation: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'error': 'An internal server error occurred.'})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_learning_path_job(request: GeneratePathRequest = Body(...)):
+    """
+    Submits learning path generation as a background job and returns its id immediately.
+    Identical in-flight requests are attached to the same job.
+    """
+    try:
+        job, deduplicated = await learning_path_jobs.submit(request.message)
+    except RuntimeError as e:
+        logger.warning(f"Learning path job rejected: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "deduplicated": deduplicated,
+        # Callers polling the job should wait at least this long once it is running
+        "timeout_seconds": learning_path_jobs.job_timeout
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_learning_path_job(job_id: str):
+    """Returns the job status, plus `result` once completed or `error` once failed."""
+    job = await learning_path_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_learning_path_job(job_id: str):
+    """Streams job status changes as Server-Sent Events until the job finishes."""
+    if not await learning_path_jobs.get_job(job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+
+    async def event_stream():
+        last_status = None
+        while True:
+            job = await learning_path_jobs.get_job(job_id)
+            if not job:
+                yield f"data: {json.dumps({'type': 'error', 'error': 'Job expired'})}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"data: {json.dumps({'type': 'status', **job}, ensure_ascii=False)}\n\n"
+            if job["status"] not in ACTIVE_STATUSES:
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
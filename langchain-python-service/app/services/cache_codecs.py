@@ -0,0 +1,114 @@
+import json
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Header byte layout (format version 1): low 2 bits = serializer, next 2 bits = compression.
+# All headers are < 0x20, so they never collide with the first byte of plain JSON text
+# written before codecs existed; such values are still readable.
+SERIALIZER_IDS = {"json": 0x01, "msgpack": 0x02}
+COMPRESSION_IDS = {"none": 0x00, "zlib": 0x04, "zstd": 0x08}
+_SERIALIZERS_BY_ID = {value: name for name, value in SERIALIZER_IDS.items()}
+_COMPRESSIONS_BY_ID = {value: name for name, value in COMPRESSION_IDS.items()}
+
+class CacheCodec:
+    """
+    Encodes cache values to bytes: serializer (json/msgpack), then optional compression
+    once the payload exceeds `compress_threshold` bytes, prefixed with one header byte.
+    Unavailable optional libraries fall back to json/zlib.
+    """
+
+    def __init__(self, serializer: str = "json", compression: str = "zstd", compress_threshold: int = 1024, level: int = 3):
+        if serializer == "msgpack" and msgpack is None:
+            serializer = "json"
+        if compression == "zstd" and zstandard is None:
+            compression = "zlib"
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.level = level
+
+    def encode(self, value: Any) -> bytes:
+        payload = _serialize(self.serializer, value)
+        compression = "none"
+        if self.compression != "none" and len(payload) >= self.compress_threshold:
+            payload = _compress(self.compression, payload, self.level)
+            compression = self.compression
+        header = SERIALIZER_IDS[self.serializer] | COMPRESSION_IDS[compression]
+        return bytes([header]) + payload
+
+def decode_value(data: bytes) -> Any:
+    """Decodes bytes written by any CacheCodec (or legacy plain JSON text)."""
+    if isinstance(data, str):
+        return json.loads(data)
+    if not data:
+        return None
+    header = data[0]
+    if header >= 0x20:
+        return json.loads(data)
+    serializer = _SERIALIZERS_BY_ID.get(header & 0x03)
+    compression = _COMPRESSIONS_BY_ID.get(header & 0x0C)
+    if serializer is None or compression is None:
+        raise ValueError(f"Unknown cache value header: {header:#04x}")
+    payload = data[1:]
+    if compression != "none":
+        payload = _decompress(compression, payload)
+    return _deserialize(serializer, payload)
+
+def _serialize(serializer: str, value: Any) -> bytes:
+    if serializer == "msgpack":
+        return msgpack.packb(value, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _deserialize(serializer: str, payload: bytes) -> Any:
+    if serializer == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack is required to decode this cache value")
+        return msgpack.unpackb(payload, raw=False)
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+def _compress(compression: str, payload: bytes, level: int) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(payload)
+    return zlib.compress(payload, level)
+
+def _decompress(compression: str, payload: bytes) -> bytes:
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is required to decode this cache value")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+DEFAULT_CODEC = CacheCodec()
+
+# Per-namespace codecs. Large learning-path trees repeat field names per node, which
+# msgpack + zstd shrink several-fold; small values skip compression via the threshold.
+NAMESPACE_CODECS: Dict[str, CacheCodec] = {
+    "learning_path_raw": CacheCodec(serializer="msgpack", compression="zstd", compress_threshold=512),
+    "outline_section": CacheCodec(serializer="json", compression="zstd", compress_threshold=512),
+    "session_info": CacheCodec(serializer="json", compression="none"),
+    "session_lookup": CacheCodec(serializer="json", compression="none"),
+    "learning_path_job": CacheCodec(serializer="json", compression="zstd", compress_threshold=2048),
+}
+
+def codec_for(key: str, codecs: Optional[Dict[str, CacheCodec]] = None) -> CacheCodec:
+    namespace = key.split(":", 1)[0]
+    return (codecs if codecs is not None else NAMESPACE_CODECS).get(namespace, DEFAULT_CODEC)
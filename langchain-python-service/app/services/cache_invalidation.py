@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncpg
+from loguru import logger
+
+# Channel used by the notify_cache_invalidation() trigger (see create-database.sql)
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+InvalidationHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+ResyncHandler = Callable[[], Awaitable[None]]
+
+class CacheInvalidationListener:
+    """
+    Keeps a dedicated asyncpg connection on LISTEN and evicts cache entries when
+    learning_topics, tree_nodes or chat_sessions rows change.
+
+    Owners of cached data register a handler per table; each notification payload
+    ({"table", "op", "id", ...}) is passed to the handlers of its table. Notifications
+    sent while the connection was down are lost, so resync handlers run after every
+    reconnect to drop anything that may have gone stale meanwhile.
+    """
+
+    def __init__(self):
+        self.reconnect_delay = float(os.getenv("CACHE_INVALIDATION_RECONNECT_DELAY", 5))
+        self._handlers: Dict[str, List[InvalidationHandler]] = {}
+        self._resync_handlers: List[ResyncHandler] = []
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._disconnected: Optional[asyncio.Event] = None
+        self._pending: set = set()
+
+    def register(self, table: str, handler: InvalidationHandler):
+        self._handlers.setdefault(table, []).append(handler)
+
+    def register_resync(self, handler: ResyncHandler):
+        self._resync_handlers.append(handler)
+
+    async def start(self):
+        """Starts listening in the background; never blocks startup on the database."""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._close_connection()
+        logger.info("Cache invalidation listener stopped.")
+
+    async def _run(self):
+        first_connection = True
+        while True:
+            try:
+                await self._listen()
+                logger.info(f"Listening for cache invalidations on '{INVALIDATION_CHANNEL}'")
+                if not first_connection:
+                    await self._resync()
+                first_connection = False
+                await self._disconnected.wait()
+                logger.warning("Cache invalidation listener lost its connection, reconnecting...")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener failed: {e}")
+                first_connection = False
+            await self._close_connection()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self):
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            raise ValueError("DATABASE_URL is required")
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+        self._disconnected = asyncio.Event()
+        # LISTEN needs a session-level connection, so it cannot come from a pooler in transaction mode
+        self._connection = await asyncpg.connect(database_url, statement_cache_size=0)
+        self._connection.add_termination_listener(lambda _connection: self._disconnected.set())
+        await self._connection.add_listener(INVALIDATION_CHANNEL, self._on_notification)
+
+    async def _close_connection(self):
+        connection, self._connection = self._connection, None
+        if connection is not None and not connection.is_closed():
+            try:
+                await connection.close(timeout=5)
+            except Exception:
+                connection.terminate()
+
+    def _on_notification(self, _connection: asyncpg.Connection, _pid: int, _channel: str, payload: str):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed cache invalidation payload: {payload}")
+            return
+        for handler in self._handlers.get(event.get("table"), []):
+            task = asyncio.create_task(self._dispatch(handler, event))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _dispatch(self, handler: InvalidationHandler, event: Dict[str, Any]):
+        try:
+            await handler(event)
+        except Exception as e:
+            logger.warning(f"Cache invalidation for {event.get('table')}:{event.get('id')} failed: {e}")
+
+    async def _resync(self):
+        for handler in self._resync_handlers:
+            try:
+                await handler()
+            except Exception as e:
+                logger.warning(f"Cache resync handler failed: {e}")
+
+# Single instance to be used across the application
+cache_invalidation_listener = CacheInvalidationListener()
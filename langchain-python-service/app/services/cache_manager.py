@@ -1,63 +1,744 @@
 import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+import asyncio
 import os
-import json
-from typing import Optional, Any
+import re
+import math
+import time
+import uuid
+import random
+import hashlib
+import unicodedata
+from collections import deque
+from urllib.parse import urlsplit
+from contextlib import asynccontextmanager
+from typing import Optional, Any, Awaitable, AsyncIterator, Callable, Deque, Dict, List, Sequence, Set, Tuple
 from loguru import logger
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from app.services.l1_cache import L1Cache, MISSING
+from app.services.cache_codecs import codec_for, decode_value
+from app.services.local_cache_backend import LocalCacheBackend
+from app.services.sharded_redis import ShardedRedis
+from app.services.cache_metrics import CacheMetrics
+
+# Redis key holding the generation counter of a registered namespace
+GENERATION_KEY_PREFIX = "cache_generation"
+
+# Per-namespace L1 size limits. Job state changes on other replicas, so it bypasses L1.
+L1_NAMESPACE_LIMITS = {
+    "session_info": 10000,
+    "session_lookup": 20000,
+    "learning_path_raw": 200,
+    "outline_section": 500,
+    "learning_path_job": 0,
+    "learning_path_job_active": 0,
+}
+
+# Marks values stored by get_or_compute together with their XFetch metadata
+ENVELOPE_KEY = "__cached__"
+
+# Compare-and-delete, so a worker never releases a lock that expired and was re-acquired
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+class CachePipeline:
+    """
+    Queues cache operations and sends them to Redis in a single round trip.
+    Obtained from CacheManager.pipeline(); results are available in `results`
+    (decoded values for get_json, None otherwise) after the block exits.
+    """
+
+    def __init__(self, manager: "CacheManager"):
+        self._manager = manager
+        self._ops: List[Tuple[str, str, Any, int]] = []
+        self.results: List[Any] = []
+
+    def get_json(self, key: str) -> "CachePipeline":
+        self._ops.append(("get", key, None, 0))
+        return self
+
+    def set_json(self, key: str, data: Any, ttl: int = 3600) -> "CachePipeline":
+        self._ops.append(("set", key, data, ttl))
+        return self
+
+    def delete(self, key: str) -> "CachePipeline":
+        self._ops.append(("delete", key, None, 0))
+        return self
+
+    async def execute(self, transaction: bool = False) -> List[Any]:
+        manager = self._manager
+        ops, self._ops = self._ops, []
+        for op, key, data, ttl in ops:
+            if op == "set":
+                manager.l1.set(key, data, min(ttl, manager.l1_max_ttl))
+            elif op == "delete":
+                manager.l1.delete(key)
+
+        if not manager._backend:
+            self.results = [manager._unwrap(manager.l1.get(key)) if op == "get" else None for op, key, _, _ in ops]
+            return self.results
+        if not ops:
+            self.results = []
+            return self.results
+        namespace = L1Cache.namespace_of(ops[0][1])
+        try:
+            pipe = manager._backend.pipeline(transaction=transaction)
+            for op, key, data, ttl in ops:
+                if op == "get":
+                    pipe.get(key)
+                elif op == "set":
+                    encoded = codec_for(key).encode(data)
+                    manager._record_write(key, encoded)
+                    pipe.setex(key, ttl, encoded)
+                else:
+                    manager.metrics.incr(L1Cache.namespace_of(key), "deletes")
+                    pipe.delete(key)
+            start_time = time.perf_counter()
+            raw_results = await pipe.execute()
+            manager.metrics.observe(namespace, "pipeline", time.perf_counter() - start_time)
+        except Exception as e:
+            logger.warning(f"Failed to execute cache pipeline ({len(ops)} ops): {e}")
+            manager._handle_backend_error(e, ops[0][1])
+            self.results = [None] * len(ops)
+            return self.results
+
+        self.results = []
+        for (op, key, _, _), raw in zip(ops, raw_results):
+            if op != "get":
+                self.results.append(None)
+                continue
+            value = manager._decode_and_remember(key, raw)
+            self.results.append(manager._unwrap(value))
+        return self.results
 
 class CacheManager:
-    """A centralized cache manager using Redis."""
+    """
+    A centralized cache manager: in-process L1 in front of Redis.
+    While Redis is unreachable, a local SQLite backend takes its place and Redis
+    is reconnected in the background.
+    """
     
     def __init__(self):
-        self._redis_pool = None
+        # Active backend: the Redis client, the local fallback, or None (caching disabled)
+        self._backend = None
+        self.metrics = CacheMetrics()
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        # Scale-out options: REDIS_CLUSTER=true for Redis Cluster at REDIS_URL, or a
+        # comma-separated REDIS_URLS list for client-side consistent hashing
+        self.redis_cluster = os.getenv("REDIS_CLUSTER", "false").lower() == "true"
+        self.redis_urls = [url.strip() for url in os.getenv("REDIS_URLS", "").split(",") if url.strip()]
+        self.redis_socket_timeout = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2))
+        self.local_fallback_enabled = os.getenv("CACHE_LOCAL_FALLBACK", "true").lower() == "true"
+        self.local_fallback_path = os.getenv("CACHE_LOCAL_PATH", "/tmp/deep-knowledge-cache.sqlite3")
+        self.local_fallback_max_entries = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", 100000))
+        self.reconnect_interval = float(os.getenv("CACHE_REDIS_RECONNECT_INTERVAL", 10))
+        # Redis is only given up after this many connection errors within the window (seconds),
+        # so one transient timeout does not split this process off from the shared cache
+        self.fallback_error_threshold = int(os.getenv("CACHE_FALLBACK_ERROR_THRESHOLD", 3))
+        self.fallback_error_window = float(os.getenv("CACHE_FALLBACK_ERROR_WINDOW", 10))
+        self._connection_errors: Deque[float] = deque()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        # L1 entries live at most this long, bounding staleness across replicas
+        self.l1_max_ttl = float(os.getenv("CACHE_L1_MAX_TTL", 60))
+        self.l1_negative_ttl = float(os.getenv("CACHE_L1_NEGATIVE_TTL", 5))
+        self.l1 = L1Cache(
+            default_limit=int(os.getenv("CACHE_L1_DEFAULT_SIZE", 1000)),
+            namespace_limits=L1_NAMESPACE_LIMITS
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+        # Namespace registry: name -> template fingerprint, and the last known generation
+        self._namespace_fingerprints: Dict[str, str] = {}
+        self._namespace_generations: Dict[str, int] = {}
+        self.generation_refresh_interval = float(os.getenv("CACHE_GENERATION_REFRESH_INTERVAL", 30))
+        self._generation_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalizes free text for use in cache keys: Unicode NFKD, Vietnamese
+        diacritics removed (including đ), lowercased, punctuation dropped and
+        whitespace collapsed. '+', '#' and a '.' followed by a letter or digit are kept,
+        so "C++", "C#", "C", ".NET" and "NET" stay distinct.
+        """
+        decomposed = unicodedata.normalize("NFKD", text)
+        stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+        stripped = stripped.replace("đ", "d").replace("Đ", "D").lower()
+        stripped = re.sub(r"(?!\.\w)[^\w\s+#]", " ", stripped)
+        return " ".join(stripped.split())
+
+    @staticmethod
+    def build_key(namespace: str, *parts: Any) -> str:
+        """
+        Builds a stable, content-addressed key '<namespace>:{<digest>}'.
+        Unlike the built-in hash(), the digest is identical across processes and restarts.
+        The digest is a Redis hash tag, so keys derived from it (stage checkpoints,
+        locks, job dedup entries) land in the same cluster slot / shard.
+        """
+        payload = "\x1f".join(str(part) for part in parts)
+        digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{namespace}:{{{digest}}}"
+
+    @property
+    def using_local_fallback(self) -> bool:
+        return isinstance(self._backend, LocalCacheBackend)
+
+    def register_namespace(self, namespace: str, templates: Sequence[str] = ()) -> str:
+        """
+        Registers a versioned namespace. Keys built with namespaced_key() embed a
+        fingerprint of `templates` (the prompts that produce the values) and the
+        namespace generation, so editing a template or calling bump_namespace()
+        retires every existing key at once, without scanning or flushing Redis.
+        """
+        fingerprint = hashlib.blake2b("\x1f".join(templates).encode("utf-8"), digest_size=8).hexdigest()
+        self._namespace_fingerprints[namespace] = fingerprint
+        self._namespace_generations.setdefault(namespace, 0)
+        return namespace
+
+    def namespaced_key(self, namespace: str, *parts: Any) -> str:
+        """Builds a key in a registered namespace (see register_namespace)."""
+        fingerprint = self._namespace_fingerprints[namespace]
+        generation = self._namespace_generations.get(namespace, 0)
+        return self.build_key(namespace, fingerprint, generation, *parts)
+
+    async def bump_namespace(self, namespace: str) -> int:
+        """Invalidates every key of a namespace by moving it to a new generation."""
+        if namespace not in self._namespace_fingerprints:
+            raise ValueError(f"Unknown cache namespace: {namespace}")
+        generation = self._namespace_generations.get(namespace, 0) + 1
+        if self._backend:
+            try:
+                generation = int(await self._backend.incr(self._generation_key(namespace)))
+            except Exception as e:
+                logger.warning(f"Failed to bump generation of '{namespace}' in cache: {e}")
+                self._handle_backend_error(e, self._generation_key(namespace))
+        self._namespace_generations[namespace] = generation
+        logger.info(f"Cache namespace '{namespace}' moved to generation {generation}")
+        return generation
+
+    async def refresh_generations(self):
+        """Loads the current generation of every registered namespace in one round trip."""
+        if not self._backend or not self._namespace_fingerprints:
+            return
+        namespaces = list(self._namespace_fingerprints)
+        try:
+            values = await self._backend.mget([self._generation_key(namespace) for namespace in namespaces])
+        except Exception as e:
+            logger.warning(f"Failed to refresh cache namespace generations: {e}")
+            self._handle_backend_error(e, GENERATION_KEY_PREFIX)
+            return
+        for namespace, value in zip(namespaces, values):
+            generation = int(value) if value else 0
+            if generation != self._namespace_generations.get(namespace):
+                logger.info(f"Cache namespace '{namespace}' is now at generation {generation}")
+                self._namespace_generations[namespace] = generation
+
+    async def _generation_refresh_loop(self):
+        # Other replicas pick up a bump within one interval
+        while True:
+            await asyncio.sleep(self.generation_refresh_interval)
+            await self.refresh_generations()
+
+    def _generation_key(self, namespace: str) -> str:
+        # One hash tag for all counters, so they can be read with a single MGET on a cluster
+        return f"{GENERATION_KEY_PREFIX}:{{generations}}:{namespace}"
 
     async def connect(self):
-        """Initializes the Redis connection pool."""
-        if self._redis_pool:
+        """Connects to Redis, or switches to the local fallback and keeps retrying in the background."""
+        if self._backend and not self.using_local_fallback:
             return
         try:
-            self._redis_pool = redis.from_url(self.redis_url, encoding="utf-8", decode_responses=True)
-            # Check connection
-            await self._redis_pool.ping()
+            self._backend = await self._connect_redis()
             logger.info(f"Successfully connected to Redis at {self.redis_url}")
         except Exception as e:
-            self._redis_pool = None
-            logger.error(f"Failed to connect to Redis: {e}. Caching will be disabled.")
+            logger.error(f"Failed to connect to Redis: {e}")
+            self._use_local_backend()
+        await self.refresh_generations()
+        if self._generation_task is None or self._generation_task.done():
+            self._generation_task = asyncio.create_task(self._generation_refresh_loop())
+
+    async def _connect_redis(self):
+        # Values are binary (see cache_codecs), so responses are not decoded to str
+        client_kwargs = {
+            "decode_responses": False,
+            "socket_connect_timeout": self.redis_socket_timeout,
+            "socket_timeout": self.redis_socket_timeout
+        }
+        if self.redis_urls:
+            client = ShardedRedis(self.redis_urls, **client_kwargs)
+        elif self.redis_cluster:
+            client = RedisCluster.from_url(self.redis_url, **client_kwargs)
+        else:
+            client = redis.from_url(self.redis_url, **client_kwargs)
+        try:
+            await client.ping()
+        except Exception:
+            await client.aclose()
+            raise
+        return client
+
+    def _use_local_backend(self):
+        """Switches to the local backend (if enabled) and starts reconnecting to Redis."""
+        if self.using_local_fallback:
+            return
+        previous = self._backend
+        self._backend = None
+        if self.local_fallback_enabled:
+            try:
+                self._backend = LocalCacheBackend(self.local_fallback_path, self.local_fallback_max_entries)
+                logger.warning("Redis unavailable, using the local cache backend until it returns.")
+            except Exception as e:
+                logger.error(f"Failed to open the local cache backend: {e}. Caching will be disabled.")
+        else:
+            logger.error("Redis unavailable and local fallback disabled. Caching will be disabled.")
+        # Values cached from the other backend may no longer match
+        self.l1.clear()
+        if previous is not None:
+            self._schedule(previous.aclose())
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        while True:
+            await asyncio.sleep(self.reconnect_interval)
+            if self.using_local_fallback:
+                try:
+                    await self._backend.purge_expired()
+                except Exception as e:
+                    logger.warning(f"Failed to purge the local cache backend: {e}")
+            try:
+                client = await self._connect_redis()
+            except Exception as e:
+                logger.debug(f"Redis still unavailable: {e}")
+                continue
+            local_backend, self._backend = self._backend, client
+            self.l1.clear()
+            if local_backend is not None:
+                await local_backend.aclose()
+            logger.info(f"Reconnected to Redis at {self.redis_url}, local cache backend released.")
+            await self.refresh_generations()
+            return
+
+    def _handle_backend_error(self, error: Exception, key: Optional[str] = None):
+        """
+        Counts the error. Repeated connection-level Redis errors (fallback_error_threshold
+        within fallback_error_window seconds) move the cache to the local backend.
+        """
+        self.metrics.incr(L1Cache.namespace_of(key) if key else "_backend", "errors")
+        if not isinstance(error, (RedisConnectionError, RedisTimeoutError)) or self.using_local_fallback:
+            return
+        now = time.monotonic()
+        self._connection_errors.append(now)
+        while now - self._connection_errors[0] > self.fallback_error_window:
+            self._connection_errors.popleft()
+        if len(self._connection_errors) >= self.fallback_error_threshold:
+            self._connection_errors.clear()
+            self._use_local_backend()
+
+    def _schedule(self, coroutine: Awaitable[Any]):
+        task = asyncio.ensure_future(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _record_write(self, key: str, encoded: bytes):
+        namespace = L1Cache.namespace_of(key)
+        self.metrics.incr(namespace, "sets")
+        self.metrics.incr(namespace, "bytes_written", len(encoded))
+
+    async def render_metrics(self) -> str:
+        """Cache metrics, L1 occupancy and backend topology in the Prometheus text format."""
+        return self.metrics.render(self.l1.stats(), await self.topology())
+
+    async def topology(self) -> Dict[str, Any]:
+        """Describes the active backend: mode, and hash slots / key counts per node."""
+        backend = self._backend
+        if backend is None:
+            return {"mode": "disabled", "nodes": []}
+        if self.using_local_fallback:
+            return {"mode": "local", "nodes": [{"node": backend.path}]}
+        try:
+            if isinstance(backend, ShardedRedis):
+                key_counts = await backend.dbsize()
+                nodes = [
+                    {"node": _redact_url(url), "slots": slots, "keys": keys}
+                    for url, slots, keys in zip(backend.urls, backend.slot_counts(), key_counts)
+                ]
+                return {"mode": "sharded", "nodes": nodes}
+            if isinstance(backend, RedisCluster):
+                slot_counts: Dict[str, int] = {}
+                for slot_nodes in backend.nodes_manager.slots_cache.values():
+                    if slot_nodes:
+                        slot_counts[slot_nodes[0].name] = slot_counts.get(slot_nodes[0].name, 0) + 1
+                return {
+                    "mode": "cluster",
+                    "nodes": [{"node": name, "slots": slots} for name, slots in sorted(slot_counts.items())]
+                }
+            return {"mode": "single", "nodes": [{"node": _redact_url(self.redis_url), "keys": await backend.dbsize()}]}
+        except Exception as e:
+            logger.warning(f"Failed to describe cache topology: {e}")
+            return {"mode": "unknown", "nodes": []}
 
     async def close(self):
-        """Closes the Redis connection pool."""
-        if self._redis_pool:
-            await self._redis_pool.close()
-            logger.info("Redis connection pool closed.")
+        """Stops reconnecting and closes the active backend."""
+        for task in (self._reconnect_task, self._generation_task):
+            if task:
+                task.cancel()
+        self._reconnect_task = None
+        self._generation_task = None
+        if self._backend:
+            await self._backend.aclose()
+            self._backend = None
+            logger.info("Cache backend closed.")
 
     async def get_json(self, key: str) -> Optional[Any]:
-        """Gets a JSON-serializable object from the cache."""
-        if not self._redis_pool:
+        """
+        Gets a JSON-serializable object from the cache, checking L1 before Redis.
+        Values served from L1 are shared and must not be mutated.
+        """
+        return self._unwrap(await self._read(key))
+
+    async def _read(self, key: str, use_l1: bool = True) -> Optional[Any]:
+        """Returns the stored object as-is (including get_or_compute envelopes)."""
+        if use_l1:
+            local = self._get_local(key)
+            if local is MISSING:
+                return None
+            if local is not None:
+                return local
+        if not self._backend:
+            self.metrics.incr(L1Cache.namespace_of(key), "misses")
             return None
         try:
-            cached_data = await self._redis_pool.get(key)
-            if cached_data:
-                logger.debug(f"Cache HIT for key: {key}")
-                return json.loads(cached_data)
-            logger.debug(f"Cache MISS for key: {key}")
-            return None
+            start_time = time.perf_counter()
+            cached_data = await self._backend.get(key)
+            self.metrics.observe(L1Cache.namespace_of(key), "get", time.perf_counter() - start_time)
+            return self._decode_and_remember(key, cached_data)
         except Exception as e:
             logger.warning(f"Failed to get key '{key}' from cache: {e}")
+            self._handle_backend_error(e, key)
             return None
 
+    def _get_local(self, key: str) -> Any:
+        """L1 lookup that records L1 hits (a cached miss counts as a miss)."""
+        local = self.l1.get(key)
+        if local is MISSING:
+            self.metrics.incr(L1Cache.namespace_of(key), "misses")
+        elif local is not None:
+            self.metrics.incr(L1Cache.namespace_of(key), "hits_l1")
+        return local
+
+    def _decode_and_remember(self, key: str, cached_data: Optional[bytes]) -> Optional[Any]:
+        """Decodes a raw Redis value and records it (or the miss) in L1."""
+        namespace = L1Cache.namespace_of(key)
+        if cached_data:
+            logger.debug(f"Cache HIT for key: {key}")
+            self.metrics.incr(namespace, "hits_backend")
+            self.metrics.incr(namespace, "bytes_read", len(cached_data))
+            value = decode_value(cached_data)
+            self.l1.set(key, value, self.l1_max_ttl)
+            return value
+        logger.debug(f"Cache MISS for key: {key}")
+        self.metrics.incr(namespace, "misses")
+        self.l1.set(key, MISSING, self.l1_negative_ttl)
+        return None
+
+    async def mget_json(self, keys: List[str]) -> List[Optional[Any]]:
+        """Gets several objects at once: L1 first, then a single MGET for the rest."""
+        results: List[Optional[Any]] = [None] * len(keys)
+        remote_indexes = []
+        for index, key in enumerate(keys):
+            local = self._get_local(key)
+            if local is None:
+                remote_indexes.append(index)
+            elif local is not MISSING:
+                results[index] = self._unwrap(local)
+        if not remote_indexes:
+            return results
+        remote_keys = [keys[index] for index in remote_indexes]
+        if not self._backend:
+            for key in remote_keys:
+                self.metrics.incr(L1Cache.namespace_of(key), "misses")
+            return results
+        try:
+            start_time = time.perf_counter()
+            if isinstance(self._backend, RedisCluster):
+                # Keys may live in different slots; fetched per slot, still one call per node
+                raw_values = await self._backend.mget_nonatomic(remote_keys)
+            else:
+                raw_values = await self._backend.mget(remote_keys)
+            self.metrics.observe(L1Cache.namespace_of(remote_keys[0]), "mget", time.perf_counter() - start_time)
+        except Exception as e:
+            logger.warning(f"Failed to get {len(remote_indexes)} keys from cache: {e}")
+            self._handle_backend_error(e, remote_keys[0])
+            return results
+        for index, raw in zip(remote_indexes, raw_values):
+            try:
+                results[index] = self._unwrap(self._decode_and_remember(keys[index], raw))
+            except Exception as e:
+                logger.warning(f"Failed to decode key '{keys[index]}' from cache: {e}")
+                self.metrics.incr(L1Cache.namespace_of(keys[index]), "errors")
+        return results
+
+    async def mset_json(self, items: Dict[str, Any], ttl: int = 3600):
+        """Sets several objects with the same TTL in a single round trip."""
+        if not items:
+            return
+        async with self.pipeline() as pipe:
+            for key, data in items.items():
+                pipe.set_json(key, data, ttl=ttl)
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> AsyncIterator[CachePipeline]:
+        """
+        Batches cache operations into one round trip (MULTI/EXEC if `transaction`):
+
+            async with cache_manager.pipeline() as pipe:
+                pipe.set_json(key_a, a, ttl=60).delete(key_b)
+        """
+        pipe = CachePipeline(self)
+        yield pipe
+        await pipe.execute(transaction=transaction)
+
     async def set_json(self, key: str, data: Any, ttl: int = 3600):
         """Sets a JSON-serializable object in the cache with a TTL."""
-        if not self._redis_pool:
+        self.l1.set(key, data, min(ttl, self.l1_max_ttl))
+        if not self._backend:
             return
         try:
-            await self._redis_pool.setex(
-                key,
-                ttl,
-                json.dumps(data)
-            )
-            logger.debug(f"Cached data for key: {key} with TTL: {ttl}s")
+            encoded = codec_for(key).encode(data)
+            start_time = time.perf_counter()
+            await self._backend.setex(key, ttl, encoded)
+            self.metrics.observe(L1Cache.namespace_of(key), "set", time.perf_counter() - start_time)
+            self._record_write(key, encoded)
+            logger.debug(f"Cached {len(encoded)} bytes for key: {key} with TTL: {ttl}s")
+        except Exception as e:
+            logger.warning(f"Failed to set key '{key}' in cache: {e}")
+            self._handle_backend_error(e, key)
+
+    async def set_json_if_absent(self, key: str, data: Any, ttl: int = 3600) -> bool:
+        """
+        Sets a JSON-serializable object only if the key does not exist (SET NX).
+        Returns True if the value was written. Without Redis there is nothing to
+        contend with, so it also returns True.
+        """
+        self.l1.delete(key)
+        if not self._backend:
+            return True
+        try:
+            encoded = codec_for(key).encode(data)
+            written = bool(await self._backend.set(key, encoded, ex=ttl, nx=True))
+            if written:
+                self._record_write(key, encoded)
+            return written
         except Exception as e:
             logger.warning(f"Failed to set key '{key}' in cache: {e}")
+            self._handle_backend_error(e, key)
+            return True
+
+    async def delete(self, key: str):
+        """Deletes a key from the cache."""
+        self.l1.delete(key)
+        if not self._backend:
+            return
+        try:
+            await self._backend.delete(key)
+            self.metrics.incr(L1Cache.namespace_of(key), "deletes")
+        except Exception as e:
+            logger.warning(f"Failed to delete key '{key}' from cache: {e}")
+            self._handle_backend_error(e, key)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 3600,
+        stale_ttl: Optional[int] = None,
+        lock_timeout: int = 60,
+        beta: float = 1.0
+    ) -> Any:
+        """
+        Returns the cached value for `key`, computing it at most once across workers.
+
+        - Concurrent callers in this process share one in-flight computation.
+        - Across processes, a Redis lock elects one worker; the others wait for its
+          "ready" notification (pub/sub) and then read the stored value.
+        - Probabilistic early refresh (XFetch): shortly before expiry, one caller
+          refreshes the value in the background while everybody keeps getting the
+          current one. Values also stay readable for `stale_ttl` seconds after expiry,
+          during which they are served stale while a refresh runs.
+        """
+        stale_ttl = min(ttl, 300) if stale_ttl is None else stale_ttl
+        stored = await self._read(key)
+        if self._is_envelope(stored):
+            if self._should_refresh(stored, beta):
+                self._schedule_refresh(key, compute, ttl, stale_ttl, lock_timeout)
+            return stored["value"]
+        if stored is not None:
+            return stored
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception was never retrieved" when nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await self._compute_exclusive(key, compute, ttl, stale_ttl, lock_timeout)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _compute_exclusive(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int, lock_timeout: int) -> Any:
+        if not self._backend:
+            return await self._compute_and_store(key, compute, ttl, stale_ttl)
+
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            token = await self._acquire_lock(key, lock_timeout)
+            if token:
+                try:
+                    # Another worker may have stored the value just before we got the lock
+                    stored = await self._read(key, use_l1=False)
+                    if stored is not None:
+                        return self._unwrap(stored)
+                    return await self._compute_and_store(key, compute, ttl, stale_ttl)
+                finally:
+                    await self._release_lock(key, token)
+
+            stored = await self._wait_for_value(key, deadline)
+            if stored is not None:
+                return self._unwrap(stored)
+            # Lock holder gave up without a value: compete for the lock again
+
+        logger.warning(f"Timed out waiting for '{key}' to be computed elsewhere, computing locally")
+        return await self._compute_and_store(key, compute, ttl, stale_ttl)
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int) -> Any:
+        start_time = time.monotonic()
+        value = await compute()
+        delta = time.monotonic() - start_time
+        envelope = {ENVELOPE_KEY: True, "value": value, "delta": delta, "expiry": time.time() + ttl}
+        await self.set_json(key, envelope, ttl=ttl + stale_ttl)
+        return value
+
+    def _should_refresh(self, envelope: Dict[str, Any], beta: float) -> bool:
+        """XFetch: refresh early with a probability that grows as expiry approaches."""
+        delta = float(envelope.get("delta", 0))
+        expiry = float(envelope.get("expiry", 0))
+        return time.time() - delta * beta * math.log(1.0 - random.random()) >= expiry
+
+    def _schedule_refresh(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int, lock_timeout: int):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            token = None
+            try:
+                token = await self._acquire_lock(key, lock_timeout) if self._backend else "local"
+                if not token:
+                    return  # Another worker is already refreshing
+                await self._compute_and_store(key, compute, ttl, stale_ttl)
+                logger.debug(f"Refreshed '{key}' ahead of expiry")
+            except Exception as e:
+                logger.warning(f"Background refresh of '{key}' failed: {e}")
+            finally:
+                if token and self._backend:
+                    await self._release_lock(key, token)
+                self._refreshing.discard(key)
+
+        self._schedule(refresh())
+
+    async def acquire_lock(self, key: str, lock_timeout: int) -> Optional[str]:
+        """
+        Distributed lock for `key` (stored at '{key}:lock'), shared with get_or_compute.
+        Returns the token to pass to release_lock(), or None if another holder has it.
+        Without a backend there is nothing to contend with, so the lock is always granted.
+        """
+        if not self._backend:
+            return uuid.uuid4().hex
+        return await self._acquire_lock(key, lock_timeout)
+
+    async def release_lock(self, key: str, token: str):
+        """Releases a lock from acquire_lock() only if `token` still holds it."""
+        if self._backend:
+            await self._release_lock(key, token)
+
+    async def _acquire_lock(self, key: str, lock_timeout: int) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            if await self._backend.set(f"{key}:lock", token, nx=True, ex=lock_timeout):
+                return token
+        except Exception as e:
+            logger.warning(f"Failed to acquire lock for '{key}': {e}")
+            self._handle_backend_error(e, key)
+            # Without a working lock, computing locally beats blocking every caller
+            return token
+        return None
+
+    async def _release_lock(self, key: str, token: str):
+        try:
+            if self.using_local_fallback:
+                await self._backend.delete_if_equals(f"{key}:lock", token)
+            else:
+                await self._backend.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+        except Exception as e:
+            logger.warning(f"Failed to release lock for '{key}': {e}")
+        try:
+            # Wake up waiters; they re-read the key, or compete for the lock if it is still empty
+            await self._backend.publish(f"{key}:ready", "1")
+        except Exception as e:
+            logger.warning(f"Failed to notify waiters for '{key}': {e}")
+
+    async def _wait_for_value(self, key: str, deadline: float) -> Optional[Any]:
+        """Waits for the lock holder's notification; returns the value, or None if the lock is gone."""
+        pubsub = self._backend.pubsub()
+        try:
+            await pubsub.subscribe(f"{key}:ready")
+            while time.monotonic() < deadline:
+                # Re-check after subscribing so a notification sent in between is not missed
+                stored = await self._read(key, use_l1=False)
+                if stored is not None:
+                    return stored
+                if not await self._backend.exists(f"{key}:lock"):
+                    return None
+                await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(1.0, deadline - time.monotonic()))
+            return None
+        except Exception as e:
+            logger.warning(f"Failed while waiting for '{key}': {e}")
+            # Avoid spinning on the lock when notifications are unavailable
+            await asyncio.sleep(max(0.0, min(1.0, deadline - time.monotonic())))
+            return None
+        finally:
+            await pubsub.aclose()
+
+    @staticmethod
+    def _is_envelope(stored: Any) -> bool:
+        return isinstance(stored, dict) and ENVELOPE_KEY in stored
+
+    @classmethod
+    def _unwrap(cls, stored: Any) -> Any:
+        if stored is MISSING:
+            return None
+        return stored["value"] if cls._is_envelope(stored) else stored
+
+def _redact_url(url: str) -> str:
+    """Drops credentials from a Redis URL before it is exposed."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.hostname}:{parts.port}" if parts.hostname else url
 
 # Single instance to be used across the application
-cache_manager = CacheManager() 
\ No newline at end of file
+cache_manager = CacheManager()
+ 
\ No newline at end of file
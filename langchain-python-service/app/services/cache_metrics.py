@@ -0,0 +1,107 @@
+import bisect
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+# Upper bounds (seconds) of the backend latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+COUNTERS = ("hits_l1", "hits_backend", "misses", "errors", "sets", "deletes", "bytes_read", "bytes_written")
+
+class LatencyHistogram:
+    """Cumulative histogram in the Prometheus layout (bucket counts, sum, count)."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result, running = [], 0
+        for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.buckets):
+            running += count
+            result.append((bound, running))
+        return result
+
+class CacheMetrics:
+    """
+    In-process cache metrics, labelled by namespace (the key prefix before ':').
+    Counters cover L1/backend hits, misses, errors, writes and bytes moved; backend
+    latency is tracked per operation. Rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self.latency: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+
+    def incr(self, namespace: str, counter: str, amount: int = 1):
+        self.counters[namespace][counter] += amount
+
+    def observe(self, namespace: str, operation: str, seconds: float):
+        self.latency[(namespace, operation)].observe(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict view, e.g. for logs or JSON endpoints."""
+        namespaces = {}
+        for namespace, counters in self.counters.items():
+            lookups = counters["hits_l1"] + counters["hits_backend"] + counters["misses"]
+            hits = counters["hits_l1"] + counters["hits_backend"]
+            namespaces[namespace] = {**counters, "hit_rate": round(hits / lookups, 4) if lookups else None}
+        return namespaces
+
+    def render(self, l1_stats: Dict[str, Dict[str, int]], topology: Dict[str, Any]) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[Dict[str, Any], Any]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(value_)}"' for key, value_ in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        for counter in COUNTERS:
+            metric(
+                f"cache_{counter}_total", "counter", f"Cache {counter.replace('_', ' ')} per namespace.",
+                [({"namespace": namespace}, counters[counter]) for namespace, counters in sorted(self.counters.items())]
+            )
+
+        bucket_samples, sum_samples, count_samples = [], [], []
+        for (namespace, operation), histogram in sorted(self.latency.items()):
+            labels = {"namespace": namespace, "operation": operation}
+            for bound, count in histogram.cumulative():
+                bucket_samples.append(({**labels, "le": bound}, count))
+            sum_samples.append((labels, round(histogram.total, 6)))
+            count_samples.append((labels, histogram.count))
+        lines.append("# HELP cache_backend_latency_seconds Latency of cache backend calls.")
+        lines.append("# TYPE cache_backend_latency_seconds histogram")
+        for suffix, samples in (("_bucket", bucket_samples), ("_sum", sum_samples), ("_count", count_samples)):
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(value_)}"' for key, value_ in labels.items())
+                lines.append(f"cache_backend_latency_seconds{suffix}{{{label_text}}} {value}")
+
+        for field, kind, help_text in (
+            ("entries", "gauge", "Entries currently held in the in-process L1 cache."),
+            ("limit", "gauge", "Configured L1 size limit."),
+            ("evictions", "counter", "L1 entries evicted to make room."),
+            ("rejections", "counter", "L1 insertions refused by frequency admission."),
+        ):
+            name = f"cache_l1_{field}" + ("_total" if kind == "counter" else "")
+            metric(name, kind, help_text, [({"namespace": ns}, stats[field]) for ns, stats in sorted(l1_stats.items())])
+
+        metric("cache_backend_info", "gauge", "Active cache backend mode.", [({"mode": topology.get("mode")}, 1)])
+        metric(
+            "cache_backend_slots", "gauge", "Hash slots owned by each cache node.",
+            [({"node": node["node"]}, node["slots"]) for node in topology.get("nodes", []) if "slots" in node]
+        )
+        metric(
+            "cache_backend_keys", "gauge", "Keys stored on each cache node.",
+            [({"node": node["node"]}, node["keys"]) for node in topology.get("nodes", []) if "keys" in node]
+        )
+        return "\n".join(lines) + "\n"
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
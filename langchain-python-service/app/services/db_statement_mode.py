@@ -0,0 +1,48 @@
+import os
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+PREPARED = "prepared"
+UNNAMED = "unnamed"
+STATEMENT_MODES = (PREPARED, UNNAMED)
+
+# Ports used by PgBouncer deployments (6432 is PgBouncer's default, 6543 the Supabase pooler)
+POOLER_PORTS = {6432, 6543}
+POOLER_HOST_MARKERS = ("pgbouncer", "pooler")
+
+def resolve_statement_mode(database_url: str) -> Tuple[str, str]:
+    """
+    Chọn statement mode cho asyncpg pool. Returns (mode, database_url without the
+    'pgbouncer' query flag, which asyncpg would otherwise send as a server setting).
+
+    DB_STATEMENT_MODE=prepared|unnamed forces a mode; 'auto' (default) picks 'unnamed'
+    when the URL points at PgBouncer (?pgbouncer=true, a known pooler port, or a
+    pooler host name), since named statements do not survive transaction pooling.
+    """
+    parts = urlsplit(database_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    pgbouncer_flag = next((value for key, value in query if key == "pgbouncer"), None)
+    cleaned_url = urlunsplit(parts._replace(query=urlencode([(k, v) for k, v in query if k != "pgbouncer"])))
+
+    configured = os.getenv("DB_STATEMENT_MODE", "auto").strip().lower()
+    if configured in STATEMENT_MODES:
+        return configured, cleaned_url
+    if configured != "auto":
+        raise ValueError(f"DB_STATEMENT_MODE must be one of auto, {', '.join(STATEMENT_MODES)}; got '{configured}'")
+
+    if pgbouncer_flag is not None:
+        behind_pooler = pgbouncer_flag.lower() in ("1", "true", "yes")
+    else:
+        host = (parts.hostname or "").lower()
+        behind_pooler = parts.port in POOLER_PORTS or any(marker in host for marker in POOLER_HOST_MARKERS)
+    return (UNNAMED if behind_pooler else PREPARED), cleaned_url
+
+def pool_kwargs(mode: str) -> Dict[str, Any]:
+    """asyncpg connection settings for a statement mode."""
+    if mode == UNNAMED:
+        # A zero-size cache makes asyncpg use the unnamed statement for every query
+        return {"statement_cache_size": 0}
+    return {
+        "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256)),
+        "max_cached_statement_lifetime": 0,
+    }
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Marker stored for keys known to be absent from Redis (negative caching)
+MISSING = object()
+
+class L1Cache:
+    """
+    Bounded in-process cache that sits in front of Redis.
+
+    - Entries expire after their own TTL (capped by the caller).
+    - Each namespace (key prefix before the first ':') has its own size limit; 0 disables L1.
+    - Eviction is LRU, with a frequency-based admission check (TinyLFU-style): when a
+      namespace is full, a new key is only admitted if it has been requested at least as
+      often as the LRU victim, so one-off keys cannot flush hot session metadata.
+
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, default_limit: int = 1000, namespace_limits: Optional[Dict[str, int]] = None):
+        self.default_limit = default_limit
+        self.namespace_limits = namespace_limits or {}
+        self._entries: Dict[str, "OrderedDict[str, Tuple[Any, float]]"] = {}
+        self._frequency: Dict[str, int] = {}
+        self._frequency_ops = 0
+        self.evictions: Dict[str, int] = {}
+        self.rejections: Dict[str, int] = {}
+
+    @staticmethod
+    def namespace_of(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def limit_for(self, namespace: str) -> int:
+        return self.namespace_limits.get(namespace, self.default_limit)
+
+    def get(self, key: str) -> Any:
+        """Returns the cached value, MISSING for a cached miss, or None if not in L1."""
+        self._record_access(key)
+        entries = self._entries.get(self.namespace_of(key))
+        if not entries:
+            return None
+        item = entries.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Stores a value (or MISSING) for at most `ttl` seconds, subject to admission."""
+        namespace = self.namespace_of(key)
+        limit = self.limit_for(namespace)
+        if limit <= 0 or ttl <= 0:
+            return
+        entries = self._entries.setdefault(namespace, OrderedDict())
+        if key not in entries and len(entries) >= limit:
+            self._evict_expired(entries)
+            if len(entries) >= limit:
+                victim = next(iter(entries))
+                if self._frequency.get(key, 0) < self._frequency.get(victim, 0):
+                    self.rejections[namespace] = self.rejections.get(namespace, 0) + 1
+                    return
+                del entries[victim]
+                self.evictions[namespace] = self.evictions.get(namespace, 0) + 1
+        entries[key] = (value, time.monotonic() + ttl)
+        entries.move_to_end(key)
+
+    def delete(self, key: str):
+        entries = self._entries.get(self.namespace_of(key))
+        if entries:
+            entries.pop(key, None)
+
+    def clear(self, namespace: Optional[str] = None):
+        if namespace is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(namespace, None)
+
+    def size(self, namespace: Optional[str] = None) -> int:
+        if namespace is not None:
+            return len(self._entries.get(namespace, ()))
+        return sum(len(entries) for entries in self._entries.values())
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Occupancy, limit, evictions and admission rejections per namespace."""
+        namespaces = set(self._entries) | set(self.evictions) | set(self.rejections)
+        return {
+            namespace: {
+                "entries": self.size(namespace),
+                "limit": self.limit_for(namespace),
+                "evictions": self.evictions.get(namespace, 0),
+                "rejections": self.rejections.get(namespace, 0),
+            }
+            for namespace in namespaces
+        }
+
+    def _evict_expired(self, entries: "OrderedDict[str, Tuple[Any, float]]"):
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in entries.items() if expires_at <= now]:
+            del entries[key]
+
+    def _record_access(self, key: str):
+        self._frequency[key] = self._frequency.get(key, 0) + 1
+        self._frequency_ops += 1
+        # Periodic aging keeps the counters bounded and favours recent popularity
+        if self._frequency_ops >= 10 * max(self.default_limit, 1):
+            self._frequency = {k: v // 2 for k, v in self._frequency.items() if v > 1}
+            self._frequency_ops = 0
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Any, Tuple
+from loguru import logger
+
+from app.services.cache_manager import cache_manager
+from app.services.learning_path_service import LearningPathService
+
+JOB_KEY_PREFIX = "learning_path_job"
+ACTIVE_JOB_KEY_PREFIX = "learning_path_job_active"
+ACTIVE_STATUSES = ("queued", "running")
+
+class LearningPathJobManager:
+    """
+    Runs learning-path generation as background jobs.
+    Submission returns a job id immediately; a bounded pool of asyncio workers runs
+    LearningPathService.generate_path. Job records live in Redis (with an in-process copy),
+    so any replica can report status. Identical in-flight requests share one job.
+    """
+
+    def __init__(self):
+        self.num_workers = int(os.getenv("LEARNING_PATH_WORKERS", 4))
+        self.queue_size = int(os.getenv("LEARNING_PATH_QUEUE_SIZE", 100))
+        self.job_ttl = int(os.getenv("LEARNING_PATH_JOB_TTL", 3600))
+        # Upper bound for a single run; an orphaned dedup entry expires after this
+        self.job_timeout = int(os.getenv("LEARNING_PATH_JOB_TIMEOUT", 600))
+        self.claim_attempts = 3
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active: Dict[str, str] = {}  # dedup key -> job_id
+        self._service = LearningPathService()
+
+    async def start(self):
+        """Starts the worker pool."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._worker(index)) for index in range(self.num_workers)]
+        logger.info(f"Learning path job workers started: {self.num_workers}")
+
+    async def stop(self):
+        """Cancels the worker pool."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Learning path job workers stopped.")
+
+    async def submit(self, user_request: str, quality_level: str = "standard") -> Tuple[Dict[str, Any], bool]:
+        """
+        Submits a generation job. Returns (job record, deduplicated), where deduplicated
+        is True if an identical in-flight job was reused instead of creating a new one.
+        """
+        if self._queue is None:
+            raise RuntimeError("Learning path job workers are not running")
+
+        dedup_key = self._service.get_path_cache_key(user_request, quality_level)
+        existing = await self._find_active_job(dedup_key)
+        if existing:
+            logger.info(f"Job {existing['job_id']} reused for identical in-flight request")
+            return existing, True
+
+        if self._queue.full():
+            raise RuntimeError("Learning path job queue is full, please retry later")
+
+        # The job record is saved before the dedup key is claimed, so a replica that loses
+        # the SET NX race always finds the winner's record
+        job_id = uuid.uuid4().hex
+        job = await self._save_job({
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": time.time()
+        })
+        for attempt in range(self.claim_attempts):
+            if await cache_manager.set_json_if_absent(self._active_key(dedup_key), job_id, ttl=self.job_timeout):
+                break
+            # Another replica registered the same request in the meantime
+            existing = await self._find_active_job(dedup_key)
+            if existing:
+                await self._discard_job(job_id)
+                logger.info(f"Job {existing['job_id']} reused for identical in-flight request")
+                return existing, True
+            # The key points at a job that just finished; its worker is about to delete it
+            await asyncio.sleep(0.05 * (attempt + 1))
+        else:
+            await self._discard_job(job_id)
+            raise RuntimeError("An identical learning path request is being registered, please retry")
+
+        self._active[dedup_key] = job_id
+        self._queue.put_nowait((job_id, user_request, quality_level, dedup_key))
+        logger.info(f"Learning path job {job_id} queued (queue size: {self._queue.qsize()})")
+        return job, False
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the job record from this process or from Redis."""
+        job = self._jobs.get(job_id)
+        if job:
+            return job
+        return await cache_manager.get_json(self._job_key(job_id))
+
+    async def _find_active_job(self, dedup_key: str) -> Optional[Dict[str, Any]]:
+        job_id = self._active.get(dedup_key) or await cache_manager.get_json(self._active_key(dedup_key))
+        if not job_id:
+            return None
+        job = await self.get_job(job_id)
+        if job and job["status"] in ACTIVE_STATUSES:
+            return job
+        return None
+
+    async def _worker(self, worker_index: int):
+        while True:
+            job_id, user_request, quality_level, dedup_key = await self._queue.get()
+            try:
+                await self._run_job(job_id, user_request, quality_level)
+            finally:
+                self._active.pop(dedup_key, None)
+                await cache_manager.delete(self._active_key(dedup_key))
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str, user_request: str, quality_level: str):
+        job = self._jobs[job_id]
+        await self._save_job({**job, "status": "running", "started_at": time.time()})
+        start_time = time.time()
+        try:
+            path_json_string = await asyncio.wait_for(
+                self._service.generate_path(user_request, quality_level),
+                timeout=self.job_timeout
+            )
+            await self._save_job({
+                **self._jobs[job_id],
+                "status": "completed",
+                "finished_at": time.time(),
+                "result": json.loads(path_json_string)
+            })
+            logger.success(f"Learning path job {job_id} completed in {time.time() - start_time:.2f}s")
+        except ValueError as e:
+            logger.warning(f"Learning path job {job_id} failed: {e}")
+            await self._save_job({**self._jobs[job_id], "status": "failed", "finished_at": time.time(), "error": str(e)})
+        except Exception as e:
+            logger.error(f"Learning path job {job_id} failed unexpectedly: {e}")
+            await self._save_job({
+                **self._jobs[job_id],
+                "status": "failed",
+                "finished_at": time.time(),
+                "error": "An internal server error occurred."
+            })
+
+    async def _save_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        job["updated_at"] = time.time()
+        self._jobs[job["job_id"]] = job
+        await cache_manager.set_json(self._job_key(job["job_id"]), job, ttl=self.job_ttl)
+        if job["status"] not in ACTIVE_STATUSES:
+            # Drop the local copy when the Redis record would have expired as well
+            asyncio.get_running_loop().call_later(self.job_ttl, self._jobs.pop, job["job_id"], None)
+        return job
+
+    async def _discard_job(self, job_id: str):
+        """Removes a job record that was never queued."""
+        self._jobs.pop(job_id, None)
+        await cache_manager.delete(self._job_key(job_id))
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{JOB_KEY_PREFIX}:{job_id}"
+
+    def _active_key(self, dedup_key: str) -> str:
+        return f"{ACTIVE_JOB_KEY_PREFIX}:{dedup_key}"
+
+# Single instance to be used across the application
+learning_path_jobs = LearningPathJobManager()
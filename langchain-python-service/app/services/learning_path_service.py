@@ -1,7 +1,8 @@
 import asyncio
+import inspect
 import re
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncGenerator, Tuple, Callable
 from loguru import logger
 from langchain_core.messages import HumanMessage
 
@@ -9,18 +10,49 @@ from app.models.llm_config import LLMConfig
 from app.prompts.learning_path_prompts import (
     AGENT_A_INTERPRETER_PROMPT,
     TEXT_OUTLINER_PROMPT,
-    FINAL_JSON_AGENT_PROMPT,
-    JSON_CONVERTER_PROMPT,
-    AGENT_C_METADATA_PROMPT
+    OUTLINE_SKELETON_PROMPT,
+    SECTION_EXPANDER_PROMPT,
+    SUBTREE_OUTLINER_PROMPT,
+    AGENT_C_METADATA_PROMPT,
+    LEARNING_PATH_PROMPT_VERSION
 )
-from app.models.learning_path import LearningNode
+from pydantic import ValidationError
+from app.models.learning_path import LearningNode, LearningPathResponse
 from app.services.cache_manager import cache_manager
+from app.services.outline_parser import outline_parser, OutlineStreamParser, LEAF_PROMPT_TEMPLATE, DESCRIPTION_TEMPLATE
+from app.services.request_interpreter import request_interpreter
 from app.services.model_router_service import model_router
 from app.prompts.domain_methodologies import DOMAIN_METHODOLOGY_MAP, DEFAULT_METHODOLOGY
 from app.config.model_router_config import Domain
 
 # Removed _is_draft_valid as it's no longer needed with new text->JSON approach
 
+# Cached values are tied to the templates that produced them: editing a prompt retires old keys
+LEARNING_PATH_NAMESPACE = cache_manager.register_namespace("learning_path_raw", [
+    LEARNING_PATH_PROMPT_VERSION,
+    AGENT_A_INTERPRETER_PROMPT,
+    TEXT_OUTLINER_PROMPT,
+    OUTLINE_SKELETON_PROMPT,
+    SECTION_EXPANDER_PROMPT,
+    AGENT_C_METADATA_PROMPT,
+    LEAF_PROMPT_TEMPLATE,
+    DESCRIPTION_TEMPLATE
+])
+OUTLINE_SECTION_NAMESPACE = cache_manager.register_namespace("outline_section", [
+    LEARNING_PATH_PROMPT_VERSION,
+    SECTION_EXPANDER_PROMPT
+])
+
+# Outline calls request the model's full output budget: gemini-2.5-flash spends part of
+# max_tokens on reasoning, and a tighter cap cuts outlines off mid-section
+OUTLINE_MAX_TOKENS = LLMConfig.AVAILABLE_MODELS["google/gemini-2.5-flash"]["max_output"]
+
+# Deepest level (0-based) TEXT_OUTLINER_PROMPT produces: 1 → 1.1 → 1.1.1 → 1.1.1.1
+OUTLINE_MAX_LEVEL = 3
+
+# A string literal (kept as is) or a trailing comma before a closing bracket
+TRAILING_COMMA_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|,\s*([}\]])')
+
 class LearningPathService:
     """Service to orchestrate the generation of a learning path."""
 
@@ -30,105 +62,603 @@ class LearningPathService:
         "Expert": "This user is experienced. Focus on advanced topics, architectural patterns, performance optimization, and in-depth case studies. Challenge them with complex problems.",
     }
 
+    # TTL per pipeline checkpoint; the final tree is stored under the path cache key itself
+    _STAGE_TTLS = {
+        "analysis": 3600,
+        "guidance": 3600,
+        "outline": 86400,
+    }
+
+    def get_path_cache_key(self, user_request: str, quality_level: str) -> str:
+        return cache_manager.namespaced_key(
+            LEARNING_PATH_NAMESPACE,
+            cache_manager.normalize_text(user_request),
+            quality_level
+        )
+
     async def generate_path(self, user_request: str, quality_level: str = "standard") -> str:
         """
         Orchestrates agents to generate a learning path and returns the raw JSON string.
         """
-        cache_key = f"learning_path_v3_raw:{hash(user_request.lower().strip())}:{quality_level}"
-        cached_path = await cache_manager.get_json(cache_key)
-        if cached_path:
-            logger.success(f"Cache HIT for raw learning path. Key: {cache_key}")
-            return json.dumps(cached_path)
+        cache_key = self.get_path_cache_key(user_request, quality_level)
+        # Concurrent identical requests (across workers) wait for a single pipeline run
+        final_path = await cache_manager.get_or_compute(
+            cache_key,
+            lambda: self._run_pipeline(user_request, cache_key),
+            ttl=86400,
+            lock_timeout=600
+        )
+        return json.dumps(final_path, ensure_ascii=False)
 
+    async def _run_pipeline(self, user_request: str, cache_key: str) -> Dict[str, Any]:
         logger.info(f"Cache MISS. Starting learning path generation for request: '{user_request[:50]}...'")
 
+        # Each stage is checkpointed under the request key, so a retry resumes from the last good stage.
+        # All checkpoints are fetched up front in one round trip.
+        checkpoints = await self._load_checkpoints(cache_key)
+
         # 1. Agent A: Interpret the user's request
-        analysis = await self._run_agent_a_interpreter(user_request)
+        analysis = await self._run_stage(cache_key, "analysis", lambda: self._interpret_request(user_request), checkpoints)
         logger.info(f"Agent A analysis complete: {analysis}")
 
         # 2. Determine Domain, Methodology, and Guidance
+        domain_methodology, proficiency_guidance = await self._run_stage(
+            cache_key, "guidance", lambda: self._get_outline_guidance(analysis), checkpoints
+        )
+
+        # 3. Agent B: Generate text outline
+        text_outline = await self._run_stage(
+            cache_key, "outline",
+            lambda: self._run_text_outliner_agent(analysis, domain_methodology, proficiency_guidance),
+            checkpoints
+        )
+        logger.info("Text Outliner Agent finished. Raw outline has been created.")
+
+        # 4. Convert the outline into the final tree locally; only metadata needs a small LLM call
+        final_path = await self._build_final_path(analysis, text_outline)
+        logger.info(f"Final tree built locally with {len(final_path['tree'])} nodes.")
+        logger.success(f"Learning path generation complete. Output will be cached.")
+        return final_path
+
+    async def generate_path_stream(self, user_request: str, quality_level: str = "standard") -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Streaming variant of generate_path. Yields events as they become available:
+        'analysis', one 'node' per tree node, then 'done' with the full path.
+        Level 1 nodes are sent right after the skeleton call, as parents; deeper nodes as
+        their section's expansion streams in, parents before children. 'done' carries the
+        authoritative tree (e.g. a section whose expansion failed ends up as a leaf).
+        """
+        cache_key = self.get_path_cache_key(user_request, quality_level)
+        cached_path = await cache_manager.get_json(cache_key)
+        if cached_path:
+            logger.success(f"Cache HIT for streamed learning path. Key: {cache_key}")
+            for node in cached_path.get("tree", []):
+                yield {"type": "node", "node": node}
+            yield {"type": "done", **cached_path}
+            return
+
+        checkpoints = await self._load_checkpoints(cache_key)
+        analysis = await self._run_stage(cache_key, "analysis", lambda: self._interpret_request(user_request), checkpoints)
+        logger.info(f"Agent A analysis complete: {analysis}")
+        yield {"type": "analysis", "analysis": analysis}
+
+        domain_methodology, proficiency_guidance = await self._run_stage(
+            cache_key, "guidance", lambda: self._get_outline_guidance(analysis), checkpoints
+        )
+
+        text_outline = checkpoints.get("outline")
+        if text_outline is not None:
+            # Resume: replay the checkpointed outline instead of regenerating it
+            parser = OutlineStreamParser()
+            for node in parser.feed(text_outline) + parser.close():
+                yield {"type": "node", "node": outline_parser.to_tree_json([node])[0]}
+        else:
+            # Same fan-out as /generate, so both endpoints cache the same tree under this key.
+            # Sections stream concurrently, so their lines arrive interleaved.
+            parser = OutlineStreamParser(interleaved=True)
+            lines = []
+            async for line in self._iter_outline_lines(analysis, domain_methodology, proficiency_guidance):
+                lines.append(line)
+                for node in parser.feed(line + "\n"):
+                    yield {"type": "node", "node": outline_parser.to_tree_json([node])[0]}
+            for node in parser.close():
+                yield {"type": "node", "node": outline_parser.to_tree_json([node])[0]}
+            text_outline = self._join_outline_lines(lines)
+            await self._save_checkpoint(cache_key, "outline", text_outline)
+        logger.info(f"Streamed outline finished with {len(parser.nodes)} nodes.")
+
+        # Streamed nodes are provisional; the final tree is parsed from the ordered outline
+        final_path = await self._build_final_path(analysis, text_outline)
+        await cache_manager.set_json(cache_key, final_path, ttl=86400)
+        yield {"type": "done", **final_path}
+
+    async def regenerate_subtree(
+        self,
+        topic_name: str,
+        description: str,
+        tree: List[LearningNode],
+        target_temp_id: str,
+        message: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Regenerates (or expands) only the subtree under `target_temp_id` with one scoped
+        Agent B call, and splices the result back into the existing tree. The subtree may not
+        go deeper than the path itself (at least OUTLINE_MAX_LEVEL); deeper items are dropped.
+        """
+        nodes_by_id = {node.temp_id: node for node in tree}
+        target = nodes_by_id.get(target_temp_id)
+        if target is None:
+            raise ValueError(f"Node '{target_temp_id}' does not exist in the tree.")
+        max_level = max([OUTLINE_MAX_LEVEL, *(node.temp_id.count(".") for node in tree)])
+        remaining_depth = max_level - target_temp_id.count(".")
+        if remaining_depth < 1:
+            raise ValueError(f"Node '{target_temp_id}' is already at the deepest level of the learning path.")
+
+        ancestors = []
+        parent_ids = target.requires
+        while parent_ids and parent_ids[0] in nodes_by_id:
+            parent = nodes_by_id[parent_ids[0]]
+            ancestors.insert(0, parent.title)
+            parent_ids = parent.requires
+        section_path = " > ".join([topic_name, *ancestors, target.title])
+
+        interpreted, _ = request_interpreter.interpret(message or f"{topic_name} {description}")
+        analysis = {
+            "topic": target.title,
+            "requirement": (
+                f"{message or 'Expand this lesson into a detailed sub-outline'}. "
+                f"This outline covers only the section '{section_path}' of the course '{topic_name}'"
+                f"{': ' + description if description else ''}. Stay within the scope of this section."
+            ),
+            "language": interpreted["language"],
+            "level": interpreted["level"]
+        }
+        domain_methodology, proficiency_guidance = self._get_outline_guidance(analysis)
+        prompt = SUBTREE_OUTLINER_PROMPT.format(
+            topic=analysis['topic'],
+            requirement=analysis['requirement'],
+            language=analysis['language'],
+            max_depth=remaining_depth,
+            depth_example=" → ".join(["1", "1.1", "1.1.1", "1.1.1.1", "1.1.1.1.1"][:remaining_depth]),
+            domain_methodology=domain_methodology,
+            proficiency_guidance=proficiency_guidance
+        )
+        llm = LLMConfig.get_llm(model_name="google/gemini-2.5-flash", temperature=0.4, max_tokens=OUTLINE_MAX_TOKENS)
+        response = await llm.ainvoke([HumanMessage(content=prompt)])
+
+        renumbered = self._renumber_section(str(response.content), target_temp_id)
+        subtree_lines = [line for line in renumbered if outline_parser.parse_line(line)[0].count(".") <= max_level]
+        dropped = len(renumbered) - len(subtree_lines)
+        if dropped:
+            logger.warning(f"Subtree '{target_temp_id}': dropped {dropped} items deeper than level {max_level}")
+        if not subtree_lines:
+            raise ValueError(f"Subtree generation for '{target.title}' returned no outline items.")
+
+        # Rebuild the tree in order: descendants of the target are replaced by the new subtree
+        descendant_prefix = f"{target_temp_id}."
+        spliced: Dict[str, LearningNode] = {}
+        for node in tree:
+            if node.temp_id.startswith(descendant_prefix):
+                continue
+            node = node.model_copy(deep=True)
+            spliced[node.temp_id] = node
+            if node.temp_id == target_temp_id:
+                node.next = []
+                for line in subtree_lines:
+                    temp_id, title = outline_parser.parse_line(line)
+                    if temp_id not in spliced:
+                        outline_parser.add_node(spliced, temp_id, title)
+
+        logger.info(f"Subtree '{target_temp_id}' regenerated with {len(subtree_lines)} nodes")
+        return self._validate_learning_path({
+            "topicName": topic_name,
+            "description": description,
+            "tree": [node.model_dump() for node in spliced.values()]
+        })
+
+    async def _run_stage(self, cache_key: str, stage: str, compute: Callable[[], Any], checkpoints: Dict[str, Any]) -> Any:
+        """Returns the checkpointed output of a pipeline stage, or computes and checkpoints it."""
+        checkpoint = checkpoints.get(stage)
+        if checkpoint is not None:
+            logger.info(f"Resuming learning path from '{stage}' checkpoint")
+            return checkpoint
+
+        result = compute()
+        if inspect.isawaitable(result):
+            result = await result
+        await self._save_checkpoint(cache_key, stage, result)
+        return result
+
+    async def _load_checkpoints(self, cache_key: str) -> Dict[str, Any]:
+        """Fetches every stage checkpoint of a request with a single MGET."""
+        stages = list(self._STAGE_TTLS)
+        values = await cache_manager.mget_json([self._checkpoint_key(cache_key, stage) for stage in stages])
+        return {stage: value for stage, value in zip(stages, values) if value is not None}
+
+    async def _save_checkpoint(self, cache_key: str, stage: str, data: Any):
+        await cache_manager.set_json(self._checkpoint_key(cache_key, stage), data, ttl=self._STAGE_TTLS[stage])
+
+    def _checkpoint_key(self, cache_key: str, stage: str) -> str:
+        return f"{cache_key}:stage:{stage}"
+
+    def _get_outline_guidance(self, analysis: Dict) -> Tuple[str, str]:
+        """Returns (domain_methodology, proficiency_guidance) for Agent B."""
         _ , detected_domain = model_router.select_model(
             user_message=analysis['requirement'],
             topic_title=analysis['topic']
         )
         domain_methodology = DOMAIN_METHODOLOGY_MAP.get(detected_domain, DEFAULT_METHODOLOGY)
         proficiency_guidance = self._PROFICIENCY_GUIDANCE.get(analysis.get("level", "Intermediate"), "")
+        return domain_methodology, proficiency_guidance
+    
+    async def _interpret_request(self, user_request: str) -> Dict[str, Any]:
+        """
+        Interprets the request locally and only falls back to Agent A (LLM) when the
+        rule-based result is not confident. The chosen path is recorded in `interpreter`.
+        """
+        analysis, confidence = request_interpreter.interpret(user_request)
+        if request_interpreter.is_confident(confidence):
+            logger.info(f"Request interpreted locally (confidence {confidence:.2f})")
+            return {**analysis, "interpreter": "local", "interpreter_confidence": confidence}
 
-        # 3. Agent B: Generate text outline
-        text_outline = await self._run_text_outliner_agent(analysis, domain_methodology, proficiency_guidance)
-        logger.info("Text Outliner Agent finished. Raw outline has been created.")
-
-        # 4. Final Agent: Generate the complete JSON string from all context
-        final_json_string = await self._run_final_json_agent(analysis, text_outline)
-        logger.info("Final JSON Agent finished. Raw JSON string has been created.")
+        logger.info(f"Local interpretation not confident ({confidence:.2f}), falling back to Agent A")
+        analysis = await self._run_agent_a_interpreter(user_request, defaults=analysis)
+        return {**analysis, "interpreter": "llm", "interpreter_confidence": confidence}
 
-        # Validate that the output is valid JSON before caching and returning
-        try:
-            parsed_json = json.loads(final_json_string)
-            await cache_manager.set_json(cache_key, parsed_json, ttl=86400)
-            logger.success(f"Learning path generation complete. Output is valid JSON and has been cached.")
-        except json.JSONDecodeError as e:
-            logger.error(f"CRITICAL: Final JSON Agent produced invalid JSON. Error: {e}")
-            logger.error(f"Raw output from agent was:\n{final_json_string}")
-            raise ValueError("The final agent failed to produce a valid JSON structure.") from e
-
-        return final_json_string
-    
-    async def _run_agent_a_interpreter(self, user_request: str) -> Dict[str, str]:
-        """Runs Agent A to interpret the request and extract key fields as JSON."""
+    async def _run_agent_a_interpreter(self, user_request: str, defaults: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Runs Agent A to interpret the request and extract key fields as JSON.
+        Keys missing from a truncated response are filled from `defaults` when given.
+        """
         prompt = AGENT_A_INTERPRETER_PROMPT.format(user_request=user_request)
         llm = LLMConfig.get_llm(model_name="google/gemini-2.0-flash-lite-001", temperature=0.0, max_tokens=512)
         response = await llm.ainvoke([HumanMessage(content=prompt)])
         content = str(response.content)
 
-        try:
-            # Clean the response to ensure it's a valid JSON string
-            cleaned_content = re.sub(r"```json\n?|```", "", content).strip()
-            analysis = json.loads(cleaned_content)
-            
-            # Validate the structure
-            required_keys = ['topic', 'requirement', 'language', 'level']
-            if not isinstance(analysis, dict) or not all(k in analysis for k in required_keys):
-                raise ValueError(f"JSON output from Agent A is missing required keys. Got: {analysis.keys()}")
-
-            return analysis
-        except json.JSONDecodeError as e:
+        analysis = self._repair_json(content)
+        if not isinstance(analysis, dict):
             logger.error(f"Agent A returned invalid JSON: {content}")
-            raise ValueError(f"Agent A returned malformed output: {content}") from e
+            raise ValueError(f"Agent A returned malformed output: {content}")
+
+        # Validate the structure
+        required_keys = ['topic', 'requirement', 'language', 'level']
+        analysis = {**(defaults or {}), **{k: v for k, v in analysis.items() if v}}
+        if not all(analysis.get(k) for k in required_keys):
+            raise ValueError(f"JSON output from Agent A is missing required keys. Got: {list(analysis.keys())}")
+
+        return analysis
 
     async def _run_text_outliner_agent(self, analysis: Dict, domain_methodology: str, proficiency_guidance: str) -> str:
-        """Runs Agent B (Text Outliner) to generate a comprehensive text outline."""
-        prompt = TEXT_OUTLINER_PROMPT.format(
+        """Runs Agent B and returns the whole numbered text outline (see _iter_outline_lines)."""
+        lines = [line async for line in self._iter_outline_lines(analysis, domain_methodology, proficiency_guidance)]
+        return self._join_outline_lines(lines)
+
+    async def _iter_outline_lines(
+        self, analysis: Dict, domain_methodology: str, proficiency_guidance: str
+    ) -> AsyncGenerator[str, None]:
+        """
+        Runs Agent B as a two-phase fan-out: a short skeleton call for the Level 1 sections,
+        then one concurrent, streamed expansion per section.
+        Yields numbered outline lines as soon as they exist: every Level 1 line right after
+        the skeleton call, then each section's lines while its expansion streams in. Lines
+        of different sections interleave; _join_outline_lines restores the outline order,
+        so /generate and /generate/stream build the same tree. Falls back to the streamed
+        single-call outliner when the skeleton is unusable.
+        """
+        sections = await self._run_outline_skeleton_agent(analysis, domain_methodology, proficiency_guidance)
+        if len(sections) < 2:
+            logger.warning(f"Outline skeleton returned {len(sections)} sections, using single-call outliner instead")
+            prompt = self._build_outliner_prompt(analysis, domain_methodology, proficiency_guidance)
+            line_count = 0
+            async for line in self._stream_outline_lines(prompt):
+                line_count += 1
+                yield line
+            if not line_count:
+                raise ValueError("Text Outliner Agent returned empty content")
+            return
+
+        for index, title in enumerate(sections, start=1):
+            yield f"{index}. {title}"
+
+        skeleton = "\n".join(f"{index}. {title}" for index, title in enumerate(sections, start=1))
+        # Sections are cached independently of the user's wording; look them all up in one round trip
+        section_keys = [self._section_cache_key(analysis, title) for title in sections]
+        expansions: List[Any] = await cache_manager.mget_json(section_keys)
+        for index, expansion in enumerate(expansions):
+            if expansion:
+                for line in self._renumber_section(expansion, str(index + 1)):
+                    yield line
+
+        lines_queue: asyncio.Queue = asyncio.Queue()
+        generated: Dict[str, str] = {}
+        failed: List[str] = []
+
+        async def expand(index: int, title: str):
+            section_lines = []
+            try:
+                async for line in self._expand_outline_section(analysis, title, skeleton, domain_methodology, proficiency_guidance):
+                    section_lines.append(line)
+                    await lines_queue.put(self._renumber_section(line, str(index + 1)))
+                if not section_lines:
+                    raise ValueError(f"Section expansion for '{title}' returned no outline items")
+                generated[section_keys[index]] = "\n".join(section_lines)
+            except Exception as e:
+                failed.append(title)
+                logger.warning(f"Expansion of section '{title}' failed, keeping {len(section_lines)} items received: {e}")
+            finally:
+                await lines_queue.put(None)
+
+        tasks = [
+            asyncio.create_task(expand(index, title))
+            for index, (title, expansion) in enumerate(zip(sections, expansions))
+            if not expansion
+        ]
+        logger.info(f"Outline sections: {len(sections) - len(tasks)} cached, {len(tasks)} generated")
+        try:
+            running = len(tasks)
+            while running:
+                renumbered = await lines_queue.get()
+                if renumbered is None:
+                    running -= 1
+                    continue
+                for line in renumbered:
+                    yield line
+        finally:
+            for task in tasks:
+                task.cancel()
+            if generated:
+                await cache_manager.mset_json(generated, ttl=7 * 86400)
+
+        if len(failed) == len(sections):
+            raise ValueError("Text Outliner Agent failed to expand any section")
+        logger.info(f"Outline fan-out finished: {len(sections)} sections, {len(failed)} failed")
+
+    async def _stream_outline_lines(self, prompt: str) -> AsyncGenerator[str, None]:
+        """Streams one Agent B call and yields each numbered outline line once it is complete."""
+        llm = LLMConfig.get_llm(
+            model_name="google/gemini-2.5-flash", temperature=0.4, max_tokens=OUTLINE_MAX_TOKENS, streaming=True
+        )
+        buffer = ""
+        async for chunk in llm.astream([HumanMessage(content=prompt)]):
+            buffer += chunk.content if isinstance(chunk.content, str) else ""
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                if outline_parser.parse_line(line):
+                    yield line.strip()
+        if outline_parser.parse_line(buffer):
+            yield buffer.strip()
+
+    def _join_outline_lines(self, lines: List[str]) -> str:
+        """Orders outline lines by their numbering (pre-order), keeping arrival order for ties."""
+        def numbering(line: str) -> Tuple[int, ...]:
+            return tuple(int(part) for part in outline_parser.parse_line(line)[0].split("."))
+        return "\n".join(sorted(lines, key=numbering))
+
+    async def _run_outline_skeleton_agent(self, analysis: Dict, domain_methodology: str, proficiency_guidance: str) -> List[str]:
+        """Runs the skeleton phase of Agent B and returns the Level 1 section titles."""
+        prompt = OUTLINE_SKELETON_PROMPT.format(
             topic=analysis['topic'],
             requirement=analysis['requirement'],
             language=analysis['language'],
             domain_methodology=domain_methodology,
             proficiency_guidance=proficiency_guidance
         )
-        llm = LLMConfig.get_llm(model_name="google/gemini-2.5-flash", temperature=0.4, max_tokens=4096)
+        llm = LLMConfig.get_llm(model_name="google/gemini-2.5-flash", temperature=0.4, max_tokens=OUTLINE_MAX_TOKENS)
         response = await llm.ainvoke([HumanMessage(content=prompt)])
-        
-        text_outline = str(response.content).strip()
-        if not text_outline:
-            raise ValueError("Text Outliner Agent returned empty content")
-        
-        return text_outline
-        
-    async def _run_final_json_agent(self, analysis: dict, text_outline: str) -> str:
-        """Runs the Final JSON Agent to produce the complete raw JSON string."""
-        prompt = FINAL_JSON_AGENT_PROMPT.format(
+
+        sections = []
+        for line in str(response.content).splitlines():
+            parsed = outline_parser.parse_line(line)
+            # Only top-level entries belong to the skeleton
+            if parsed and "." not in parsed[0]:
+                sections.append(parsed[1])
+        return sections
+
+    async def _expand_outline_section(
+        self,
+        analysis: Dict,
+        section_title: str,
+        skeleton: str,
+        domain_methodology: str,
+        proficiency_guidance: str
+    ) -> AsyncGenerator[str, None]:
+        """Expands one Level 1 section, yielding lines numbered relative to the section (1, 1.1, ...)."""
+        prompt = SECTION_EXPANDER_PROMPT.format(
             topic=analysis['topic'],
             requirement=analysis['requirement'],
             language=analysis['language'],
-            text_outline=text_outline
+            skeleton=skeleton,
+            section_title=section_title,
+            domain_methodology=domain_methodology,
+            proficiency_guidance=proficiency_guidance
+        )
+        async for line in self._stream_outline_lines(prompt):
+            yield line
+
+    def _section_cache_key(self, analysis: Dict, section_title: str) -> str:
+        """Expansions are cached per section, so common sections are reused across learning paths."""
+        return cache_manager.namespaced_key(
+            OUTLINE_SECTION_NAMESPACE,
+            cache_manager.normalize_text(analysis['topic']),
+            cache_manager.normalize_text(section_title),
+            analysis['language'],
+            analysis.get('level', 'Intermediate')
+        )
+
+    def _renumber_section(self, section_outline: str, prefix: str) -> List[str]:
+        """Prefixes the relative numbering of an expanded section with its parent's temp_id."""
+        lines = []
+        for line in section_outline.splitlines():
+            parsed = outline_parser.parse_line(line)
+            if parsed:
+                local_id, title = parsed
+                lines.append(f"{prefix}.{local_id}. {title}")
+        return lines
+
+    def _build_outliner_prompt(self, analysis: Dict, domain_methodology: str, proficiency_guidance: str) -> str:
+        return TEXT_OUTLINER_PROMPT.format(
+            topic=analysis['topic'],
+            requirement=analysis['requirement'],
+            language=analysis['language'],
+            domain_methodology=domain_methodology,
+            proficiency_guidance=proficiency_guidance
         )
-        # Use a powerful and reliable model for this critical final step
-        llm = LLMConfig.get_llm(model_name="openai/gpt-4o-mini", temperature=0.05, max_tokens=8192)
-        response = await llm.ainvoke([HumanMessage(content=prompt)])
-        
-        # Return the raw, cleaned string content
-        return re.sub(r"```json\n?|```", "", str(response.content)).strip()
         
+    async def _build_final_path(self, analysis: dict, text_outline: str, nodes: Optional[List[LearningNode]] = None) -> Dict[str, Any]:
+        """Builds the complete learning path object: locally parsed tree plus topic metadata."""
+        if nodes is None:
+            nodes = outline_parser.parse(text_outline)
+        if not nodes:
+            logger.error(f"Outline parser found no numbered lines in outline:\n{text_outline}")
+            raise ValueError("The text outline could not be converted into a learning tree.")
+
+        metadata = await self._run_metadata_agent(analysis, text_outline)
+        return self._validate_learning_path({
+            "topicName": metadata["topicName"],
+            "description": metadata["description"],
+            "tree": outline_parser.to_tree_json(nodes)
+        })
+
+    async def _run_metadata_agent(self, analysis: dict, text_outline: str) -> Dict[str, str]:
+        """Runs a small LLM call for topicName/description, falling back to Agent A's analysis."""
+        fallback = {"topicName": analysis['topic'], "description": analysis['requirement']}
+        prompt = AGENT_C_METADATA_PROMPT.format(
+            topic=analysis['topic'],
+            requirement=analysis['requirement'],
+            language=analysis['language'],
+            final_outline=text_outline
+        )
+        try:
+            llm = LLMConfig.get_llm(model_name="google/gemini-2.0-flash-lite-001", temperature=0.3, max_tokens=512)
+            response = await llm.ainvoke([HumanMessage(content=prompt)])
+            metadata = self._repair_json(str(response.content))
+            if not isinstance(metadata, dict) or not metadata.get("topicName") or not metadata.get("description"):
+                raise ValueError(f"Metadata output is missing required keys. Got: {metadata}")
+            return {"topicName": str(metadata["topicName"]), "description": str(metadata["description"])}
+        except Exception as e:
+            logger.warning(f"Metadata agent failed, using Agent A analysis instead: {e}")
+            return fallback
+
+    def _repair_json(self, content: str) -> Any:
+        """
+        Tolerant JSON parsing for LLM output. Strips code fences and surrounding prose,
+        removes trailing commas, and closes truncated output by dropping the partial
+        trailing element. Returns None if nothing can be salvaged.
+        """
+        text = re.sub(r"```(?:json)?\n?|```", "", content).strip()
+        starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+        if not starts:
+            return None
+        text = text[min(starts):]
+
+        decoder = json.JSONDecoder()
+        # Trailing commas are removed outside string literals only
+        without_trailing_commas = TRAILING_COMMA_PATTERN.sub(lambda match: match.group(1) or match.group(0), text)
+        candidates = [text, without_trailing_commas]
+        candidates.append(self._close_truncated_json(candidates[-1]))
+        for candidate in candidates:
+            try:
+                # raw_decode ignores any trailing prose after the JSON value
+                value, _ = decoder.raw_decode(candidate)
+                if candidate is not text:
+                    logger.info("Malformed JSON from agent was repaired locally")
+                return value
+            except json.JSONDecodeError:
+                continue
+        return None
+
+    def _close_truncated_json(self, text: str) -> str:
+        """Cuts a truncated JSON document back to its last complete element and closes it."""
+        stack: List[str] = []
+        # Per open container: index where its last complete element ends,
+        # and whether the next token is a value (array item or after a key's ':')
+        cut_points: List[int] = []
+        expecting_value: List[bool] = []
+        in_string = False
+        string_is_value = False
+        in_scalar = False
+        escaped = False
+        for index, char in enumerate(text):
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+                    if string_is_value:
+                        cut_points[-1] = index + 1
+                continue
+            if in_scalar and (char in ",}]" or char.isspace()):
+                # A number or literal is only known to be complete once a delimiter follows
+                in_scalar = False
+                cut_points[-1] = index
+            if char == '"':
+                in_string = True
+                string_is_value = bool(stack) and (stack[-1] == "]" or expecting_value[-1])
+            elif char in "{[":
+                stack.append("}" if char == "{" else "]")
+                cut_points.append(index + 1)
+                expecting_value.append(False)
+            elif char in "}]":
+                if not stack:
+                    return text[:index]
+                stack.pop()
+                cut_points.pop()
+                expecting_value.pop()
+                if not stack:
+                    return text[:index + 1]
+                cut_points[-1] = index + 1
+            elif char == ":" and stack:
+                expecting_value[-1] = True
+            elif char == "," and stack:
+                cut_points[-1] = index
+                expecting_value[-1] = False
+            elif stack and not char.isspace():
+                in_scalar = True
+
+        if not stack:
+            return text
+        return text[:cut_points[-1]].rstrip().rstrip(",") + "".join(reversed(stack))
+
+    def _validate_learning_path(self, data: Any) -> Dict[str, Any]:
+        """
+        Validates a learning path against LearningPathResponse / LearningNode.
+        Invalid (e.g. partial) nodes are dropped and references to them pruned,
+        so a mostly-valid tree is salvaged instead of failing the whole request.
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("tree"), list):
+            raise ValueError("Learning path must be an object with a 'tree' array.")
+
+        nodes: List[LearningNode] = []
+        for raw_node in data["tree"]:
+            try:
+                nodes.append(LearningNode.model_validate(raw_node))
+            except ValidationError as e:
+                logger.warning(f"Dropping invalid learning node {str(raw_node)[:80]}: {e.error_count()} errors")
+
+        valid_ids = {node.temp_id for node in nodes}
+        for node in nodes:
+            node.requires = [temp_id for temp_id in node.requires if temp_id in valid_ids]
+            had_children = bool(node.next)
+            node.next = [temp_id for temp_id in node.next if temp_id in valid_ids]
+            if had_children and not node.next:
+                node.is_chat_enabled = True
+                node.prompt_sample = LEAF_PROMPT_TEMPLATE.format(title=node.title)
+
+        try:
+            path = LearningPathResponse(topicName=data.get("topicName"), description=data.get("description"), tree=nodes)
+        except ValidationError as e:
+            raise ValueError(f"Learning path failed schema validation: {e}") from e
+        if not path.tree:
+            raise ValueError("Learning path has no valid nodes.")
+
+        return {
+            "topicName": path.topicName,
+            "description": path.description,
+            "tree": outline_parser.to_tree_json(path.tree)
+        }
+
     def _summarize_json_for_prompt(self, data: Any, indent: str = "") -> str:
         # This function is now DEPRECATED as metadata is part of the final agent.
         return "" # Return empty string instead of None to match return type
\ No newline at end of file
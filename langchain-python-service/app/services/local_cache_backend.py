@@ -0,0 +1,190 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+from loguru import logger
+
+class LocalCacheBackend:
+    """
+    SQLite-backed stand-in for the Redis client, used while Redis is unreachable.
+    Implements the subset of the redis.asyncio API that CacheManager relies on
+    (get/mget/setex/set NX/incr/delete/exists/pipeline/pub-sub), with per-key TTLs.
+
+    The database file is shared by all workers on the host, so locks and values
+    stay consistent between them. Pub/sub is not available: waiters fall back to polling.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        logger.info(f"Local cache backend ready at {path}")
+
+    async def _run(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        def locked():
+            with self._lock:
+                return operation(self._conn)
+        return await asyncio.to_thread(locked)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self):
+        await self._run(lambda conn: conn.close())
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(lambda conn: _get(conn, key, time.time()))
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        now = time.time()
+        return await self._run(lambda conn: [_get(conn, key, now) for key in keys])
+
+    async def setex(self, key: str, ttl: int, value: bytes) -> bool:
+        await self._run(lambda conn: _set(conn, key, value, ttl))
+        return True
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+
+        def operation(conn: sqlite3.Connection) -> Optional[bool]:
+            if not nx:
+                _set(conn, key, value, ex)
+                return True
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                written = _get(conn, key, time.time()) is None
+                if written:
+                    _set(conn, key, value, ex)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return True if written else None
+
+        return await self._run(operation)
+
+    async def incr(self, key: str) -> int:
+        def operation(conn: sqlite3.Connection) -> int:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = int(_get(conn, key, time.time()) or 0) + 1
+                _set(conn, key, str(value).encode("utf-8"), None)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return value
+        return await self._run(operation)
+
+    async def delete(self, *keys: str) -> int:
+        return await self._run(lambda conn: sum(_delete(conn, key) for key in keys))
+
+    async def delete_if_equals(self, key: str, value: str) -> int:
+        """Compare-and-delete, the local equivalent of the lock release script."""
+        return await self._run(
+            lambda conn: conn.execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, value.encode("utf-8"))).rowcount
+        )
+
+    async def exists(self, *keys: str) -> int:
+        now = time.time()
+        return await self._run(lambda conn: sum(_get(conn, key, now) is not None for key in keys))
+
+    async def publish(self, channel: str, message: Any) -> int:
+        return 0
+
+    def pubsub(self) -> "LocalPubSub":
+        return LocalPubSub()
+
+    def pipeline(self, transaction: bool = False) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+    async def purge_expired(self) -> int:
+        """Deletes expired entries, then the soonest-expiring ones above max_entries."""
+        def operation(conn: sqlite3.Connection) -> int:
+            removed = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                removed += conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at IS NULL, expires_at LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+            return removed
+        return await self._run(operation)
+
+class LocalPipeline:
+    """Queues commands and runs them in one SQLite transaction."""
+
+    def __init__(self, backend: LocalCacheBackend):
+        self._backend = backend
+        self._commands: List[Tuple[str, tuple]] = []
+
+    def get(self, key: str) -> "LocalPipeline":
+        self._commands.append(("get", (key,)))
+        return self
+
+    def setex(self, key: str, ttl: int, value: bytes) -> "LocalPipeline":
+        self._commands.append(("setex", (key, ttl, value)))
+        return self
+
+    def delete(self, key: str) -> "LocalPipeline":
+        self._commands.append(("delete", (key,)))
+        return self
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        now = time.time()
+
+        def operation(conn: sqlite3.Connection) -> List[Any]:
+            results = []
+            conn.execute("BEGIN")
+            try:
+                for command, args in commands:
+                    if command == "get":
+                        results.append(_get(conn, args[0], now))
+                    elif command == "setex":
+                        _set(conn, args[0], args[2], args[1])
+                        results.append(True)
+                    else:
+                        results.append(_delete(conn, args[0]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return results
+
+        return await self._backend._run(operation)
+
+class LocalPubSub:
+    """No-op pub/sub: get_message just waits, so subscribers re-check the key on a timer."""
+
+    async def subscribe(self, *channels: str):
+        pass
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> None:
+        await asyncio.sleep(max(timeout, 0))
+        return None
+
+    async def aclose(self):
+        pass
+
+def _get(conn: sqlite3.Connection, key: str, now: float) -> Optional[bytes]:
+    row = conn.execute(
+        "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+    ).fetchone()
+    return row[0] if row else None
+
+def _set(conn: sqlite3.Connection, key: str, value: bytes, ttl: Optional[int]):
+    expires_at = time.time() + ttl if ttl else None
+    conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at))
+
+def _delete(conn: sqlite3.Connection, key: str) -> int:
+    return conn.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
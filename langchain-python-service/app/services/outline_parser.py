@@ -0,0 +1,159 @@
+import re
+from typing import Dict, List, Optional, Any
+from loguru import logger
+
+from app.models.learning_path import LearningNode
+
+# "1. Title", "1.1. Title", "1.1.1 Title", optionally prefixed by markdown bullets/headings
+_OUTLINE_LINE_RE = re.compile(r"^[\s#>*\-+]*(\d+(?:\.\d+)*)(\.?)\s+(.+?)\s*$")
+
+LEAF_PROMPT_TEMPLATE = "Giải thích chi tiết về {title}. Cung cấp ví dụ cụ thể và hướng dẫn thực hành."
+DESCRIPTION_TEMPLATE = "Detailed explanation of {title}"
+
+class OutlineParser:
+    """
+    Deterministic converter from a numbered text outline (Agent B output) to learning tree nodes.
+    Applies locally the conversion rules the LLM JSON converter (FINAL_JSON_AGENT_PROMPT) used to follow.
+    """
+
+    def parse_line(self, line: str) -> Optional[tuple]:
+        """Returns (temp_id, title) for a numbered outline line, or None."""
+        match = _OUTLINE_LINE_RE.match(line)
+        if not match:
+            return None
+        temp_id, trailing_dot, raw_title = match.groups()
+        # A bare number without any dot ("2024 roadmap") is prose, not an outline entry
+        if "." not in temp_id and not trailing_dot:
+            return None
+        title = self._clean_title(raw_title)
+        if not title:
+            return None
+        return temp_id, title
+
+    def parse(self, text_outline: str) -> List[LearningNode]:
+        """Parses the whole outline into an ordered list of LearningNode objects."""
+        nodes: Dict[str, LearningNode] = {}
+        for line in text_outline.splitlines():
+            parsed = self.parse_line(line)
+            if not parsed:
+                continue
+            temp_id, title = parsed
+            if temp_id in nodes:
+                logger.warning(f"Outline parser: duplicate temp_id '{temp_id}' skipped")
+                continue
+            self.add_node(nodes, temp_id, title)
+        return list(nodes.values())
+
+    def add_node(self, nodes: Dict[str, LearningNode], temp_id: str, title: str) -> LearningNode:
+        """
+        Appends a node to an ordered node map, linking it to its nearest existing ancestor.
+        A new node is a leaf until a child is added; the parent loses its leaf status then.
+        """
+        parent_id = self._find_parent(nodes, temp_id)
+        node = LearningNode(
+            temp_id=temp_id,
+            title=title,
+            description=DESCRIPTION_TEMPLATE.format(title=title),
+            level=temp_id.count("."),
+            requires=[parent_id] if parent_id else [],
+            next=[],
+            is_chat_enabled=True,
+            prompt_sample=LEAF_PROMPT_TEMPLATE.format(title=title),
+        )
+        if parent_id:
+            parent = nodes[parent_id]
+            parent.next.append(temp_id)
+            parent.is_chat_enabled = False
+            parent.prompt_sample = ""
+        nodes[temp_id] = node
+        return node
+
+    def to_tree_json(self, nodes: List[LearningNode]) -> List[Dict[str, Any]]:
+        """
+        Serializes nodes for backend-main, which resolves relationships from
+        `parent_temp_id` / `next_temp_ids` in addition to the LearningNode fields.
+        """
+        return [
+            {
+                **node.model_dump(),
+                "parent_temp_id": node.requires[0] if node.requires else None,
+                "next_temp_ids": list(node.next),
+            }
+            for node in nodes
+        ]
+
+    def _find_parent(self, nodes: Dict[str, LearningNode], temp_id: str) -> Optional[str]:
+        parts = temp_id.split(".")
+        # Walk up the numbering so a missing intermediate level still attaches to an ancestor
+        for depth in range(len(parts) - 1, 0, -1):
+            candidate = ".".join(parts[:depth])
+            if candidate in nodes:
+                return candidate
+        return None
+
+    def _clean_title(self, raw_title: str) -> str:
+        title = raw_title.replace("**", "").replace("__", "")
+        title = title.strip(" \t-:*#`")
+        return " ".join(title.split())
+
+# Single instance to be used across the application
+outline_parser = OutlineParser()
+
+class OutlineStreamParser:
+    """
+    Incremental variant of OutlineParser for streamed LLM output.
+    The outline is in pre-order, so a node's leaf status is final once the next numbered
+    line arrives; nodes are released at that point. Their `next` lists keep growing until
+    the stream ends.
+
+    With `interleaved=True` the lines of different Level 1 sections may interleave (sections
+    expanded concurrently): Level 1 nodes are released at once, as parents, and other nodes
+    once the next line of their own section arrives.
+    """
+
+    def __init__(self, interleaved: bool = False):
+        self.interleaved = interleaved
+        self.nodes: Dict[str, LearningNode] = {}
+        self._buffer = ""
+        # Last node per Level 1 section that has not been released yet
+        self._pending: Dict[str, LearningNode] = {}
+
+    def feed(self, chunk: str) -> List[LearningNode]:
+        """Consumes a text chunk and returns the nodes completed by it."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        completed: List[LearningNode] = []
+        for line in lines:
+            completed.extend(self._consume_line(line))
+        return completed
+
+    def close(self) -> List[LearningNode]:
+        """Flushes the trailing partial line and the pending nodes."""
+        completed = self._consume_line(self._buffer)
+        self._buffer = ""
+        completed.extend(self._pending.values())
+        self._pending = {}
+        return completed
+
+    def _consume_line(self, line: str) -> List[LearningNode]:
+        parsed = outline_parser.parse_line(line)
+        if not parsed:
+            return []
+        temp_id, title = parsed
+        if temp_id in self.nodes:
+            logger.warning(f"Outline stream parser: duplicate temp_id '{temp_id}' skipped")
+            return []
+        node = outline_parser.add_node(self.nodes, temp_id, title)
+        section = temp_id.split(".", 1)[0]
+        if not self.interleaved:
+            completed = list(self._pending.values())
+            self._pending = {section: node}
+            return completed
+        if section == temp_id:
+            # Provisional: the section's expansion has not produced its children yet
+            node.is_chat_enabled = False
+            node.prompt_sample = ""
+            return [node]
+        completed = [self._pending.pop(section)] if section in self._pending else []
+        self._pending[section] = node
+        return completed
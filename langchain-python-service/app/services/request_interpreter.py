@@ -0,0 +1,173 @@
+import os
+import re
+import unicodedata
+from typing import Dict, Tuple
+from loguru import logger
+
+# Level rules, mirrored from AGENT_A_INTERPRETER_PROMPT
+BEGINNER_KEYWORDS = [
+    "for beginners", "for beginner", "from scratch", "from zero", "beginner",
+    "cho người mới bắt đầu", "người mới bắt đầu", "người mới", "từ con số 0", "từ số 0",
+    "cơ bản", "vỡ lòng", "nhập môn"
+]
+EXPERT_KEYWORDS = [
+    "advanced", "optimization", "optimisation", "architecture", "deep dive",
+    "nâng cao", "tối ưu", "kiến trúc", "chuyên sâu", "đào sâu"
+]
+# Phrases that describe the learner rather than the subject, removed from the topic.
+# Subject nouns such as "architecture" or "tối ưu" only hint the level and are kept.
+LEARNER_LEVEL_PHRASES = BEGINNER_KEYWORDS + ["advanced", "nâng cao", "chuyên sâu"]
+
+# Leading phrases that introduce the topic, longest first
+TOPIC_LEAD_PATTERNS = [
+    r"(tôi|mình|em|anh|chị) (muốn|cần) (học|tìm hiểu)( về)?",
+    r"(muốn|cần) (học|tìm hiểu)( về)?",
+    r"(hãy )?(dạy|chỉ) (tôi|mình|em)( về)?",
+    r"(tạo )?(một )?(khóa học|khoá học|lộ trình học|lộ trình)( về| cho)?",
+    r"tìm hiểu( về)?",
+    r"học( về)?",
+    r"i (want|would like|need) to (learn|study|understand)( about)?",
+    r"i'd like to (learn|study|understand)( about)?",
+    r"(please )?teach me( about)?",
+    r"(create |make )?(a |an )?(course|learning path|roadmap)( on| about| for)?",
+    r"(learn|study)( about)?",
+]
+
+# Phrases that end the topic and start the requirement details. A '.' only ends it when
+# followed by whitespace or the end of the request, so "Node.js" and "ASP.NET" stay whole.
+TOPIC_TERMINATORS = [
+    ",", ";", "!", "?", "(", " - ",
+    " cho ", " để ", " tập trung", " từ ", " với ", " trong ", " nhằm ", " và ứng dụng",
+    " for ", " to ", " focusing", " focused", " with ", " from ", " so that", " in order"
+]
+
+# A topic made of (or starting with) these words is not a subject ("to code", "about it")
+TOPIC_STOP_WORDS = {
+    "to", "how", "about", "of", "the", "a", "an", "some", "something", "it", "this", "that",
+    "ve", "gi", "nao", "cai", "nay", "do"
+}
+
+VIETNAMESE_HINT_WORDS = {"toi", "muon", "hoc", "ve", "cho", "cua", "nguoi", "moi", "tim", "hieu", "lam", "the", "nao"}
+ENGLISH_HINT_WORDS = {"i", "want", "learn", "about", "the", "for", "to", "how", "and", "with", "teach", "me"}
+
+def _fold(text: str) -> str:
+    """
+    Bỏ dấu tiếng Việt, giữ nguyên độ dài chuỗi: each character maps to its base letter,
+    so a match found in the folded text has the same span in the original text.
+    """
+    return "".join("d" if ch == "đ" else "D" if ch == "Đ" else unicodedata.normalize("NFD", ch)[0] for ch in text)
+
+class RequestInterpreter:
+    """
+    Local, rule-based replacement for the Agent A LLM call.
+    Extracts topic, requirement, language and level, and reports a confidence score
+    so the caller can fall back to the LLM interpreter for unclear requests.
+    """
+
+    def __init__(self):
+        self.min_confidence = float(os.getenv("LOCAL_INTERPRETER_MIN_CONFIDENCE", 0.75))
+        # Patterns, terminators and level phrases are matched on unaccented text ("toi muon hoc")
+        self._lead_res = [re.compile(rf"^\s*{_fold(pattern)}\s+", re.IGNORECASE) for pattern in TOPIC_LEAD_PATTERNS]
+        self._terminators = [_fold(terminator) for terminator in TOPIC_TERMINATORS]
+        self._sentence_end_re = re.compile(r"\.(?=\s|$)")
+        self._beginner_re = self._phrase_re(BEGINNER_KEYWORDS)
+        self._expert_re = self._phrase_re(EXPERT_KEYWORDS)
+        self._level_phrase_re = self._phrase_re(LEARNER_LEVEL_PHRASES)
+
+    def interpret(self, user_request: str) -> Tuple[Dict[str, str], float]:
+        """Returns (analysis, confidence). analysis has the same keys as Agent A's JSON."""
+        request = " ".join(user_request.split())
+        language, language_confidence = self._detect_language(request)
+        level = self._detect_level(request)
+        topic, lead_matched = self._extract_topic(request)
+
+        confidence = 0.0
+        if topic:
+            confidence = 0.4
+            # Either an explicit "I want to learn ..." or a bare short subject ("python cơ bản")
+            if lead_matched or len(request.split()) <= 4:
+                confidence += 0.3
+            if 1 <= len(topic.split()) <= 5:
+                confidence += 0.2
+            confidence += 0.1 * language_confidence
+            if self._is_weak_topic(topic):
+                confidence -= 0.3
+
+        analysis = {
+            "topic": topic,
+            "requirement": request[:1].upper() + request[1:],
+            "language": language,
+            "level": level
+        }
+        logger.debug(f"Local interpreter: {analysis} (confidence {confidence:.2f})")
+        return analysis, round(confidence, 2)
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.min_confidence
+
+    def _detect_language(self, request: str) -> Tuple[str, float]:
+        """Vietnamese vs English. Diacritics are decisive; otherwise hint words decide."""
+        request_lower = request.lower()
+        if "đ" in request_lower or any(unicodedata.combining(ch) for ch in unicodedata.normalize("NFD", request_lower)):
+            return "Vietnamese", 1.0
+
+        words = set(re.findall(r"[a-z']+", request_lower))
+        vietnamese_hits = len(words & VIETNAMESE_HINT_WORDS)
+        english_hits = len(words & ENGLISH_HINT_WORDS)
+        if vietnamese_hits > english_hits:
+            return "Vietnamese", 0.5
+        if english_hits:
+            return "English", 1.0
+        return "English", 0.0
+
+    def _detect_level(self, request: str) -> str:
+        request_folded = _fold(request)
+        if self._beginner_re.search(request_folded):
+            return "Beginner"
+        if self._expert_re.search(request_folded):
+            return "Expert"
+        return "Intermediate"
+
+    def _is_weak_topic(self, topic: str) -> bool:
+        """Very short topics and stop-word phrases ("To code") are better left to Agent A."""
+        words = _fold(topic).lower().split()
+        return len(topic) <= 2 or words[0] in TOPIC_STOP_WORDS or all(word in TOPIC_STOP_WORDS for word in words)
+
+    @staticmethod
+    def _phrase_re(phrases) -> "re.Pattern":
+        """Whole-word, case- and accent-insensitive alternation; match it against _fold(text)."""
+        alternation = "|".join(re.escape(_fold(phrase)) for phrase in sorted(phrases, key=len, reverse=True))
+        return re.compile(rf"\b({alternation})\b", re.IGNORECASE)
+
+    def _extract_topic(self, request: str) -> Tuple[str, bool]:
+        """Strips a leading intent phrase and cuts at the first requirement terminator."""
+        text = request
+        lead_matched = False
+        for lead_re in self._lead_res:
+            match = lead_re.match(_fold(text))
+            if match:
+                text, lead_matched = text[match.end():], True
+                break
+
+        text_folded = _fold(text).lower()
+        cut = len(text)
+        for terminator in self._terminators:
+            position = text_folded.find(terminator)
+            if 0 < position < cut:
+                cut = position
+        sentence_end = self._sentence_end_re.search(text, 1)
+        if sentence_end and sentence_end.start() < cut:
+            cut = sentence_end.start()
+        topic = text[:cut]
+
+        # Level phrases describe the learner, not the subject
+        spans = [match.span() for match in self._level_phrase_re.finditer(_fold(topic))]
+        for start, end in reversed(spans):
+            topic = topic[:start] + " " + topic[end:]
+        topic = " ".join(topic.split()).strip(" -:\"'")
+        if not topic:
+            return "", lead_matched
+        return topic[:1].upper() + topic[1:], lead_matched
+
+# Single instance to be used across the application
+request_interpreter = RequestInterpreter()
@@ -0,0 +1,176 @@
+import asyncio
+import bisect
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+import redis.asyncio as redis
+from redis.crc import key_slot, REDIS_CLUSTER_HASH_SLOTS
+
+class ShardedRedis:
+    """
+    Client-side sharding across several standalone Redis servers.
+
+    Keys are mapped to one of the 16384 Redis Cluster hash slots (honouring
+    '{hash tags}', so related keys share a slot), and slots are assigned to
+    servers with a consistent-hash ring, so adding a server only moves ~1/N of
+    the keys. Implements the redis.asyncio subset CacheManager uses.
+    """
+
+    def __init__(self, urls: List[str], virtual_nodes: int = 160, **client_kwargs: Any):
+        if not urls:
+            raise ValueError("ShardedRedis needs at least one Redis URL")
+        self.urls = urls
+        self.clients = [redis.from_url(url, **client_kwargs) for url in urls]
+        ring: List[Tuple[int, int]] = []
+        for index, url in enumerate(urls):
+            for replica in range(virtual_nodes):
+                ring.append((_ring_hash(f"{url}#{replica}"), index))
+        ring.sort()
+        self._ring_points = [point for point, _ in ring]
+        self._ring_owners = [owner for _, owner in ring]
+        self._slot_owner = [self._owner_of(_ring_hash(f"slot:{slot}")) for slot in range(REDIS_CLUSTER_HASH_SLOTS)]
+
+    def _owner_of(self, point: int) -> int:
+        position = bisect.bisect(self._ring_points, point) % len(self._ring_points)
+        return self._ring_owners[position]
+
+    def shard_index(self, key: Any) -> int:
+        return self._slot_owner[key_slot(_to_bytes(key))]
+
+    def client_for(self, key: Any) -> redis.Redis:
+        return self.clients[self.shard_index(key)]
+
+    def slot_counts(self) -> List[int]:
+        """Number of hash slots owned by each server, in the order of `urls`."""
+        counts = [0] * len(self.clients)
+        for owner in self._slot_owner:
+            counts[owner] += 1
+        return counts
+
+    async def ping(self) -> bool:
+        await asyncio.gather(*[client.ping() for client in self.clients])
+        return True
+
+    async def aclose(self):
+        await asyncio.gather(*[client.aclose() for client in self.clients], return_exceptions=True)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client_for(key).get(key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        groups = self._group_by_shard(keys)
+        results: List[Optional[bytes]] = [None] * len(keys)
+        values = await asyncio.gather(
+            *[self.clients[shard].mget([keys[i] for i in indexes]) for shard, indexes in groups.items()]
+        )
+        for indexes, shard_values in zip(groups.values(), values):
+            for index, value in zip(indexes, shard_values):
+                results[index] = value
+        return results
+
+    async def setex(self, key: str, ttl: int, value: Any) -> bool:
+        return await self.client_for(key).setex(key, ttl, value)
+
+    async def set(self, key: str, value: Any, **kwargs: Any) -> Optional[bool]:
+        return await self.client_for(key).set(key, value, **kwargs)
+
+    async def incr(self, key: str) -> int:
+        return await self.client_for(key).incr(key)
+
+    async def delete(self, *keys: str) -> int:
+        groups = self._group_by_shard(keys)
+        counts = await asyncio.gather(
+            *[self.clients[shard].delete(*[keys[i] for i in indexes]) for shard, indexes in groups.items()]
+        )
+        return sum(counts)
+
+    async def exists(self, *keys: str) -> int:
+        groups = self._group_by_shard(keys)
+        counts = await asyncio.gather(
+            *[self.clients[shard].exists(*[keys[i] for i in indexes]) for shard, indexes in groups.items()]
+        )
+        return sum(counts)
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        # Scripts must only touch keys of one shard; route by the first key
+        return await self.client_for(keys_and_args[0]).eval(script, numkeys, *keys_and_args)
+
+    async def publish(self, channel: str, message: Any) -> int:
+        return await self.client_for(channel).publish(channel, message)
+
+    def pubsub(self) -> "ShardedPubSub":
+        return ShardedPubSub(self)
+
+    def pipeline(self, transaction: bool = False) -> "ShardedPipeline":
+        return ShardedPipeline(self, transaction)
+
+    async def dbsize(self) -> List[int]:
+        return list(await asyncio.gather(*[client.dbsize() for client in self.clients]))
+
+    def _group_by_shard(self, keys: Any) -> Dict[int, List[int]]:
+        groups: Dict[int, List[int]] = {}
+        for index, key in enumerate(keys):
+            groups.setdefault(self.shard_index(key), []).append(index)
+        return groups
+
+class ShardedPipeline:
+    """Splits queued commands per shard and runs the shard pipelines concurrently."""
+
+    def __init__(self, sharded: ShardedRedis, transaction: bool):
+        self._sharded = sharded
+        self._transaction = transaction
+        self._commands: List[Tuple[str, str, tuple]] = []
+
+    def get(self, key: str) -> "ShardedPipeline":
+        self._commands.append(("get", key, ()))
+        return self
+
+    def setex(self, key: str, ttl: int, value: Any) -> "ShardedPipeline":
+        self._commands.append(("setex", key, (ttl, value)))
+        return self
+
+    def delete(self, key: str) -> "ShardedPipeline":
+        self._commands.append(("delete", key, ()))
+        return self
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        groups = self._sharded._group_by_shard([key for _, key, _ in commands])
+        pipelines = []
+        for shard, indexes in groups.items():
+            pipe = self._sharded.clients[shard].pipeline(transaction=self._transaction)
+            for index in indexes:
+                command, key, args = commands[index]
+                getattr(pipe, command)(key, *args)
+            pipelines.append(pipe.execute())
+        results: List[Any] = [None] * len(commands)
+        for indexes, shard_results in zip(groups.values(), await asyncio.gather(*pipelines)):
+            for index, result in zip(indexes, shard_results):
+                results[index] = result
+        return results
+
+class ShardedPubSub:
+    """Pub/sub bound to the shard owning the (single) subscribed channel."""
+
+    def __init__(self, sharded: ShardedRedis):
+        self._sharded = sharded
+        self._pubsub = None
+
+    async def subscribe(self, channel: str):
+        self._pubsub = self._sharded.client_for(channel).pubsub()
+        await self._pubsub.subscribe(channel)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        if self._pubsub is None:
+            await asyncio.sleep(timeout)
+            return None
+        return await self._pubsub.get_message(ignore_subscribe_messages=ignore_subscribe_messages, timeout=timeout)
+
+    async def aclose(self):
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+def _to_bytes(key: Any) -> bytes:
+    return key if isinstance(key, bytes) else str(key).encode("utf-8")
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
@@ -0,0 +1,102 @@
+"""
+Benchmark: per-turn DB latency of the chat context fetch
+So sánh cách cũ (2 statements trên cùng 1 connection) với CONTEXT_QUERY (1 round trip)
+
+Usage: python bench_context_fetch.py <session_id> [iterations]
+
+No results are recorded in the repo: the script has not been run against a real
+database yet. Run it against staging with a session that has message history,
+and quote the printed p50/p95 rows when claiming a latency change.
+"""
+
+import asyncio
+import math
+import os
+import statistics
+import sys
+import time
+import asyncpg
+from dotenv import load_dotenv
+
+from app.agents.smart_context_manager import CONTEXT_QUERY, RECENT_MESSAGES_QUERY
+
+load_dotenv()
+
+MESSAGES_LIMIT = 15
+
+SESSION_INFO_QUERY = """
+    SELECT lt.title as topic_title, tn.title as node_title
+    FROM chat_sessions cs
+    LEFT JOIN learning_topics lt ON cs.topic_id = lt.id
+    LEFT JOIN tree_nodes tn ON cs.node_id = tn.id
+    WHERE cs.id = $1
+"""
+
+async def before(conn: asyncpg.Connection, session_id: str):
+    """Old path: recent messages + session info, serialized on one connection"""
+    await conn.fetch(RECENT_MESSAGES_QUERY, session_id, MESSAGES_LIMIT)
+    await conn.fetchrow(SESSION_INFO_QUERY, session_id)
+
+async def before_gather(conn: asyncpg.Connection, session_id: str):
+    """Old path as written: asyncio.gather on one connection"""
+    await asyncio.gather(
+        conn.fetch(RECENT_MESSAGES_QUERY, session_id, MESSAGES_LIMIT),
+        conn.fetchrow(SESSION_INFO_QUERY, session_id)
+    )
+
+async def after_cold(conn: asyncpg.Connection, session_id: str):
+    """New path, session info not cached: one CONTEXT_QUERY"""
+    await conn.fetch(CONTEXT_QUERY, session_id, MESSAGES_LIMIT)
+
+async def after_warm(conn: asyncpg.Connection, session_id: str):
+    """New path, session info cached: messages only"""
+    await conn.fetch(RECENT_MESSAGES_QUERY, session_id, MESSAGES_LIMIT)
+
+async def measure(name: str, fn, conn: asyncpg.Connection, session_id: str, iterations: int):
+    """Prints p50/p95 of the successful iterations; failed ones are only counted."""
+    timings, errors, last_error = [], 0, None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            await fn(conn, session_id)
+        except Exception as e:
+            errors += 1
+            last_error = e
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+    if timings:
+        timings.sort()
+        # Nearest-rank percentile
+        p95 = timings[math.ceil(len(timings) * 0.95) - 1]
+        print(f"{name:<28} p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms   errors {errors}/{iterations}")
+    else:
+        print(f"{name:<28} no successful iterations   errors {errors}/{iterations}")
+    if errors:
+        print(f"{'':<28} last error: {last_error}")
+
+async def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    session_id = sys.argv[1]
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("DATABASE_URL is required")
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+    conn = await asyncpg.connect(database_url, statement_cache_size=0)
+    try:
+        print(f"🚀 Context fetch benchmark - session {session_id[:8]}..., {iterations} iterations")
+        print("=" * 80)
+        await measure("before (sequential)", before, conn, session_id, iterations)
+        await measure("before (gather, 1 conn)", before_gather, conn, session_id, iterations)
+        await measure("after (cold, CONTEXT_QUERY)", after_cold, conn, session_id, iterations)
+        await measure("after (warm, messages only)", after_warm, conn, session_id, iterations)
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark: asyncpg statement modes on the hot chat queries
+So sánh 'prepared' (named statements, cached + warmed up) với 'unnamed' (PgBouncer-safe)
+
+Usage: python bench_statement_mode.py <session_id> <user_id> [iterations]
+Runs against DATABASE_URL (direct) and, if set, PGBOUNCER_DATABASE_URL (PgBouncer in
+transaction mode, where only 'unnamed' is expected to work).
+
+No results are recorded in the repo: the script has not been run against a real
+database or PgBouncer yet. Quote its output for both targets when choosing
+DB_STATEMENT_MODE.
+"""
+
+import asyncio
+import os
+import sys
+import asyncpg
+from dotenv import load_dotenv
+
+from app.agents.smart_context_manager import CONTEXT_QUERY, RESOLVE_SESSION_QUERY, warm_up_statements
+from app.services.db_statement_mode import PREPARED, STATEMENT_MODES, pool_kwargs, resolve_statement_mode
+from bench_context_fetch import MESSAGES_LIMIT, measure
+
+load_dotenv()
+
+def normalize_url(database_url: str) -> str:
+    if database_url.startswith("postgres://"):
+        return database_url.replace("postgres://", "postgresql://", 1)
+    return database_url
+
+async def run_mode(mode: str, database_url: str, session_id: str, user_id: str, iterations: int):
+    conn = await asyncpg.connect(database_url, **pool_kwargs(mode))
+    try:
+        if mode == PREPARED:
+            await warm_up_statements(conn)
+
+        async def context(conn: asyncpg.Connection, session_id: str):
+            await conn.fetch(CONTEXT_QUERY, session_id, MESSAGES_LIMIT)
+
+        async def resolve(conn: asyncpg.Connection, session_id: str):
+            # Requested-session path: resolves without inserting
+            await conn.fetchrow(RESOLVE_SESSION_QUERY, user_id, None, None, session_id)
+
+        await measure(f"{mode}: CONTEXT_QUERY", context, conn, session_id, iterations)
+        await measure(f"{mode}: RESOLVE_SESSION", resolve, conn, session_id, iterations)
+    finally:
+        await conn.close()
+
+async def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    session_id, user_id = sys.argv[1], sys.argv[2]
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("DATABASE_URL is required")
+    targets = [("direct", database_url)]
+    if os.getenv("PGBOUNCER_DATABASE_URL"):
+        targets.append(("pgbouncer", os.getenv("PGBOUNCER_DATABASE_URL")))
+
+    print(f"🚀 Statement mode benchmark - {iterations} iterations")
+    for label, url in targets:
+        detected, url = resolve_statement_mode(normalize_url(url))
+        print("=" * 80)
+        print(f"{label}: detected mode '{detected}'")
+        for mode in STATEMENT_MODES:
+            try:
+                await run_mode(mode, url, session_id, user_id, iterations)
+            except Exception as e:
+                print(f"{mode}: failed - {e}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
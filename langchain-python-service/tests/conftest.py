@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests import the service as `app.*`, like uvicorn does from the service root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
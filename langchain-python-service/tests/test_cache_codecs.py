@@ -0,0 +1,35 @@
+import json
+
+from app.services.cache_codecs import CacheCodec, codec_for, decode_value, DEFAULT_CODEC, NAMESPACE_CODECS
+
+VALUE = {"topic": "Lập trình Python", "nodes": [{"id": str(i), "title": "Bài học " * 20} for i in range(50)]}
+
+
+def test_round_trip_for_every_serializer_and_compression():
+    for serializer in ("json", "msgpack"):
+        for compression in ("none", "zlib", "zstd"):
+            codec = CacheCodec(serializer=serializer, compression=compression, compress_threshold=256)
+            assert decode_value(codec.encode(VALUE)) == VALUE
+            assert decode_value(codec.encode({"small": True})) == {"small": True}
+
+
+def test_small_values_skip_compression():
+    codec = CacheCodec(serializer="json", compression="zstd", compress_threshold=1024)
+    assert codec.encode({"a": 1})[0] == 0x01
+    assert codec.encode(VALUE)[0] == 0x01 | 0x08
+    assert len(codec.encode(VALUE)) < len(json.dumps(VALUE).encode())
+
+
+def test_legacy_plain_json_is_still_readable():
+    legacy = json.dumps(VALUE, ensure_ascii=False)
+    assert decode_value(legacy.encode("utf-8")) == VALUE
+    assert decode_value(legacy) == VALUE
+    assert decode_value(b"[1, 2]") == [1, 2]
+    assert decode_value(b"") is None
+
+
+def test_codec_is_chosen_by_namespace():
+    assert codec_for("learning_path_raw:abc") is NAMESPACE_CODECS["learning_path_raw"]
+    assert codec_for("unknown:abc") is DEFAULT_CODEC
+    custom = {"ns": CacheCodec(compression="none")}
+    assert codec_for("ns:key", custom) is custom["ns"]
@@ -0,0 +1,37 @@
+import asyncio
+
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from app.services.cache_manager import CacheManager
+
+class TimingOutBackend:
+    async def get(self, key):
+        raise RedisTimeoutError("Timeout reading from socket")
+
+def _manager(monkeypatch):
+    manager = CacheManager()
+    manager._backend = TimingOutBackend()
+    switches = []
+    monkeypatch.setattr(manager, "_use_local_backend", lambda: switches.append(True))
+    return manager, switches
+
+def test_single_timeout_keeps_redis(monkeypatch):
+    manager, switches = _manager(monkeypatch)
+    assert asyncio.run(manager._read("ns:{a}", use_l1=False)) is None
+    assert switches == []
+    assert isinstance(manager._backend, TimingOutBackend)
+
+def test_repeated_timeouts_switch_to_local_backend(monkeypatch):
+    manager, switches = _manager(monkeypatch)
+    for _ in range(manager.fallback_error_threshold):
+        asyncio.run(manager._read("ns:{a}", use_l1=False))
+    assert switches == [True]
+
+def test_errors_outside_the_window_are_forgotten(monkeypatch):
+    manager, switches = _manager(monkeypatch)
+    clock = [100.0]
+    monkeypatch.setattr("app.services.cache_manager.time.monotonic", lambda: clock[0])
+    for _ in range(manager.fallback_error_threshold):
+        asyncio.run(manager._read("ns:{a}", use_l1=False))
+        clock[0] += manager.fallback_error_window + 1
+    assert switches == []
@@ -0,0 +1,38 @@
+import re
+
+from app.services.cache_manager import CacheManager
+
+def test_normalize_text_folds_case_diacritics_and_punctuation():
+    assert CacheManager.normalize_text("  Học   Lập trình Python! ") == "hoc lap trinh python"
+    assert CacheManager.normalize_text("Đệ quy, ĐỒ THỊ?") == "de quy do thi"
+
+def test_language_symbols_are_kept():
+    requests = ["Học C++", "Học C#", "Học C", "Học .NET", "Học NET", "Học Node.js", "Học Node js"]
+    keys = {CacheManager.build_key("learning_path_raw", CacheManager.normalize_text(r), "standard") for r in requests}
+    assert len(keys) == len(requests)
+    assert CacheManager.normalize_text("Học ASP.NET Core!") == "hoc asp.net core"
+
+def test_equivalent_requests_share_a_key():
+    first = CacheManager.build_key("ns", CacheManager.normalize_text("Tôi muốn học Python"), "standard")
+    second = CacheManager.build_key("ns", CacheManager.normalize_text("toi muon hoc   python."), "standard")
+    assert first == second
+
+def test_build_key_is_stable_and_hash_tagged():
+    key = CacheManager.build_key("learning_path_raw", "python", "standard")
+    assert re.fullmatch(r"learning_path_raw:\{[0-9a-f]{32}\}", key)
+    # Digest is fixed across processes (unlike the built-in hash())
+    assert key == CacheManager.build_key("learning_path_raw", "python", "standard")
+    assert key != CacheManager.build_key("learning_path_raw", "python", "premium")
+
+def test_parts_are_separated_unambiguously():
+    assert CacheManager.build_key("ns", "a b", "c") != CacheManager.build_key("ns", "a", "b c")
+
+def test_namespaced_key_changes_with_templates_and_generation():
+    manager = CacheManager()
+    manager.register_namespace("ns", ["prompt v1"])
+    original = manager.namespaced_key("ns", "python")
+    manager._namespace_generations["ns"] += 1
+    assert manager.namespaced_key("ns", "python") != original
+    manager.register_namespace("ns", ["prompt v2"])
+    manager._namespace_generations["ns"] = 0
+    assert manager.namespaced_key("ns", "python") != original
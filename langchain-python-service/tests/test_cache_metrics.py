@@ -0,0 +1,43 @@
+from app.services.cache_metrics import CacheMetrics, LatencyHistogram
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = LatencyHistogram()
+    for seconds in (0.0002, 0.003, 0.003, 2.0):
+        histogram.observe(seconds)
+    cumulative = dict(histogram.cumulative())
+    assert cumulative["0.0005"] == 1
+    assert cumulative["0.005"] == 3
+    assert cumulative["1.0"] == 3
+    assert cumulative["+Inf"] == 4
+    assert histogram.count == 4
+
+
+def test_snapshot_hit_rate():
+    metrics = CacheMetrics()
+    metrics.incr("ns", "hits_l1", 2)
+    metrics.incr("ns", "hits_backend")
+    metrics.incr("ns", "misses")
+    metrics.incr("idle", "sets")
+    snapshot = metrics.snapshot()
+    assert snapshot["ns"]["hit_rate"] == 0.75
+    assert snapshot["idle"]["hit_rate"] is None
+
+
+def test_render_prometheus_text():
+    metrics = CacheMetrics()
+    metrics.incr("session_info", "hits_l1")
+    metrics.observe("session_info", "get", 0.002)
+    text = metrics.render(
+        {"session_info": {"entries": 3, "limit": 100, "evictions": 1, "rejections": 0}},
+        {"mode": "sharded", "nodes": [{"node": 'cache-0"', "slots": 16384, "keys": 7}]}
+    )
+    lines = text.splitlines()
+    assert "# TYPE cache_hits_l1_total counter" in lines
+    assert 'cache_hits_l1_total{namespace="session_info"} 1' in lines
+    assert 'cache_backend_latency_seconds_bucket{namespace="session_info",operation="get",le="+Inf"} 1' in lines
+    assert 'cache_backend_latency_seconds_count{namespace="session_info",operation="get"} 1' in lines
+    assert 'cache_l1_evictions_total{namespace="session_info"} 1' in lines
+    assert 'cache_backend_info{mode="sharded"} 1' in lines
+    assert 'cache_backend_keys{node="cache-0\\""} 7' in lines
+    assert text.endswith("\n")
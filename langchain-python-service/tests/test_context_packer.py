@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.agents.context_manager import Message
+from app.agents.context_packer import ContextPacker, ContextTooLargeError, estimate_tokens, truncate_to_tokens
+
+START = datetime(2026, 1, 1)
+
+
+def _message(index: int, content: str) -> Message:
+    return Message(
+        id=f"m{index}", role="user" if index % 2 == 0 else "assistant", content=content,
+        timestamp=START + timedelta(seconds=index), session_id="s1", user_id="u1"
+    )
+
+
+def test_vietnamese_costs_more_tokens_than_english():
+    english = estimate_tokens("How does recursion work in Python")
+    vietnamese = estimate_tokens("Đệ quy hoạt động như thế nào trong Python")
+    assert english < vietnamese
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a = b[0] + c;") >= 7
+
+
+def test_truncation_keeps_head_and_tail():
+    text = "HEAD " + "word " * 2000 + " TAIL"
+    truncated = truncate_to_tokens(text, 200)
+    assert truncated.startswith("HEAD") and truncated.endswith("TAIL")
+    assert "đã lược bớt" in truncated
+    assert estimate_tokens(truncated) <= 220
+    assert truncate_to_tokens("short text", 200) == "short text"
+
+
+def test_long_history_message_is_truncated_not_dropped():
+    packer = ContextPacker()
+    history = [_message(0, "first question"), _message(1, "x " * 5000), _message(2, "follow-up")]
+    message, _, packed, total = packer.pack(2000, 200, "next question", None, history)
+    assert message == "next question"
+    assert [m.id for m in packed] == ["m0", "m1", "m2"]
+    assert "đã lược bớt" in packed[1].content
+    # The window's own message objects are left untouched
+    assert history[1].content == "x " * 5000
+    assert total <= 2000
+
+
+def test_large_current_message_keeps_its_share():
+    packer = ContextPacker()
+    message = "đoạn code dài " * 3000
+    packed_message, _, packed, total = packer.pack(
+        4000, 500, message, "tóm tắt", [_message(0, "hello")], history_copies=2, message_copies=2
+    )
+    assert estimate_tokens(packed_message) >= 4000 * packer.min_current_share / 2
+    assert packed_message.startswith("đoạn code dài")
+    assert total <= 4000
+
+
+def test_message_that_cannot_keep_its_share_raises():
+    packer = ContextPacker()
+    with pytest.raises(ContextTooLargeError):
+        packer.pack(4000, 3900, "câu hỏi " * 1000, None, [], message_copies=2)
+    # A short message still fits next to a large system prompt
+    message, _, _, _ = packer.pack(4000, 3900, "câu hỏi ngắn", None, [], message_copies=2)
+    assert message == "câu hỏi ngắn"
@@ -0,0 +1,34 @@
+from app.services.learning_path_service import LearningPathService
+
+service = LearningPathService()
+
+
+def test_truncated_array_keeps_last_complete_object():
+    assert service._repair_json('[{"a":1},{"b":2}') == [{"a": 1}, {"b": 2}]
+
+
+def test_truncated_object_keeps_last_complete_value():
+    assert service._repair_json('{"topic":"X"') == {"topic": "X"}
+    assert service._repair_json('{"topic":"X","nodes":[{"id":"1"},{"id":"2"}') == {
+        "topic": "X", "nodes": [{"id": "1"}, {"id": "2"}]
+    }
+
+
+def test_partial_trailing_element_is_dropped():
+    assert service._repair_json('{"nodes":[{"id":"1","title":"A"},{"id":"2","ti') == {
+        "nodes": [{"id": "1", "title": "A"}, {"id": "2"}]
+    }
+    assert service._repair_json('{"topic":"X","desc') == {"topic": "X"}
+    assert service._repair_json('{"topic":"X","desc":"unfinished') == {"topic": "X"}
+    # A number cut at the end may be incomplete
+    assert service._repair_json('{"a":[1,2,3') == {"a": [1, 2]}
+
+
+def test_strings_with_brackets_and_escapes():
+    assert service._repair_json('{"a":"x, ] }","b":"q\\"}"') == {"a": "x, ] }", "b": 'q"}'}
+
+
+def test_fences_prose_and_trailing_commas():
+    content = 'Here it is:\n```json\n{"a": [1, 2,], "b": true,}\n```\nDone.'
+    assert service._repair_json(content) == {"a": [1, 2], "b": True}
+    assert service._repair_json("no json here") is None
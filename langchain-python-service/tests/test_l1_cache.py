@@ -0,0 +1,60 @@
+import time
+
+from app.services.l1_cache import L1Cache, MISSING
+
+
+def test_get_set_delete_and_missing_marker():
+    cache = L1Cache(default_limit=10)
+    assert cache.get("ns:a") is None
+    cache.set("ns:a", {"x": 1}, ttl=60)
+    cache.set("ns:b", MISSING, ttl=60)
+    assert cache.get("ns:a") == {"x": 1}
+    assert cache.get("ns:b") is MISSING
+    cache.delete("ns:a")
+    assert cache.get("ns:a") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = L1Cache(default_limit=10)
+    cache.set("ns:a", 1, ttl=5)
+    now[0] += 4.9
+    assert cache.get("ns:a") == 1
+    now[0] += 0.2
+    assert cache.get("ns:a") is None
+    assert cache.size("ns") == 0
+
+
+def test_lru_eviction_per_namespace():
+    cache = L1Cache(default_limit=2)
+    cache.set("ns:a", 1, ttl=60)
+    cache.set("ns:b", 2, ttl=60)
+    cache.get("ns:a")  # a becomes most recently used
+    cache.get("ns:c")  # c is requested as often as the victim b
+    cache.set("ns:c", 3, ttl=60)
+    assert cache.get("ns:b") is None
+    assert cache.get("ns:a") == 1 and cache.get("ns:c") == 3
+    # Other namespaces have their own limit
+    cache.set("other:a", 1, ttl=60)
+    assert cache.size("ns") == 2 and cache.size("other") == 1
+    assert cache.stats()["ns"]["evictions"] == 1
+
+
+def test_admission_rejects_keys_colder_than_the_victim():
+    cache = L1Cache(default_limit=2)
+    for key in ("ns:hot1", "ns:hot2"):
+        cache.set(key, key, ttl=60)
+        for _ in range(3):
+            cache.get(key)
+    cache.set("ns:one-off", 1, ttl=60)
+    assert cache.get("ns:one-off") is None
+    assert cache.get("ns:hot1") == "ns:hot1" and cache.get("ns:hot2") == "ns:hot2"
+    assert cache.stats()["ns"]["rejections"] == 1
+
+
+def test_zero_limit_disables_namespace():
+    cache = L1Cache(default_limit=10, namespace_limits={"off": 0})
+    cache.set("off:a", 1, ttl=60)
+    cache.set("ns:a", 1, ttl=0)
+    assert cache.get("off:a") is None and cache.get("ns:a") is None
@@ -0,0 +1,91 @@
+import asyncio
+
+from app.services import learning_path_jobs as module
+
+
+class FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get_json(self, key):
+        return self.data.get(key)
+
+    async def set_json(self, key, data, ttl=3600):
+        self.data[key] = data
+
+    async def set_json_if_absent(self, key, data, ttl=3600):
+        if key in self.data:
+            return False
+        self.data[key] = data
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def _manager(monkeypatch, cache):
+    monkeypatch.setattr(module, "cache_manager", cache)
+    manager = module.LearningPathJobManager()
+    monkeypatch.setattr(manager._service, "get_path_cache_key", lambda request, quality: f"path:{request}")
+    return manager
+
+
+def test_losing_the_claim_reuses_the_winners_job(monkeypatch):
+    cache = FakeCache()
+    manager = _manager(monkeypatch, cache)
+    claim = cache.set_json_if_absent
+
+    async def racing_claim(key, data, ttl=3600):
+        # Another replica saves its record and claims the key just before this one
+        await cache.set_json(manager._job_key("winner"), {"job_id": "winner", "status": "queued"})
+        await claim(key, "winner")
+        return await claim(key, data, ttl)
+
+    monkeypatch.setattr(cache, "set_json_if_absent", racing_claim)
+
+    async def run():
+        manager._queue = asyncio.Queue()
+        return await manager.submit("python")
+
+    job, deduplicated = asyncio.run(run())
+    assert deduplicated and job["job_id"] == "winner"
+    assert cache.data[manager._active_key("path:python")] == "winner"
+    assert manager._queue.qsize() == 0
+    # The loser's provisional record is removed
+    assert [key for key in cache.data if key.startswith(module.JOB_KEY_PREFIX + ":")] == [manager._job_key("winner")]
+
+
+def test_stale_active_key_is_never_overwritten(monkeypatch):
+    cache = FakeCache()
+    manager = _manager(monkeypatch, cache)
+    cache.data[manager._active_key("path:python")] = "finished"
+    cache.data[manager._job_key("finished")] = {"job_id": "finished", "status": "completed"}
+
+    async def run():
+        manager._queue = asyncio.Queue()
+        try:
+            await manager.submit("python")
+        except RuntimeError:
+            return None
+        return "submitted"
+
+    assert asyncio.run(run()) is None
+    assert cache.data[manager._active_key("path:python")] == "finished"
+    assert manager._queue.qsize() == 0
+
+
+def test_submit_claims_key_and_queues(monkeypatch):
+    cache = FakeCache()
+    manager = _manager(monkeypatch, cache)
+
+    async def run():
+        manager._queue = asyncio.Queue()
+        first = await manager.submit("python")
+        second = await manager.submit("python")
+        return first, second
+
+    (job, deduplicated), (again, reused) = asyncio.run(run())
+    assert not deduplicated and reused
+    assert again["job_id"] == job["job_id"]
+    assert cache.data[manager._active_key("path:python")] == job["job_id"]
+    assert manager._queue.qsize() == 1
@@ -0,0 +1,81 @@
+import asyncio
+
+from app.services import learning_path_service as module
+from app.services.learning_path_service import LearningPathService
+from app.services.outline_parser import OutlineParser, OutlineStreamParser
+
+ANALYSIS = {"topic": "Python", "requirement": "Learn Python", "language": "Vietnamese", "level": "Beginner"}
+
+def _service(monkeypatch, expansions, gate=None):
+    service = LearningPathService()
+
+    async def skeleton(*args):
+        return list(expansions)
+
+    async def expand(analysis, title, *args):
+        if expansions[title] is None:
+            raise RuntimeError("LLM failed")
+        for number, line in enumerate(expansions[title].splitlines()):
+            if gate is not None and number == 1:
+                await gate.wait()  # the rest of the section is still being generated
+            await asyncio.sleep(0.01 if title == "A" else 0)  # sections interleave
+            yield line
+
+    async def mget_json(keys):
+        return [None] * len(keys)
+
+    async def mset_json(mapping, ttl):
+        pass
+
+    monkeypatch.setattr(service, "_run_outline_skeleton_agent", skeleton)
+    monkeypatch.setattr(service, "_expand_outline_section", expand)
+    monkeypatch.setattr(module.cache_manager, "mget_json", mget_json)
+    monkeypatch.setattr(module.cache_manager, "mset_json", mset_json)
+    return service
+
+def test_stream_and_batch_outlines_are_identical(monkeypatch):
+    service = _service(monkeypatch, {"A": "1. A1\n2. A2", "B": "1. B1\n1.1. B1a"})
+
+    async def run():
+        batch = await service._run_text_outliner_agent(ANALYSIS, "", "")
+        parser = OutlineStreamParser(interleaved=True)
+        lines, streamed = [], []
+        async for line in service._iter_outline_lines(ANALYSIS, "", ""):
+            lines.append(line)
+            streamed.extend(parser.feed(line + "\n"))
+        streamed.extend(parser.close())
+        return batch, lines, streamed
+
+    batch, lines, streamed = asyncio.run(run())
+    assert batch == "1. A\n1.1. A1\n1.2. A2\n2. B\n2.1. B1\n2.1.1. B1a"
+    assert service._join_outline_lines(lines) == batch
+    # Sections were expanded concurrently, so their lines arrived interleaved
+    assert lines != batch.splitlines()
+    assert sorted(node.temp_id for node in streamed) == sorted(node.temp_id for node in OutlineParser().parse(batch))
+
+def test_nodes_stream_before_sections_finish(monkeypatch):
+    gate = asyncio.Event()
+    service = _service(monkeypatch, {"A": "1. A1\n2. A2", "B": "1. B1\n2. B2"}, gate)
+
+    async def run():
+        parser = OutlineStreamParser(interleaved=True)
+        released, parsed_before_finish = [], []
+        async for line in service._iter_outline_lines(ANALYSIS, "", ""):
+            released.extend(node.temp_id for node in parser.feed(line + "\n"))
+            if not gate.is_set() and "1.1" in parser.nodes and "2.1" in parser.nodes:
+                parsed_before_finish = list(parser.nodes)
+                gate.set()
+        return released, parsed_before_finish, parser
+
+    released, parsed_before_finish, parser = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    # Level 1 nodes went out right after the skeleton, as parents
+    assert released[:2] == ["1", "2"]
+    assert not parser.nodes["1"].is_chat_enabled
+    # Children were parsed while every section was still being generated
+    assert {"1.1", "2.1"} <= set(parsed_before_finish)
+
+def test_failed_section_is_kept_as_leaf(monkeypatch):
+    service = _service(monkeypatch, {"A": None, "B": "1. B1"})
+    outline = asyncio.run(service._run_text_outliner_agent(ANALYSIS, "", ""))
+    assert outline == "1. A\n2. B\n2.1. B1"
+    assert OutlineParser().parse(outline)[0].is_chat_enabled
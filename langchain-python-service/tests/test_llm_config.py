@@ -0,0 +1,21 @@
+from app.models.llm_config import LLMConfig
+
+def test_get_llm_reuses_instance_for_same_settings():
+    LLMConfig._llm_registry.clear()
+    first = LLMConfig.get_llm(model_name="openai/gpt-4o-mini", temperature=0.2, max_tokens=256)
+    second = LLMConfig.get_llm(model_name="openai/gpt-4o-mini", temperature=0.2, max_tokens=256)
+    assert first is second
+    assert first.max_tokens == 256
+
+def test_registry_is_lru_bounded(monkeypatch):
+    LLMConfig._llm_registry.clear()
+    monkeypatch.setattr(LLMConfig, "_llm_registry_max_size", 2)
+    first = LLMConfig.get_llm(model_name="openai/gpt-4o-mini", max_tokens=100)
+    LLMConfig.get_llm(model_name="openai/gpt-4o-mini", max_tokens=200)
+    # Touch the first entry so the second becomes least recently used
+    assert LLMConfig.get_llm(model_name="openai/gpt-4o-mini", max_tokens=100) is first
+    LLMConfig.get_llm(model_name="openai/gpt-4o-mini", max_tokens=300)
+
+    assert len(LLMConfig._llm_registry) == 2
+    cached_max_tokens = sorted(key[2] for key in LLMConfig._llm_registry)
+    assert cached_max_tokens == [100, 300]
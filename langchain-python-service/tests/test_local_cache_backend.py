@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from app.services.local_cache_backend import LocalCacheBackend
+
+
+def test_set_get_and_expiry(tmp_path, monkeypatch):
+    backend = LocalCacheBackend(str(tmp_path / "cache.db"))
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    async def run():
+        await backend.setex("a", 10, b"1")
+        await backend.set("b", b"2")
+        assert await backend.mget(["a", "b", "c"]) == [b"1", b"2", None]
+        now[0] += 11
+        assert await backend.get("a") is None
+        assert await backend.exists("a", "b") == 1
+        assert await backend.purge_expired() == 1
+        await backend.aclose()
+
+    asyncio.run(run())
+
+
+def test_set_nx_incr_and_compare_and_delete(tmp_path):
+    backend = LocalCacheBackend(str(tmp_path / "cache.db"))
+
+    async def run():
+        assert await backend.set("lock", "token-1", ex=30, nx=True) is True
+        assert await backend.set("lock", "token-2", ex=30, nx=True) is None
+        assert await backend.delete_if_equals("lock", "token-2") == 0
+        assert await backend.delete_if_equals("lock", "token-1") == 1
+        assert await backend.get("lock") is None
+        assert await backend.incr("counter") == 1
+        assert await backend.incr("counter") == 2
+        await backend.aclose()
+
+    asyncio.run(run())
+
+
+def test_pipeline_runs_in_order(tmp_path):
+    backend = LocalCacheBackend(str(tmp_path / "cache.db"))
+
+    async def run():
+        pipeline = backend.pipeline()
+        pipeline.setex("a", 60, b"1").get("a").delete("a").get("a")
+        results = await pipeline.execute()
+        await backend.aclose()
+        return results
+
+    assert asyncio.run(run()) == [True, b"1", 1, None]
+
+
+def test_entries_are_capped(tmp_path):
+    backend = LocalCacheBackend(str(tmp_path / "cache.db"), max_entries=2)
+
+    async def run():
+        for index, key in enumerate(("a", "b", "c")):
+            await backend.setex(key, 60 + index, b"x")
+        await backend.purge_expired()
+        values = await backend.mget(["a", "b", "c"])
+        await backend.aclose()
+        return values
+
+    assert asyncio.run(run()) == [None, b"x", b"x"]
@@ -0,0 +1,75 @@
+import time
+from datetime import datetime, timedelta
+
+from app.agents.context_manager import Message
+from app.agents.message_window import MessageWindowCache
+
+START = datetime(2026, 1, 1)
+
+
+def _message(index: int, session_id: str = "s1") -> Message:
+    return Message(
+        id=f"m{index}", role="user", content=f"message {index}",
+        timestamp=START + timedelta(seconds=index), session_id=session_id, user_id="u1"
+    )
+
+
+def _ids(messages):
+    return [message.id for message in messages]
+
+
+def test_window_keeps_latest_messages_in_order():
+    cache = MessageWindowCache(window_size=3)
+    cache.fill("s1", "u1", [_message(i) for i in range(3)], loaded_at=time.monotonic())
+    cache.append("s1", "m4", "assistant", "message 4", START + timedelta(seconds=4))
+    # Out-of-order notification is inserted by timestamp
+    cache.append("s1", "m3", "user", "message 3", START + timedelta(seconds=3))
+    assert _ids(cache.get("s1")) == ["m2", "m3", "m4"]
+    # Older than the whole window: ignored
+    cache.append("s1", "m0b", "user", "late", START)
+    assert _ids(cache.get("s1")) == ["m2", "m3", "m4"]
+
+
+def test_duplicate_appends_are_ignored_and_remove_works():
+    cache = MessageWindowCache(window_size=5)
+    cache.fill("s1", "u1", [_message(0), _message(1)], loaded_at=time.monotonic())
+    cache.append("s1", "m1", "user", "message 1", START + timedelta(seconds=1))
+    assert _ids(cache.get("s1")) == ["m0", "m1"]
+    cache.remove("s1", "m0")
+    assert _ids(cache.get("s1")) == ["m1"]
+
+
+def test_sessions_are_evicted_lru():
+    cache = MessageWindowCache(window_size=2, max_sessions=2)
+    for session_id in ("a", "b"):
+        cache.fill(session_id, "u1", [_message(0, session_id)], loaded_at=time.monotonic())
+    cache.get("a")
+    cache.fill("c", "u1", [_message(0, "c")], loaded_at=time.monotonic())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = MessageWindowCache(window_size=2, idle_ttl=60)
+    cache.fill("s1", "u1", [_message(0)], loaded_at=now[0])
+    now[0] += 61
+    assert cache.get("s1") is None
+
+
+def test_fill_is_skipped_after_a_missed_append(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = MessageWindowCache(window_size=5)
+    loaded_at = now[0]
+    # A message is saved while the database read is in flight
+    now[0] += 1
+    assert cache.append("s1", "m1", "user", "message 1", START + timedelta(seconds=1)) is False
+    cache.fill("s1", "u1", [_message(0)], loaded_at=loaded_at)
+    assert cache.get("s1") is None
+    # A read that started after the append may be cached
+    now[0] += 1
+    cache.fill("s1", "u1", [_message(0), _message(1)], loaded_at=now[0])
+    assert _ids(cache.get("s1")) == ["m0", "m1"]
@@ -0,0 +1,58 @@
+from app.services.outline_parser import OutlineParser, OutlineStreamParser
+
+OUTLINE = """
+Lộ trình học Python năm 2024
+1. Nền tảng
+1.1. Cài đặt môi trường
+1.2. **Biến và kiểu dữ liệu**
+2. Lập trình hướng đối tượng
+2.1.1 Lớp và đối tượng
+- 2.2. Kế thừa
+"""
+
+def test_parse_builds_levels_and_relationships():
+    nodes = {node.temp_id: node for node in OutlineParser().parse(OUTLINE)}
+
+    assert list(nodes) == ["1", "1.1", "1.2", "2", "2.1.1", "2.2"]
+    assert nodes["1"].level == 0 and nodes["1.1"].level == 1
+    assert nodes["1"].next == ["1.1", "1.2"]
+    assert nodes["1.1"].requires == ["1"]
+    # Missing intermediate level attaches to the nearest ancestor
+    assert nodes["2.1.1"].requires == ["2"]
+
+def test_leaf_flags_and_titles():
+    nodes = {node.temp_id: node for node in OutlineParser().parse(OUTLINE)}
+
+    assert nodes["1"].is_chat_enabled is False and nodes["1"].prompt_sample == ""
+    assert nodes["1.2"].is_chat_enabled is True
+    assert nodes["1.2"].title == "Biến và kiểu dữ liệu"
+    assert "Biến và kiểu dữ liệu" in nodes["1.2"].prompt_sample
+
+def test_prose_and_duplicates_are_ignored():
+    parser = OutlineParser()
+    assert parser.parse_line("2024 là năm của AI") is None
+    assert parser.parse_line("Giới thiệu chung") is None
+    nodes = parser.parse("1. A\n1. B\n1.1. C")
+    assert [node.title for node in nodes] == ["A", "C"]
+
+def test_tree_json_exposes_parent_and_children_ids():
+    parser = OutlineParser()
+    tree = parser.to_tree_json(parser.parse("1. A\n1.1. B"))
+    assert tree[0]["parent_temp_id"] is None and tree[0]["next_temp_ids"] == ["1.1"]
+    assert tree[1]["parent_temp_id"] == "1"
+
+def test_stream_parser_releases_nodes_once_leaf_status_is_known():
+    parser = OutlineStreamParser()
+    assert parser.feed("1. A\n1.") == []  # "1. A" may still get children
+    released = parser.feed("1. B\n2. C\n")
+    assert [node.temp_id for node in released] == ["1", "1.1"]
+    assert released[0].is_chat_enabled is False and released[1].is_chat_enabled is True
+    assert [node.temp_id for node in parser.close()] == ["2"]
+
+def test_stream_parser_matches_batch_parser():
+    parser = OutlineStreamParser()
+    streamed = []
+    for start in range(0, len(OUTLINE), 7):
+        streamed.extend(parser.feed(OUTLINE[start:start + 7]))
+    streamed.extend(parser.close())
+    assert [n.model_dump() for n in streamed] == [n.model_dump() for n in OutlineParser().parse(OUTLINE)]
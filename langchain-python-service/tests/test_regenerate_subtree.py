@@ -0,0 +1,40 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import learning_path_service as module
+from app.services.learning_path_service import LearningPathService
+from app.services.outline_parser import OutlineParser
+
+TREE = OutlineParser().parse("1. A\n1.1. A1\n1.1.1. A1a\n1.1.1.1. A1a-i\n2. B\n2.1. B1")
+
+
+def _service(monkeypatch, content):
+    prompts = []
+
+    class FakeLLM:
+        async def ainvoke(self, messages):
+            prompts.append(messages[0].content)
+            return SimpleNamespace(content=content)
+
+    monkeypatch.setattr(module.LLMConfig, "get_llm", lambda **kwargs: FakeLLM())
+    return LearningPathService(), prompts
+
+
+def test_subtree_is_limited_to_the_paths_depth(monkeypatch):
+    service, prompts = _service(monkeypatch, "1. X\n1.1. X1\n1.1.1. too deep\n2. Y")
+    path = asyncio.run(service.regenerate_subtree("Course", "", TREE, "2.1"))
+    ids = [node["temp_id"] for node in path["tree"]]
+    assert "2.1.1.1.1" not in ids
+    assert {"2.1.1", "2.1.1.1", "2.1.2"} <= set(ids)
+    # Two levels are left under a level-1 node of a 4-level path
+    assert "at most 2 level(s)" in prompts[0]
+    assert max(node["level"] for node in path["tree"]) == 3
+
+
+def test_node_at_the_deepest_level_cannot_be_expanded(monkeypatch):
+    service, prompts = _service(monkeypatch, "1. X")
+    with pytest.raises(ValueError):
+        asyncio.run(service.regenerate_subtree("Course", "", TREE, "1.1.1.1"))
+    assert not prompts
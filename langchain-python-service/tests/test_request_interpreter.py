@@ -0,0 +1,67 @@
+from app.services.request_interpreter import request_interpreter
+
+
+def test_subject_words_are_kept_in_topic():
+    cases = {
+        "I want to learn software architecture": "Software architecture",
+        "Database optimization": "Database optimization",
+        "advanced SQL query optimization": "SQL query optimization",
+        "Học kiến trúc microservices nâng cao": "Kiến trúc microservices",
+        "Tôi muốn học tối ưu hóa SQL": "Tối ưu hóa SQL",
+    }
+    for request, topic in cases.items():
+        analysis, _ = request_interpreter.interpret(request)
+        assert analysis["topic"] == topic, request
+        assert analysis["level"] == "Expert", request
+
+
+def test_learner_level_phrases_are_stripped():
+    analysis, _ = request_interpreter.interpret("python cơ bản")
+    assert analysis["topic"] == "Python"
+    assert analysis["level"] == "Beginner"
+
+    analysis, _ = request_interpreter.interpret("Tôi muốn học Python cho người mới bắt đầu")
+    assert analysis["topic"] == "Python"
+    assert analysis["level"] == "Beginner"
+
+
+def test_unaccented_vietnamese_lead_is_stripped():
+    analysis, confidence = request_interpreter.interpret("toi muon hoc python")
+    assert analysis["topic"] == "Python"
+    assert analysis["language"] == "Vietnamese"
+    assert request_interpreter.is_confident(confidence)
+
+    analysis, _ = request_interpreter.interpret("tao lo trinh hoc Docker cho nguoi moi")
+    assert analysis["topic"] == "Docker"
+
+
+def test_topic_stops_at_requirement_details():
+    analysis, _ = request_interpreter.interpret("I want to learn React, focusing on hooks")
+    assert analysis["topic"] == "React"
+    assert analysis["requirement"] == "I want to learn React, focusing on hooks"
+
+
+def test_unaccented_vietnamese_level_is_detected():
+    cases = {
+        "hoc python co ban": ("Python", "Beginner"),
+        "tao lo trinh hoc Docker cho nguoi moi": ("Docker", "Beginner"),
+        "toi muon hoc kien truc microservices": ("Kien truc microservices", "Expert"),
+        "hoc SQL nang cao": ("SQL", "Expert"),
+    }
+    for request, (topic, level) in cases.items():
+        analysis, _ = request_interpreter.interpret(request)
+        assert (analysis["topic"], analysis["level"]) == (topic, level), request
+
+
+def test_dotted_names_are_not_cut():
+    analysis, _ = request_interpreter.interpret("Học Node.js cơ bản")
+    assert analysis["topic"] == "Node.js"
+    assert analysis["level"] == "Beginner"
+    analysis, _ = request_interpreter.interpret("I want to learn ASP.NET Core. I know C# already")
+    assert analysis["topic"] == "ASP.NET Core"
+
+
+def test_stop_word_and_very_short_topics_fall_back_to_the_llm():
+    for request in ("learn to code", "I want to learn about it", "học C"):
+        _, confidence = request_interpreter.interpret(request)
+        assert not request_interpreter.is_confident(confidence), request
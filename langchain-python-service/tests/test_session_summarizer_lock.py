@@ -0,0 +1,84 @@
+import asyncio
+
+from app.agents import session_summarizer as module
+from app.services.cache_manager import CacheManager
+from app.services.local_cache_backend import LocalCacheBackend
+
+
+class FakeConnection:
+    def __init__(self, on_fetch):
+        self.on_fetch = on_fetch
+
+    async def fetch(self, query, *args):
+        await self.on_fetch()
+        return []
+
+
+class FakePool:
+    def __init__(self, on_fetch):
+        self.conn = FakeConnection(on_fetch)
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+def _summarizer(tmp_path, monkeypatch, on_fetch):
+    manager = CacheManager()
+    manager._backend = LocalCacheBackend(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(module, "cache_manager", manager)
+    summarizer = module.SessionSummarizer(window_size=15)
+    summarizer._db_pool = FakePool(on_fetch)
+    lock_key = manager.build_key(module.SUMMARY_LOCK_PREFIX, "session-1")
+    return manager, summarizer, lock_key
+
+
+def test_pass_releases_its_own_lock(tmp_path, monkeypatch):
+    manager, summarizer, lock_key = _summarizer(tmp_path, monkeypatch, lambda: asyncio.sleep(0))
+
+    async def run():
+        assert await summarizer.summarize("session-1") is False
+        # Released, so the next pass (or another replica) can take it
+        return await manager.acquire_lock(lock_key, 30)
+
+    assert asyncio.run(run())
+
+
+def test_expired_pass_does_not_release_a_lock_taken_over(tmp_path, monkeypatch):
+    tokens = {}
+
+    async def lock_expires_and_is_taken_over():
+        await manager._backend.delete(f"{lock_key}:lock")
+        tokens["other"] = await manager.acquire_lock(lock_key, 30)
+
+    manager, summarizer, lock_key = _summarizer(tmp_path, monkeypatch, lock_expires_and_is_taken_over)
+
+    async def run():
+        await summarizer.summarize("session-1")
+        return await manager._backend.get(f"{lock_key}:lock")
+
+    assert asyncio.run(run()) == tokens["other"].encode()
+
+
+def test_held_lock_skips_the_pass(tmp_path, monkeypatch):
+    fetched = []
+
+    async def on_fetch():
+        fetched.append(True)
+
+    manager, summarizer, lock_key = _summarizer(tmp_path, monkeypatch, on_fetch)
+
+    async def run():
+        await manager.acquire_lock(lock_key, 30)
+        return await summarizer.summarize("session-1")
+
+    assert asyncio.run(run()) is False
+    assert not fetched
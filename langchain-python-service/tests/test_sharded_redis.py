@@ -0,0 +1,59 @@
+import asyncio
+
+from redis.crc import key_slot
+
+from app.services.sharded_redis import ShardedRedis
+
+URLS = [f"redis://cache-{index}:6379/0" for index in range(3)]
+
+
+class FakeShard:
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+def test_hash_tags_keep_related_keys_on_one_shard():
+    # Clients are created lazily by redis.from_url, so no server is needed
+    sharded = ShardedRedis(URLS)
+    assert key_slot(b"session:{42}:info") == key_slot(b"session:{42}:messages")
+    assert sharded.shard_index("session:{42}:info") == sharded.shard_index("session:{42}:messages")
+    assert sharded.shard_index(b"plain") == sharded.shard_index("plain")
+
+
+def test_slots_are_spread_across_servers():
+    counts = ShardedRedis(URLS).slot_counts()
+    assert sum(counts) == 16384
+    assert min(counts) > 16384 / len(URLS) * 0.7
+
+
+def test_adding_a_server_moves_about_one_nth_of_the_slots():
+    before = ShardedRedis(URLS)
+    after = ShardedRedis(URLS + ["redis://cache-3:6379/0"])
+    moved = [slot for slot in range(16384) if before._slot_owner[slot] != after._slot_owner[slot]]
+    # Every moved slot goes to the new server
+    assert all(after._slot_owner[slot] == 3 for slot in moved)
+    assert 0.15 < len(moved) / 16384 < 0.35
+
+
+def test_multi_key_commands_are_grouped_per_shard():
+    sharded = ShardedRedis(URLS)
+    sharded.clients = [FakeShard() for _ in URLS]
+    keys = [f"key:{index}" for index in range(30)]
+    for key in keys:
+        sharded.client_for(key).data[key] = key.encode()
+
+    async def run():
+        values = await sharded.mget(keys + ["missing"])
+        deleted = await sharded.delete(*keys[:10])
+        return values, deleted
+
+    values, deleted = asyncio.run(run())
+    assert values == [key.encode() for key in keys] + [None]
+    assert deleted == 10
+    assert len({sharded.shard_index(key) for key in keys}) == len(URLS)
@@ -0,0 +1,48 @@
+import asyncio
+
+import asyncpg
+
+from app.agents.smart_context_manager import CONTEXT_QUERY, RESOLVE_SESSION_QUERY, HOT_STATEMENTS, warm_up_statements
+
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def start(self):
+        self.conn.open_transactions += 1
+
+    async def rollback(self):
+        self.conn.open_transactions -= 1
+        self.conn.rollbacks += 1
+
+
+class FakeConnection:
+    def __init__(self, errors):
+        self.errors = errors
+        self.executed = []
+        self.open_transactions = 0
+        self.rollbacks = 0
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def fetch(self, query, *args):
+        self.executed.append(query)
+        if query in self.errors:
+            raise self.errors[query]
+        return []
+
+
+def test_warm_up_runs_every_statement_and_rolls_back():
+    conn = FakeConnection({RESOLVE_SESSION_QUERY: asyncpg.ForeignKeyViolationError("placeholder user")})
+    assert asyncio.run(warm_up_statements(conn)) == len(HOT_STATEMENTS)
+    assert conn.executed == [query for query, _ in HOT_STATEMENTS]
+    assert conn.rollbacks == len(HOT_STATEMENTS) and conn.open_transactions == 0
+
+
+def test_warm_up_failure_is_not_fatal():
+    conn = FakeConnection({CONTEXT_QUERY: asyncpg.UndefinedTableError('relation "chat_session_summaries" does not exist')})
+    assert asyncio.run(warm_up_statements(conn)) == len(HOT_STATEMENTS) - 1
+    assert conn.executed == [query for query, _ in HOT_STATEMENTS]
+    assert conn.open_transactions == 0